@@ -61,3 +61,80 @@ USE_TZ = True
 STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Tesseract settings and on-disk OCR result cache
+OCR_LANG = 'eng'
+OCR_CONFIG = ''
+OCR_CACHE_DIR = BASE_DIR / 'ocr_cache'
+OCR_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Image preprocessing before OCR (core/preprocess.py), applied in this order
+OCR_PREPROCESS = ['downscale', 'grayscale', 'deskew', 'binarize', 'crop']
+OCR_TARGET_DPI = 300
+OCR_MAX_PIXELS = 9_000_000
+OCR_DESKEW_MAX_ANGLE = 5.0
+
+# Bulk uploads (core/bulk_upload.py)
+BULK_UPLOAD_MAX_FILE_SIZE = 10 * 1024 * 1024  # per file / archive member
+DATA_UPLOAD_MAX_NUMBER_FILES = 1000
+
+# PDFs: pages with fewer embedded characters than this are rendered and OCRed
+PDF_MIN_TEXT_CHARS = 20
+PDF_OCR_DPI = 300
+PDF_OCR_PROCESSES = None  # defaults to the CPU count when no worker pool is shared
+
+# Hash uploads while they stream in (Document.checksum)
+FILE_UPLOAD_HANDLERS = [
+    'core.uploadhandlers.ChecksumMemoryFileUploadHandler',
+    'core.uploadhandlers.ChecksumTemporaryFileUploadHandler',
+]
+
+# AI extraction providers (apps/ai_bridge/registry.py). AI_PROVIDER picks the one
+# AIService uses; None returns mock data. 'router' is Ollama falling back to the
+# regex extractor (apps/ai_bridge/services/router.py).
+AI_PROVIDER = None
+AI_PROVIDERS = {
+    'ollama': {
+        'BACKEND': 'apps.ai_bridge.providers.Ollama_provider.OllamaProvider',
+        'WARM_UP': False,  # preload the model when a worker starts, even if not AI_PROVIDER
+    },
+    'regex': {'BACKEND': 'apps.ai_bridge.providers.regex_provider.RegexProvider'},
+    'mock': {'BACKEND': 'apps.ai_bridge.providers.mock_provider.MockAIProvider'},
+    'router': {
+        'BACKEND': 'apps.ai_bridge.services.router.ProviderRouter',
+        'ROUTES': ['ollama', 'regex'],
+    },
+}
+OLLAMA_BASE_URL = 'http://localhost:11434'
+OLLAMA_MODEL = 'llama3.1'
+OLLAMA_TIMEOUT = 120
+OLLAMA_NUM_CTX = 4096  # context window, also sizes classification batches
+OLLAMA_KEEP_ALIVE = '30m'  # keep the model loaded between documents
+AI_LATENCY_BUDGET = 20.0  # seconds per extraction, fallback included
+AI_BREAKER_FAILURES = 5  # consecutive failures that open the circuit
+AI_BREAKER_RESET = 30.0  # seconds before a trial call
+
+# Cache of AI extraction results (apps/ai_bridge/cache.py); None disables it
+AI_CACHE_PATH = BASE_DIR / 'ai_cache.sqlite3'
+AI_CACHE_TTL = 30 * 24 * 3600  # seconds
+AI_CACHE_MAX_ENTRIES = 50_000
+
+# Long documents are split into overlapping chunks for the model (apps/ai_bridge/chunking.py)
+AI_CHUNK_MAX_CHARS = 6000
+AI_CHUNK_OVERLAP_LINES = 3
+
+# Ledger suggestions learned from verified lines (core/ledger_index.py)
+LEDGER_INDEX_DIR = BASE_DIR / 'ledger_index'
+LEDGER_INDEX_DIM = 2048  # hashed n-gram buckets
+LEDGER_INDEX_CONFIDENCE = 0.8  # at or above this for every line, the AI call is skipped
+LEDGER_INDEX_MIN_SUPPORT = 2  # verified lines before a suggestion can be fully confident
+LEDGER_INDEX_REBUILD_AFTER = 50  # verifications a worker applies in memory before rebuilding the file from the DB
+LEDGER_INDEX_REBUILD_INTERVAL = 300  # seconds; also rebuild once the file is this old and has changes pending
+
+# Background document processing (manage.py run_worker)
+JOB_OCR_PROCESSES = 2
+JOB_WORKER_THREADS = 4
+JOB_POLL_INTERVAL = 2.0
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF = 30  # seconds, doubled on each retry
+JOB_LOCK_TIMEOUT = 30 * 60
@@ -0,0 +1,195 @@
+"""
+Persistent cache of LLM extraction results.
+
+Entries live in a local SQLite file keyed by a hash of the provider identity
+(class, version, model) and the whitespace-normalised prompt, so the same
+invoice template OCRed again next month is answered without calling the
+model. Entries expire after a TTL and the least recently used ones are evicted
+above `max_entries`. Results carrying an "error" key (including responses that
+were not valid JSON) and fallback results from the router are never stored.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+from .providers.base import BaseAIProvider
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def normalize_prompt(prompt):
+    return _WHITESPACE_RE.sub(' ', prompt).strip()
+
+
+def is_cacheable(result):
+    return isinstance(result, dict) and 'error' not in result and not result.get('fallback')
+
+
+class ResponseCache:
+    def __init__(self, path, ttl, max_entries):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    # ---------- CONNECTION ----------
+    def _db(self):
+        # sqlite3 connections may not be shared between threads; keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # ---------- KEYS ----------
+    @staticmethod
+    def make_key(identity, prompt):
+        raw = '|'.join([*map(str, identity), normalize_prompt(prompt)])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    # ---------- LOOKUP ----------
+    def get(self, key):
+        db = self._db()
+        now = time.time()
+        row = db.execute('SELECT value, created FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is not None and now - row[1] > self.ttl:
+            db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            row = None
+        if row is None:
+            self._count('misses')
+            return None
+        db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        self._count('hits')
+        return json.loads(row[0])
+
+    def set(self, key, result):
+        if not is_cacheable(result):
+            return False
+        now = time.time()
+        self._db().execute(
+            'INSERT OR REPLACE INTO entries (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+            (key, json.dumps(result), now, now),
+        )
+        self.evict()
+        return True
+
+    # ---------- EVICTION ----------
+    def evict(self):
+        db = self._db()
+        (count,) = db.execute('SELECT COUNT(*) FROM entries').fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        db.execute(
+            'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)', (excess,)
+        )
+        self._count('evictions', excess)
+        return excess
+
+    def purge_expired(self):
+        cursor = self._db().execute('DELETE FROM entries WHERE created < ?', (time.time() - self.ttl,))
+        return cursor.rowcount
+
+    def clear(self):
+        db = self._db()
+        db.execute('DELETE FROM entries')
+        db.execute('DELETE FROM counters')
+        db.execute('VACUUM')
+
+    # ---------- STATS ----------
+    def _count(self, name, n=1):
+        self._db().execute(
+            'INSERT INTO counters (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, n),
+        )
+
+    def stats(self):
+        db = self._db()
+        counters = dict(db.execute('SELECT name, value FROM counters').fetchall())
+        entries, size = db.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM entries').fetchone()
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        lookups = hits + misses
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'bytes': size,
+            'ttl': self.ttl,
+            'hits': hits,
+            'misses': misses,
+            'evictions': counters.get('evictions', 0),
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_response_cache():
+    """The configured cache, or None when AI_CACHE_PATH is unset."""
+    path = getattr(settings, 'AI_CACHE_PATH', None)
+    if not path:
+        return None
+    return ResponseCache(
+        path,
+        ttl=getattr(settings, 'AI_CACHE_TTL', 30 * 24 * 3600),
+        max_entries=getattr(settings, 'AI_CACHE_MAX_ENTRIES', 50_000),
+    )
+
+
+class CachedProvider(BaseAIProvider):
+    """Answers repeated prompts from a ResponseCache before asking the wrapped provider."""
+
+    def __init__(self, provider, cache):
+        self.provider = provider
+        self.cache = cache
+        self.max_concurrency = provider.max_concurrency
+        self.timeout = provider.timeout
+
+    def _key(self, text):
+        return self.cache.make_key(self.provider.cache_identity(), self.provider.render_prompt(text))
+
+    def extract(self, text: str) -> dict:
+        key = self._key(text)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.provider.extract(text)
+            self.cache.set(key, result)
+        return result
+
+    async def aextract(self, text: str) -> dict:
+        # Hits skip the wrapped provider's concurrency slot and timeout entirely
+        key = self._key(text)
+        result = self.cache.get(key)
+        if result is None:
+            result = await self.provider.aextract(text)
+            self.cache.set(key, result)
+        return result
+
+    async def aclose(self):
+        await self.provider.aclose()
+        await super().aclose()
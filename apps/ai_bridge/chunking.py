@@ -0,0 +1,149 @@
+"""
+Map-reduce extraction for long documents.
+
+Long OCR text (multi-page statements) is cleaned of boilerplate, split into
+overlapping chunks that fit the model context, extracted in parallel through
+the provider's `extract_many`/`aextract_many`, and merged back into one record.
+With chunks <= the provider's max_concurrency, latency is that of the slowest
+chunk rather than of the whole document.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+
+from .providers.base import BaseAIProvider
+
+BOILERPLATE_RE = re.compile(
+    r'^(?:page\s*\d+(?:\s*(?:of|/)\s*\d+)?|page continued|continued(?: on next page)?|'
+    r'statement of account|this is a (?:computer|system)[- ]generated.*|.*do not reply.*|[-=_*.~\s|]+)$',
+    re.IGNORECASE,
+)
+AMOUNT_RE = re.compile(r'\d+\.\d{2}')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Header fields come from the first chunk that has them; totals from the last
+FIRST_FIELDS = ('vendor', 'invoice_no', 'date')
+LAST_FIELDS = ('total_amount', 'tax_amount')
+
+
+def prefilter(text):
+    """
+    Lines worth sending to the model: drops blanks, page furniture and repeats of
+    running headers (kept once). Repeated lines with an amount are real entries and stay.
+    """
+    kept = []
+    seen_headers = set()
+    for raw_line in text.split('\n'):
+        line = _WHITESPACE_RE.sub(' ', raw_line).strip()
+        if not line or BOILERPLATE_RE.match(line):
+            continue
+        if not AMOUNT_RE.search(line):
+            key = line.casefold()
+            if key in seen_headers:
+                continue
+            seen_headers.add(key)
+        kept.append(line)
+    return kept
+
+
+def split_chunks(lines, max_chars, overlap_lines):
+    """Group lines into chunks of at most ~max_chars, each repeating the previous chunk's last lines."""
+    chunks = []
+    current, size = [], 0
+    fresh = 0  # lines in `current` not carried over from the previous chunk
+    for line in lines:
+        if fresh and size + len(line) + 1 > max_chars:
+            chunks.append(current)
+            current = current[-overlap_lines:] if overlap_lines else []
+            size = sum(len(l) + 1 for l in current)
+            fresh = 0
+        current.append(line)
+        size += len(line) + 1
+        fresh += 1
+    if fresh or not chunks:
+        chunks.append(current)
+    return ['\n'.join(chunk) for chunk in chunks]
+
+
+def _present(value):
+    return value not in (None, '', [], {})
+
+
+def _transaction_key(t):
+    amount = t.get('amount')
+    try:
+        amount = format(Decimal(str(amount).replace(',', '')).normalize(), 'f')
+    except (InvalidOperation, ValueError):
+        pass
+    description = _WHITESPACE_RE.sub(' ', str(t.get('description') or '')).strip().casefold()
+    return (str(t.get('date') or '').strip(), description, str(amount), str(t.get('type') or '').casefold())
+
+
+def merge_results(results):
+    """Combine per-chunk results, dropping transactions repeated by a chunk overlap."""
+    ok = [r for r in results if isinstance(r, dict) and 'error' not in r]
+    if not ok:
+        return results[0] if results else {}
+
+    merged = {}
+    for field in FIRST_FIELDS:
+        merged[field] = next((r[field] for r in ok if _present(r.get(field))), None)
+    for field in LAST_FIELDS:
+        merged[field] = next((r[field] for r in reversed(ok) if _present(r.get(field))), None)
+    confidences = [r['confidence'] for r in ok if isinstance(r.get('confidence'), (int, float))]
+    if confidences:
+        merged['confidence'] = min(confidences)
+
+    transactions = []
+    previous = {}
+    for r in ok:
+        current = {}
+        for t in r.get('transactions') or []:
+            if not isinstance(t, dict):
+                continue
+            key = _transaction_key(t)
+            # Only the neighbouring chunk shares lines with this one; identical entries
+            # beyond what it reported are genuine repeats and are kept
+            if previous.get(key, 0) > 0:
+                previous[key] -= 1
+            else:
+                transactions.append(t)
+            current[key] = current.get(key, 0) + 1
+        previous = current
+    merged['transactions'] = transactions
+
+    if len(ok) < len(results):
+        merged['chunk_errors'] = [r.get('error') for r in results if r not in ok]
+    merged['chunks'] = len(results)
+    return merged
+
+
+class ChunkedProvider(BaseAIProvider):
+    """Splits long texts for the wrapped provider and merges the answers."""
+
+    def __init__(self, provider, max_chars=None, overlap_lines=None):
+        self.provider = provider
+        self.max_chars = max_chars or getattr(settings, 'AI_CHUNK_MAX_CHARS', 6000)
+        self.overlap_lines = getattr(settings, 'AI_CHUNK_OVERLAP_LINES', 3) if overlap_lines is None else overlap_lines
+        self.max_concurrency = provider.max_concurrency
+        self.timeout = provider.timeout
+
+    def chunks(self, text):
+        return split_chunks(prefilter(text), self.max_chars, self.overlap_lines)
+
+    def extract(self, text: str) -> dict:
+        chunks = self.chunks(text)
+        if len(chunks) == 1:
+            return self.provider.extract(chunks[0])
+        return merge_results(self.provider.extract_many(chunks))
+
+    async def aextract(self, text: str) -> dict:
+        chunks = self.chunks(text)
+        if len(chunks) == 1:
+            return await self.provider.aextract(chunks[0])
+        return merge_results(await self.provider.aextract_many(chunks))
+
+    async def aclose(self):
+        await self.provider.aclose()
+        await super().aclose()
@@ -0,0 +1,147 @@
+"""
+Batched ledger classification of bank statement narrations.
+
+Narrations are de-duplicated, tagged with stable ids (their position) and
+packed into as few prompts as the model's context window allows; the model
+answers with a JSON array of {"id", "ledger"} objects, matched back by id
+rather than by order. Batches run concurrently. A batch whose answer cannot be
+parsed at all is split in half and retried; items missing from an otherwise
+valid answer are retried on their own. Splitting only helps with bad answers:
+a transport error, timeout or open breaker cancels the remaining batches and
+is raised, rather than being retried once per narration.
+"""
+import asyncio
+import json
+import re
+
+PROMPT = """
+You are an expert Indian Chartered Accountant AI.
+
+Classify each bank statement narration below into a ledger account{ledger_hint}.
+
+Return STRICT JSON only: an array with one object per narration, using its id:
+[{{"id": 0, "ledger": ""}}]
+
+NARRATIONS (id<TAB>narration):
+{lines}
+"""
+
+CHARS_PER_TOKEN = 4
+# {"id": 123, "ledger": "Office Expense"}, plus some slack
+OUTPUT_TOKENS_PER_ITEM = 16
+MAX_BATCH_ITEMS = 200
+
+# The reply arrived but was not a usable answer (bad JSON, missing "response")
+ANSWER_ERRORS = (ValueError, KeyError, TypeError)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class BatchClassifier:
+    """`provider` needs an async `agenerate(prompt) -> str`."""
+
+    def __init__(self, provider, context_tokens, ledgers=None):
+        self.provider = provider
+        self.context_tokens = context_tokens
+        self.ledgers = {l.casefold(): l for l in ledgers} if ledgers else None
+
+    # ---------- PROMPTS ----------
+    def build_prompt(self, batch):
+        hint = ''
+        if self.ledgers:
+            hint = ', choosing only from: ' + ', '.join(sorted(self.ledgers.values()))
+        lines = '\n'.join(f"{i}\t{narration}" for i, narration in batch)
+        return PROMPT.format(ledger_hint=hint, lines=lines)
+
+    def plan_batches(self, items):
+        """Greedy packing so prompt plus expected answer fits in the context window."""
+        budget = self.context_tokens - estimate_tokens(self.build_prompt([]))
+        batches, current, used = [], [], 0
+        for item in items:
+            cost = estimate_tokens(f"{item[0]}\t{item[1]}\n") + OUTPUT_TOKENS_PER_ITEM
+            if current and (used + cost > budget or len(current) >= MAX_BATCH_ITEMS):
+                batches.append(current)
+                current, used = [], 0
+            current.append(item)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    # ---------- PARSING ----------
+    def parse(self, raw, batch):
+        """{id: ledger} for the usable answers, or None when the reply is not a JSON array."""
+        start, end = raw.find('['), raw.rfind(']')
+        if start < 0 or end < start:
+            return None
+        try:
+            answers = json.loads(raw[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(answers, list):
+            return None
+
+        ids = {i for i, _ in batch}
+        parsed = {}
+        for answer in answers:
+            if not isinstance(answer, dict):
+                continue
+            i, ledger = answer.get('id'), answer.get('ledger')
+            if isinstance(i, str) and i.isdigit():
+                i = int(i)
+            if i not in ids or not isinstance(ledger, str) or not ledger.strip():
+                continue
+            ledger = ledger.strip()
+            if self.ledgers is not None:
+                ledger = self.ledgers.get(ledger.casefold())
+                if ledger is None:
+                    continue
+            parsed[i] = ledger
+        return parsed
+
+    # ---------- RUN ----------
+    async def aclassify(self, narrations):
+        narrations = list(narrations)
+        # Statements repeat narrations (ATM withdrawals, charges); ask about each once
+        unique = {}
+        keys = []
+        for narration in narrations:
+            key = _WHITESPACE_RE.sub(' ', narration or '').strip()
+            keys.append(key)
+            if key and key not in unique:
+                unique[key] = len(unique)
+        items = [(i, key) for key, i in unique.items()]
+
+        answers = {}
+        try:
+            # Retries join the same group, so the first transport error cancels every batch
+            async with asyncio.TaskGroup() as tasks:
+                for batch in self.plan_batches(items):
+                    tasks.create_task(self._run(batch, answers, tasks))
+        except BaseExceptionGroup as group:
+            raise group.exceptions[0]
+        return [answers.get(unique[key]) if key else None for key in keys]
+
+    async def _run(self, batch, answers, tasks):
+        try:
+            parsed = self.parse(await self.provider.agenerate(self.build_prompt(batch)), batch)
+        except ANSWER_ERRORS:
+            # Anything else (connection errors, timeouts) would fail a smaller batch the same way
+            parsed = None
+
+        if parsed is None:
+            if len(batch) > 1:
+                mid = len(batch) // 2
+                tasks.create_task(self._run(batch[:mid], answers, tasks))
+                tasks.create_task(self._run(batch[mid:], answers, tasks))
+            return
+
+        answers.update(parsed)
+        missing = [item for item in batch if item[0] not in parsed]
+        if missing and len(batch) > 1:
+            for item in missing:
+                tasks.create_task(self._run([item], answers, tasks))
@@ -0,0 +1,207 @@
+"""
+Local stand-in for an Ollama server, for benchmarks and tests.
+
+Speaks enough of the /api/generate protocol (plain and streamed NDJSON) for
+OllamaProvider. Answers come from the regex extractor so they are plausible
+and deterministic, and the latency / error / invalid-JSON profile is
+configurable:
+
+    server = FakeOllamaServer(latency=0.2, jitter=0.05, error_rate=0.02)
+    with server:
+        provider = OllamaProvider(base_url=server.url)
+
+or standalone: python -m apps.ai_bridge.fake_server --port 11434 --latency 0.2
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DOCUMENT_MARKER = "DOCUMENT TEXT:"
+NARRATION_RE = re.compile(r'^(\d+)\t(.*)$', re.MULTILINE)
+
+
+def answer_for(prompt):
+    """What the fake model "generates" for a prompt."""
+    if "NARRATIONS" in prompt:
+        return json.dumps([{"id": int(i), "ledger": "Suspense"} for i, _ in NARRATION_RE.findall(prompt)])
+
+    from .providers.regex_provider import RegexProvider
+
+    text = prompt.split(DOCUMENT_MARKER, 1)[-1]
+    result = RegexProvider().extract(text)
+    result["confidence"] = 70
+    return json.dumps(result)
+
+
+class FakeOllamaServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 invalid_json_rate=0.0, tokens_per_second=None, seed=None, load_time=0.0):
+        self.latency = latency  # seconds before the answer (or first token)
+        self.jitter = jitter  # +/- uniform, in seconds
+        self.error_rate = error_rate  # share of requests answered with HTTP 500
+        self.invalid_json_rate = invalid_json_rate  # share of answers cut off mid-JSON
+        self.tokens_per_second = tokens_per_second  # streamed generation speed; None = instant
+        self.load_time = load_time  # seconds the first request for a model waits for it to load
+        self.requests = 0
+        self.loaded_models = set()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._thread = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": m} for m in sorted(server.loaded_models)]})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != "/api/generate":
+                    self._send_json({"error": "not found"}, 404)
+                    return
+                try:
+                    server._generate(self, body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client stopped reading (early stop, timeout)
+
+            def _send_json(self, payload, status=200):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 256
+
+        self._httpd = Server((host, port), Handler)
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # ---------- BEHAVIOUR ----------
+    def _load(self, model):
+        if model in self.loaded_models:
+            return
+        # Concurrent first requests all wait for the same load, as with a real server
+        with self._load_lock:
+            if model not in self.loaded_models:
+                time.sleep(self.load_time)
+                self.loaded_models.add(model)
+
+    def _draw(self):
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.error_rate
+            invalid = self._rng.random() < self.invalid_json_rate
+        return delay, fail, invalid
+
+    def _generate(self, handler, body):
+        model = body.get("model", "")
+        prompt = body.get("prompt", "")
+        self._load(model)
+        if not prompt:
+            # Ollama only loads the model for an empty prompt (used for warm-up)
+            handler._send_json({"model": model, "response": "", "done": True})
+            return
+
+        delay, fail, invalid = self._draw()
+        time.sleep(delay)
+        if fail:
+            handler._send_json({"error": "model runner crashed"}, 500)
+            return
+
+        answer = answer_for(prompt)
+        if invalid:
+            answer = answer[:len(answer) // 2]
+
+        if not body.get("stream", True):
+            if self.tokens_per_second:
+                time.sleep(len(answer) / 4 / self.tokens_per_second)
+            handler._send_json({"model": model, "response": answer, "done": True})
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        for i in range(0, len(answer), 4):
+            self._write_chunk(handler, {"model": model, "response": answer[i:i + 4], "done": False})
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+        self._write_chunk(handler, {"model": model, "response": "", "done": True})
+        handler.wfile.write(b"0\r\n\r\n")
+
+    @staticmethod
+    def _write_chunk(handler, payload):
+        line = (json.dumps(payload) + "\n").encode()
+        handler.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        handler.wfile.flush()
+
+    # ---------- LIFECYCLE ----------
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-json-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float)
+    parser.add_argument("--load-time", type=float, default=0.0)
+    args = parser.parse_args()
+
+    # Answers use the regex extractor, which needs the Django app registry
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "acctproj.settings")
+    import django
+    django.setup()
+
+    server = FakeOllamaServer(
+        args.host, args.port, args.latency, args.jitter, args.error_rate,
+        args.invalid_json_rate, args.tokens_per_second, load_time=args.load_time,
+    )
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
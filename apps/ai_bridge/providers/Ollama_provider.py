@@ -1,15 +1,21 @@
+import asyncio
 import requests
 import json
-from .base import BaseAIProvider
+import threading
+import time
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from .base import BaseAIProvider, run_sync
+from ..classification import BatchClassifier
+from ..streaming import JSONFieldStream
 
+try:
+    import httpx
+except ImportError:  # async calls fall back to the sync client in a thread
+    httpx = None
 
-class OllamaProvider(BaseAIProvider):
-    def __init__(self, model="llama3.1"):
-        self.model = model
-        self.url = "http://localhost:11434/api/generate"
 
-    def extract(self, text: str) -> dict:
-        prompt = f"""
+PROMPT = """
 You are an expert Indian Chartered Accountant AI.
 
 Extract structured data from the document text below.
@@ -21,23 +27,65 @@ Return STRICT JSON only:
   "date": "",
   "total_amount": "",
   "tax_amount": "",
-  "confidence": 0-100
+  "confidence": 0-100,
+  "transactions": [{{"date": "", "description": "", "amount": "", "type": "debit|credit"}}]
 }}
 
+"transactions" lists bank statement entries; use [] for other documents.
+
 DOCUMENT TEXT:
 {text}
 """
 
+# A streamed generation is cut off as soon as these have all been written
+REQUIRED_KEYS = ("vendor", "invoice_no", "date", "total_amount", "tax_amount")
+
+
+class OllamaProvider(BaseAIProvider):
+    version = "2"  # transactions added to the prompt
+
+    def __init__(self, model=None, max_concurrency=4, timeout=None, stream=False, base_url=None, num_ctx=None,
+                 keep_alive=None):
+        self.model = model or getattr(settings, "OLLAMA_MODEL", "llama3.1")
+        base_url = base_url or getattr(settings, "OLLAMA_BASE_URL", "http://localhost:11434")
+        self.url = f"{base_url.rstrip('/')}/api/generate"
+        # Parse the response as it is generated and stop once REQUIRED_KEYS are in
+        self.stream = stream
+        self.required_keys = REQUIRED_KEYS
+        # Also the connection pool size, so parallel requests never wait for a socket
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout or getattr(settings, "OLLAMA_TIMEOUT", 120)
+        # Context window in tokens; sent to Ollama and used to size classification batches
+        self.num_ctx = num_ctx or getattr(settings, "OLLAMA_NUM_CTX", 4096)
+        # How long Ollama keeps the model loaded after a request (e.g. "30m"); None = server default
+        self.keep_alive = keep_alive or getattr(settings, "OLLAMA_KEEP_ALIVE", None)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    # ---------- SHARED ----------
+    def render_prompt(self, text: str) -> str:
+        return PROMPT.format(text=text)
+
+    def cache_identity(self) -> tuple:
+        # Streamed results stop early and so lack the trailing fields
+        return super().cache_identity() + (("stream",) if self.stream else ())
+
+    def build_payload(self, text: str, stream=False) -> dict:
+        return self._payload(self.render_prompt(text), stream)
+
+    def _payload(self, prompt: str, stream=False) -> dict:
         payload = {
             "model": self.model,
             "prompt": prompt,
-            "stream": False
-        }   
+            "stream": stream,
+            "options": {"num_ctx": self.num_ctx}
+        }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
 
-        response = requests.post(self.url, json=payload, timeout=120)
-        response.raise_for_status()
-
-        raw = response.json()["response"]
+    def parse_response(self, body: dict) -> dict:
+        raw = body["response"]
 
         try:
             return json.loads(raw)
@@ -46,3 +94,148 @@ DOCUMENT TEXT:
                 "error": "AI output not valid JSON",
                 "raw_response": raw
             }
+
+    def _feed_line(self, parser, line):
+        """Feed one NDJSON line of a streamed response; returns (new fields, stop?)."""
+        chunk = json.loads(line)
+        fields = parser.feed(chunk.get("response", ""))
+        stop = parser.done or parser.error is not None or parser.has_all(self.required_keys) or chunk.get("done")
+        return fields, stop
+
+    def finish_stream(self, parser) -> dict:
+        if parser.has_all(self.required_keys) or (parser.done and parser.error is None):
+            return dict(parser.fields)
+        return {
+            "error": "AI output not valid JSON",
+            "raw_response": parser.text,
+            "partial": dict(parser.fields),
+        }
+
+    # ---------- SYNC ----------
+    @property
+    def session(self):
+        """Keep-alive session shared by all calls (and threads) of this provider."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    # pool_block: no more than max_concurrency requests in flight across threads
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency, pool_block=True)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def extract(self, text: str) -> dict:
+        if httpx is not None:
+            # Same client, pool and concurrency limit as async callers, on the shared loop
+            return run_sync(self.aextract(text))
+        return self._extract_blocking(text)
+
+    def _extract_blocking(self, text: str) -> dict:
+        if self.stream:
+            parser = JSONFieldStream()
+            for _ in self._stream_fields(text, parser):
+                pass
+            return self.finish_stream(parser)
+
+        response = self.session.post(self.url, json=self.build_payload(text), timeout=self.timeout)
+        response.raise_for_status()
+        return self.parse_response(response.json())
+
+    def warm_up(self):
+        """
+        Preload the model (Ollama loads it for an empty prompt) and time a second
+        preload: "cold" includes loading the weights, "warm" is the resident model.
+        """
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            response = self.session.post(self.url, json=self._payload(""), timeout=self.timeout)
+            response.raise_for_status()
+            timings.append(time.perf_counter() - start)
+        return {"model": self.model, "cold": timings[0], "warm": timings[1]}
+
+    def generate(self, prompt: str) -> str:
+        """Raw completion for a ready-made prompt."""
+        response = self.session.post(self.url, json=self._payload(prompt), timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["response"]
+
+    def classify_transaction(self, narration: str):
+        return self.classify_transactions([narration])[0]
+
+    def classify_transactions(self, narrations, ledgers=None) -> list:
+        return run_sync(self.aclassify_transactions(narrations, ledgers))
+
+    def iter_fields(self, text: str):
+        """Yield (key, value) as each field of the answer is generated."""
+        return self._stream_fields(text, JSONFieldStream())
+
+    def _stream_fields(self, text, parser):
+        payload = self.build_payload(text, stream=True)
+        # Leaving the block early closes the connection, which stops the generation
+        with self.session.post(self.url, json=payload, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                fields, stop = self._feed_line(parser, line)
+                yield from fields
+                if stop:
+                    break
+
+    # ---------- ASYNC ----------
+    def _client(self):
+        state = self._loop_state()
+        if "client" not in state:
+            limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            state["client"] = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+        return state["client"]
+
+    async def _aextract(self, text: str) -> dict:
+        if httpx is None:
+            return await asyncio.to_thread(self._extract_blocking, text)
+        if self.stream:
+            parser = JSONFieldStream()
+            async for _ in self._astream_fields(text, parser):
+                pass
+            return self.finish_stream(parser)
+        response = await self._client().post(self.url, json=self.build_payload(text))
+        response.raise_for_status()
+        return self.parse_response(response.json())
+
+    async def agenerate(self, prompt: str) -> str:
+        async with self.limited():
+            if httpx is None:
+                return await asyncio.to_thread(self.generate, prompt)
+            response = await self._client().post(self.url, json=self._payload(prompt))
+            response.raise_for_status()
+            return response.json()["response"]
+
+    async def aclassify_transactions(self, narrations, ledgers=None) -> list:
+        """Many narrations per prompt, batches sized to num_ctx and run concurrently."""
+        return await BatchClassifier(self, self.num_ctx, ledgers).aclassify(narrations)
+
+    def aiter_fields(self, text: str):
+        """Async `iter_fields`. Not limited by the provider semaphore or timeout."""
+        return self._astream_fields(text, JSONFieldStream())
+
+    async def _astream_fields(self, text, parser):
+        payload = self.build_payload(text, stream=True)
+        async with self._client().stream("POST", self.url, json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                fields, stop = self._feed_line(parser, line)
+                for field in fields:
+                    yield field
+                if stop:
+                    break
+
+    async def aclose(self):
+        client = self._loop_state().pop("client", None)
+        if client is not None:
+            await client.aclose()
+        await super().aclose()
@@ -1,7 +1,59 @@
+import asyncio
+import contextlib
+import os
+import threading
+import weakref
 from abc import ABC, abstractmethod
 
 
+# ---------- BACKGROUND LOOP ----------
+class _BackgroundLoop:
+    """
+    One event loop per process, on a daemon thread, shared by every sync call.
+    Async clients and semaphores live per loop (see `_loop_state`), so keeping
+    this loop alive keeps their connection pools warm, and their concurrency
+    limits then hold across all threads of the worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+
+    def get(self):
+        with self._lock:
+            # A forked child inherits the loop object but not its thread
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="ai-provider-loop", daemon=True).start()
+                self._loop, self._pid = loop, os.getpid()
+            return self._loop
+
+
+_background_loop = _BackgroundLoop()
+
+
+def run_sync(coro):
+    """
+    Run `coro` on the shared background loop and block until it finishes.
+    Must not be called from a running event loop; await the coroutine there.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise RuntimeError("run_sync() cannot be called from a running event loop; await the coroutine")
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop.get()).result()
+
+
 class BaseAIProvider(ABC):
+    # Requests this provider runs at once (per event loop; all sync callers share one) and seconds allowed per request
+    max_concurrency = 4
+    timeout = 120
+    # Bump when a change alters the output for the same input (invalidates cached results)
+    version = "1"
 
     @abstractmethod
     def extract(self, text: str) -> dict:
@@ -9,3 +61,105 @@ class BaseAIProvider(ABC):
         Takes raw text and returns structured JSON
         """
         pass
+
+    def render_prompt(self, text: str) -> str:
+        """The prompt sent to the model for `text`."""
+        return text
+
+    def cache_identity(self) -> tuple:
+        """Everything besides the prompt that determines the result."""
+        return (type(self).__name__, self.version, getattr(self, "model", ""))
+
+    def warm_up(self):
+        """
+        Load whatever the first request would otherwise wait for (e.g. model weights).
+        Returns a report dict, or None when there is nothing to load.
+        """
+        return None
+
+    # ---------- TRANSACTION CLASSIFICATION ----------
+    def classify_transaction(self, narration: str):
+        """Ledger account for one bank statement narration."""
+        raise NotImplementedError(f"{type(self).__name__} cannot classify transactions")
+
+    def classify_transactions(self, narrations, ledgers=None) -> list:
+        """
+        Ledger account (None when unknown) for each narration, in input order.
+        Model-backed providers override this to classify many narrations per call.
+        """
+        results = []
+        for narration in narrations:
+            try:
+                results.append(self.classify_transaction(narration) if narration else None)
+            except NotImplementedError:
+                raise
+            except Exception:
+                results.append(None)
+        return results
+
+    # ---------- ASYNC ----------
+    async def _aextract(self, text: str) -> dict:
+        """
+        Non-blocking extraction; providers with an async client override this.
+        The default runs the sync `extract` in a worker thread.
+        """
+        return await asyncio.to_thread(self.extract, text)
+
+    async def aextract(self, text: str) -> dict:
+        """
+        Async `extract`, limited to `max_concurrency` calls in flight per provider.
+        Raises TimeoutError after `timeout` seconds; the request is cancelled, not leaked.
+        """
+        async with self.limited():
+            return await self._aextract(text)
+
+    @contextlib.asynccontextmanager
+    async def limited(self):
+        """Hold one of this provider's concurrency slots, under its timeout."""
+        async with self._loop_state()["semaphore"]:
+            async with asyncio.timeout(self.timeout):
+                yield
+
+    async def aextract_many(self, texts, max_concurrency=None) -> list:
+        """
+        Extract several documents concurrently; results come back in input order.
+        A failing document yields {"error": ...} instead of failing the batch.
+        `max_concurrency` can only lower the provider-wide limit.
+        """
+        limit = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def one(text):
+            try:
+                if limit is None:
+                    return await self.aextract(text)
+                async with limit:
+                    return await self.aextract(text)
+            except Exception as e:
+                return {"error": str(e) or type(e).__name__}
+
+        return list(await asyncio.gather(*(one(t) for t in texts)))
+
+    async def aclose(self):
+        """Release async resources bound to the running event loop."""
+        self._loop_states.pop(asyncio.get_running_loop(), None)
+
+    def _loop_state(self) -> dict:
+        # asyncio primitives and async clients belong to one event loop, so keep one set per loop
+        states = self._loop_states
+        loop = asyncio.get_running_loop()
+        if loop not in states:
+            states[loop] = {"semaphore": asyncio.Semaphore(self.max_concurrency)}
+        return states[loop]
+
+    @property
+    def _loop_states(self):
+        return self.__dict__.setdefault("_loop_states", weakref.WeakKeyDictionary())
+
+    # ---------- SYNC WRAPPERS ----------
+    def extract_many(self, texts, max_concurrency=None) -> list:
+        """
+        Blocking `aextract_many` for sync callers (views, the job worker), run on
+        the shared background loop so clients and limits outlive the call.
+        Must not be called from a running event loop; await `aextract_many` there.
+        """
+        return run_sync(self.aextract_many(texts, max_concurrency))
@@ -1,7 +1,18 @@
-from .base import AIProvider
+from .base import BaseAIProvider
 from decimal import Decimal
 
-class MockAIProvider(AIProvider):
+class MockAIProvider(BaseAIProvider):
+    def extract(self, text):
+        data = self.extract_invoice_data(None)
+        return {
+            "vendor": data["vendor_name"],
+            "invoice_no": None,
+            "date": data["invoice_date"],
+            "total_amount": data["total_amount"],
+            "tax_amount": data["gst_amount"],
+            "confidence": 50,
+        }
+
     def extract_invoice_data(self, file_path):
         # Simulated OCR and LLM Extraction
         return {
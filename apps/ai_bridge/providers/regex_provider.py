@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from core.extractor import scan_line
+from .base import BaseAIProvider
+
+
+class RegexProvider(BaseAIProvider):
+    """
+    Model-free extraction with the core line patterns.
+    Fast and always available, so the router falls back to it; lower confidence.
+    """
+    version = "1"
+    confidence = 30
+
+    def extract(self, text: str) -> dict:
+        result = {
+            "vendor": None,
+            "invoice_no": None,
+            "date": None,
+            "total_amount": None,
+            "tax_amount": None,
+            "confidence": self.confidence,
+            "transactions": [],
+        }
+        total_line_amount = None
+        largest = None
+        for raw_line in text.split("\n"):
+            line = raw_line.strip()
+            found = scan_line(line) if line else None
+            if not found:
+                continue
+            if result["vendor"] is None and found.get("vendor"):
+                result["vendor"] = found["vendor"].strip()
+            if result["invoice_no"] is None and found.get("invoice"):
+                result["invoice_no"] = found["invoice"]
+            if result["date"] is None and found.get("date"):
+                result["date"] = found["date"]
+            if result["tax_amount"] is None and found.get("tax_amount") and "tax" in line.lower():
+                result["tax_amount"] = found["tax_amount"]
+            amount = found.get("amount")
+            if amount:
+                if "total" in line.lower():
+                    total_line_amount = amount
+                if largest is None or Decimal(amount) > Decimal(largest):
+                    largest = amount
+        result["total_amount"] = total_line_amount or largest
+        return result
+
+    async def _aextract(self, text: str) -> dict:
+        # Cheap enough to run on the event loop
+        return self.extract(text)
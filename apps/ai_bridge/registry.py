@@ -0,0 +1,105 @@
+"""
+Named AI providers configured in settings.AI_PROVIDERS.
+
+Each entry names a provider class by dotted path, imported only when the
+provider is first used, with keyword arguments for it:
+
+    AI_PROVIDERS = {
+        "ollama": {
+            "BACKEND": "apps.ai_bridge.providers.Ollama_provider.OllamaProvider",
+            "OPTIONS": {"model": "llama3.1"},
+            "WARM_UP": True,
+        },
+        "router": {
+            "BACKEND": "apps.ai_bridge.services.router.ProviderRouter",
+            "ROUTES": ["ollama", "regex"],
+        },
+    }
+
+ROUTES builds a ProviderRouter over other entries. settings.AI_PROVIDER picks
+the one AIService uses. `warm_up` loads models ahead of the first document.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDERS = {
+    "ollama": {"BACKEND": "apps.ai_bridge.providers.Ollama_provider.OllamaProvider"},
+    "regex": {"BACKEND": "apps.ai_bridge.providers.regex_provider.RegexProvider"},
+    "mock": {"BACKEND": "apps.ai_bridge.providers.mock_provider.MockAIProvider"},
+    "router": {"BACKEND": "apps.ai_bridge.services.router.ProviderRouter", "ROUTES": ["ollama", "regex"]},
+}
+
+_providers = {}
+_providers_lock = threading.RLock()
+
+
+def provider_configs():
+    return getattr(settings, "AI_PROVIDERS", None) or DEFAULT_PROVIDERS
+
+
+def active_provider_name():
+    """The provider AIService uses, or None for its built-in mock output."""
+    return getattr(settings, "AI_PROVIDER", None)
+
+
+def create_provider(name):
+    """A new instance of the named provider (routes of a router are shared instances)."""
+    try:
+        config = provider_configs()[name]
+    except KeyError:
+        raise ImproperlyConfigured(f"Unknown AI provider {name!r}; add it to AI_PROVIDERS") from None
+    try:
+        backend = import_string(config["BACKEND"])
+    except (KeyError, ImportError) as e:
+        raise ImproperlyConfigured(f"AI provider {name!r} has no importable BACKEND: {e}") from e
+
+    options = dict(config.get("OPTIONS", {}))
+    if "ROUTES" in config:
+        options["routes"] = [(route, get_provider(route)) for route in config["ROUTES"]]
+    return backend(**options)
+
+
+def get_provider(name):
+    """The shared instance of the named provider, created on first use."""
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(name)
+            if provider is None:
+                provider = _providers[name] = create_provider(name)
+    return provider
+
+
+# ---------- WARM-UP ----------
+def warm_up(names=None):
+    """
+    Ask providers to load their models now. Defaults to the active provider and
+    every entry with "WARM_UP": True. Returns one report dict per provider;
+    failures are reported, not raised, so a worker still starts without its model server.
+    """
+    configs = provider_configs()
+    if names is None:
+        names = [name for name, config in configs.items() if config.get("WARM_UP")]
+        active = active_provider_name()
+        if active and active not in names:
+            names.insert(0, active)
+
+    reports = []
+    for name in names:
+        start = time.perf_counter()
+        try:
+            report = get_provider(name).warm_up()
+        except Exception as e:
+            logger.warning("Warm-up of AI provider %s failed: %s", name, e)
+            report = {"error": str(e) or type(e).__name__}
+        if report is None:
+            continue  # nothing to load
+        reports.append({"provider": name, "seconds": time.perf_counter() - start, **report})
+    return reports
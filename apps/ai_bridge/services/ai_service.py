@@ -1,16 +1,38 @@
-import json
-import os
+from functools import lru_cache
+
+from ..cache import CachedProvider, get_response_cache
+from ..chunking import ChunkedProvider
+from ..registry import active_provider_name, get_provider
+
 
 class AIService:
     """
     Dummy AI service for now.
     Later this will call real AI APIs (OpenAI, etc).
+
+    Pass a provider to extract with a model; by default it is the one named by
+    AI_PROVIDER in AI_PROVIDERS (see ai_bridge.registry), or none for the mock.
+    Long texts are split into chunks extracted in parallel, and each chunk's
+    result is cached when AI_CACHE_PATH is configured.
     """
 
+    def __init__(self, provider=None):
+        if provider is None and active_provider_name():
+            provider = get_provider(active_provider_name())
+        if provider is not None:
+            cache = get_response_cache()
+            if cache is not None:
+                provider = CachedProvider(provider, cache)
+            provider = ChunkedProvider(provider)
+        self.provider = provider
+
     def process_document(self, text: str) -> dict:
         """
         Takes OCR text and returns structured data.
         """
+        if self.provider is not None:
+            return self.provider.extract(text)
+
         # MOCK AI OUTPUT (SAFE FOR NOW)
         return {
             "vendor": None,
@@ -21,3 +43,9 @@ class AIService:
             "tax_amount": None,
             "confidence": 0.60
         }
+
+
+@lru_cache(maxsize=None)
+def get_ai_service():
+    """The shared AIService, built on first use rather than at import."""
+    return AIService()
@@ -0,0 +1,186 @@
+"""
+Latency-aware routing across AI providers.
+
+Providers are tried in order (e.g. Ollama, then the regex extractor). Each one
+has a ProviderHealth: rolling latency percentiles, error rate and a circuit
+breaker. A provider is skipped while its breaker is open, or while its p95
+latency does not fit in what is left of the latency budget. A call that
+overruns the budget is cancelled and counts as a failure. The last provider
+is the fallback: it always runs and should be cheap.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from ..providers.base import BaseAIProvider, run_sync
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    def __init__(self, window=200, failure_threshold=5, reset_timeout=30.0, min_samples=20):
+        self.samples = deque(maxlen=window)  # (seconds, ok)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.min_samples = min_samples
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.last_attempt = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    # ---------- CIRCUIT BREAKER ----------
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return CLOSED
+        return HALF_OPEN if time.monotonic() - self.opened_at >= self.reset_timeout else OPEN
+
+    def allow(self, remaining_budget):
+        """May this provider take a call that has `remaining_budget` seconds left?"""
+        now = time.monotonic()
+        with self._lock:
+            if self.opened_at is not None:
+                # After reset_timeout one trial call decides whether the breaker closes
+                if now - self.opened_at < self.reset_timeout or self._probing:
+                    return False
+                self._probing = True
+            elif remaining_budget <= 0:
+                return False
+            elif (len(self.samples) >= self.min_samples and self._percentile(0.95) > remaining_budget
+                  and now - self.last_attempt < self.reset_timeout):
+                # Too slow for this call; still let one through now and then to notice recovery
+                return False
+            self.last_attempt = now
+            return True
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self.samples.append((seconds, ok))
+            if ok:
+                self.consecutive_failures = 0
+                self.opened_at = None
+            else:
+                self.consecutive_failures += 1
+                if self._probing or self.consecutive_failures >= self.failure_threshold:
+                    self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """A call `allow` let through ended unrecorded (cancelled); let the next one probe."""
+        with self._lock:
+            self._probing = False
+
+    # ---------- STATS ----------
+    def _percentile(self, q):
+        latencies = sorted(s for s, _ in self.samples)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def snapshot(self):
+        with self._lock:
+            n = len(self.samples)
+            errors = sum(1 for _, ok in self.samples if not ok)
+            return {
+                "state": self.state,
+                "samples": n,
+                "p50": self._percentile(0.50),
+                "p95": self._percentile(0.95),
+                "error_rate": errors / n if n else 0.0,
+                "consecutive_failures": self.consecutive_failures,
+            }
+
+
+class ProviderRouter(BaseAIProvider):
+    """
+    `routes` is a list of (name, provider) in preference order; the last is the fallback.
+    Results carry "provider", and "fallback": True when the first choice was not used
+    (such results are not cached).
+    """
+
+    def __init__(self, routes, latency_budget=None, failure_threshold=None, reset_timeout=None):
+        if not routes:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.routes = list(routes)
+        self.latency_budget = latency_budget or getattr(settings, "AI_LATENCY_BUDGET", 20.0)
+        failure_threshold = failure_threshold or getattr(settings, "AI_BREAKER_FAILURES", 5)
+        reset_timeout = reset_timeout or getattr(settings, "AI_BREAKER_RESET", 30.0)
+        self.health = {
+            name: ProviderHealth(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+            for name, _ in self.routes
+        }
+        self.max_concurrency = max(p.max_concurrency for _, p in self.routes)
+        self.timeout = self.latency_budget
+
+    # Cache entries belong to the first choice; fallback results are never cached
+    def render_prompt(self, text: str) -> str:
+        return self.routes[0][1].render_prompt(text)
+
+    def cache_identity(self) -> tuple:
+        return self.routes[0][1].cache_identity()
+
+    def warm_up(self):
+        routes = {}
+        for name, provider in self.routes:
+            try:
+                report = provider.warm_up()
+            except Exception as e:
+                report = {"error": str(e) or type(e).__name__}
+            if report is not None:
+                routes[name] = report
+        return {"routes": routes} if routes else None
+
+    def extract(self, text: str) -> dict:
+        # On the shared loop, so routes keep their clients and concurrency limits between calls
+        return run_sync(self.aextract(text))
+
+    async def aextract(self, text: str) -> dict:
+        start = time.monotonic()
+        last_error = None
+        for i, (name, provider) in enumerate(self.routes):
+            is_fallback = i == len(self.routes) - 1
+            health = self.health[name]
+            remaining = self.latency_budget - (time.monotonic() - start)
+            if not is_fallback and not health.allow(remaining):
+                continue
+
+            t0 = time.monotonic()
+            try:
+                if is_fallback:
+                    result = await provider.aextract(text)
+                else:
+                    async with asyncio.timeout(remaining):
+                        result = await provider.aextract(text)
+            except Exception as e:
+                health.record(time.monotonic() - t0, False)
+                last_error = f"{name}: {str(e) or type(e).__name__}"
+                continue
+            except BaseException:
+                # Cancelled from outside (caller timeout, gather); says nothing about the provider
+                health.release()
+                raise
+
+            ok = "error" not in result
+            health.record(time.monotonic() - t0, ok)
+            if ok or is_fallback:
+                result = dict(result, provider=name)
+                if i > 0:
+                    result["fallback"] = True
+                return result
+            last_error = f"{name}: {result['error']}"
+        return {"error": f"All providers failed ({last_error})"}
+
+    async def aclose(self):
+        for _, provider in self.routes:
+            await provider.aclose()
+        await super().aclose()
+
+    def stats(self):
+        return {name: self.health[name].snapshot() for name, _ in self.routes}
+
@@ -0,0 +1,129 @@
+"""
+Incremental parsing of a JSON object that arrives in pieces (streamed tokens).
+
+`JSONFieldStream.feed(chunk)` returns the top-level fields completed by that
+chunk, so callers can act on `vendor` before the model has finished writing
+`tax_amount`, and stop the stream once every field they need is in. Text before
+the opening brace (models like to announce their JSON) is skipped.
+"""
+import json
+
+_WHITESPACE = ' \t\r\n'
+
+
+class JSONFieldStream:
+    def __init__(self):
+        self.fields = {}
+        self.done = False  # closing brace seen
+        self.error = None
+        self._text = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = 'start'  # start, key, colon, value, primitive, comma
+        self._key = None
+        self._start = 0
+
+    @property
+    def text(self):
+        return self._text
+
+    def feed(self, chunk):
+        """Consume more text; returns [(key, value), ...] completed by it."""
+        self._text += chunk
+        completed = []
+        text = self._text
+        i = self._pos
+        while i < len(text) and not self.done and self.error is None:
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._string_closed(i, completed)
+            elif self._depth > 1:
+                if c == '"':
+                    self._in_string = True
+                elif c in '{[':
+                    self._depth += 1
+                elif c in '}]':
+                    self._depth -= 1
+                    if self._depth == 1:
+                        self._emit(text[self._start:i + 1], completed)
+            else:
+                self._structural(c, i, completed)
+            i += 1
+        self._pos = i
+        return completed
+
+    # ---------- TOP LEVEL ----------
+    def _structural(self, c, i, completed):
+        if self._expect == 'primitive':
+            # Numbers, true/false/null end at the next delimiter
+            if c not in ',}' and c not in _WHITESPACE:
+                return
+            self._emit(self._text[self._start:i], completed)
+            if self.error:
+                return
+        if c in _WHITESPACE:
+            return
+
+        expect = self._expect
+        if expect == 'start':
+            if c == '{':
+                self._depth = 1
+                self._expect = 'key'
+        elif expect == 'key':
+            if c == '"':
+                self._in_string = True
+                self._start = i
+            elif c == '}':
+                self.done = True
+            else:
+                self.error = f"Expected a key at offset {i}"
+        elif expect == 'colon':
+            if c == ':':
+                self._expect = 'value'
+            else:
+                self.error = f"Expected ':' at offset {i}"
+        elif expect == 'value':
+            self._start = i
+            if c == '"':
+                self._in_string = True
+            elif c in '{[':
+                self._depth += 1
+            else:
+                self._expect = 'primitive'
+        elif expect == 'comma':
+            if c == ',':
+                self._expect = 'key'
+            elif c == '}':
+                self.done = True
+            else:
+                self.error = f"Expected ',' or '}}' at offset {i}"
+
+    def _string_closed(self, i, completed):
+        raw = self._text[self._start:i + 1]
+        if self._expect == 'key':
+            self._key = json.loads(raw)
+            self._expect = 'colon'
+        else:
+            self._emit(raw, completed)
+
+    def _emit(self, raw, completed):
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            self.error = f"Invalid value for '{self._key}': {raw[:50]}"
+            return
+        self.fields[self._key] = value
+        completed.append((self._key, value))
+        self._expect = 'comma'
+
+    def has_all(self, keys):
+        return all(k in self.fields for k in keys)
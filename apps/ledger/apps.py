@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class LedgerConfig(AppConfig):
+    name = 'apps.ledger'
+    label = 'ledger'
+
+    def ready(self):
+        from . import signals
+        post_migrate.connect(signals.backfill_after_migrate, sender=self)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ledger.models import Account
+from apps.ledger.services.balance_service import rebuild_balances, verify_balances
+
+
+class Command(BaseCommand):
+    help = "Verify stored account balances against the journal entries, or rebuild them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--business', action='append', help="Business id; repeat for several. Default: all")
+        parser.add_argument('--rebuild', action='store_true', help="Recompute and store every balance")
+
+    def handle(self, *args, **opts):
+        accounts = Account.objects.all()
+        if opts['business']:
+            accounts = accounts.filter(business_id__in=opts['business'])
+
+        if opts['rebuild']:
+            count = rebuild_balances(accounts)
+            self.stdout.write(f"Rebuilt {count} account balances.")
+            return
+
+        mismatches = verify_balances(accounts)
+        for account_id, field, stored, actual in mismatches:
+            self.stdout.write(f"Account {account_id}: {field} stored {stored}, entries give {actual}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} balance mismatch(es); run with --rebuild to fix.")
+        self.stdout.write("All account balances match their entries.")
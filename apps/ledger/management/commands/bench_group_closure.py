@@ -0,0 +1,116 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.accounts.models import Business, Organization
+from apps.ledger.models import Account, AccountGroup
+from apps.ledger.services.closure_service import rebuild_closure, verify_closure, walk_descendants
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark subtree queries on a synthetic chart of accounts: closure table "
+        "vs. walking AccountGroup.parent level by level. Everything is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groups', type=int, default=5000, help="Groups in the synthetic chart")
+        parser.add_argument('--fanout', type=int, default=4, help="Subgroups per group")
+        parser.add_argument('--accounts', type=int, default=2, help="Accounts per group")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per query")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **opts):
+        if opts['groups'] < 1 or opts['fanout'] < 1:
+            raise CommandError("--groups and --fanout must be at least 1.")
+        random.seed(opts['seed'])
+        try:
+            with transaction.atomic():
+                self.run(opts)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, opts):
+        organization = Organization.objects.create(name="Benchmark", registration_number=f"bench-{random.random()}")
+        business = Business.objects.create(organization=organization, name="Benchmark")
+
+        # ---------- BUILD ----------
+        # Breadth first, so depth grows like log(groups) / log(fanout)
+        start = time.perf_counter()
+        root = AccountGroup.objects.create(business=business, name="G0", classification="ASSET")
+        groups = [root]
+        depth = {root.id: 0}
+        for index in range(1, opts['groups']):
+            parent = groups[(index - 1) // opts['fanout']]
+            group = AccountGroup.objects.create(business=business, name=f"G{index}", classification="ASSET", parent=parent)
+            groups.append(group)
+            depth[group.id] = depth[parent.id] + 1
+        built = time.perf_counter() - start
+        Account.objects.bulk_create([
+            Account(business=business, group=group, name=f"A{group.name}-{n}")
+            for group in groups for n in range(opts['accounts'])
+        ], batch_size=1000)
+
+        chart = AccountGroup.objects.filter(business=business)
+        start = time.perf_counter()
+        rebuild_closure(chart)
+        rebuilt = time.perf_counter() - start
+        self.stdout.write(
+            f"Chart: {len(groups)} groups, depth {max(depth.values())}, {len(groups) * opts['accounts']} accounts"
+        )
+        self.stdout.write(f"Created group by group (closure kept in sync): {built:.2f}s; full rebuild: {rebuilt:.3f}s")
+
+        # ---------- QUERY ----------
+        by_depth = {}
+        for group in groups:
+            by_depth.setdefault(depth[group.id], group)
+        self.stdout.write(f"{'depth':>5} {'accounts':>9} {'walk ms':>9} {'walk q':>7} {'closure ms':>11} {'closure q':>10}")
+        for level, group in sorted(by_depth.items()):
+            walk = self.measure(opts['repeat'], lambda: list(
+                Account.objects.filter(group_id__in=walk_descendants(group)).values_list('id', flat=True)
+            ))
+            closure = self.measure(opts['repeat'], lambda: list(
+                Account.objects.under_group(group).values_list('id', flat=True)
+            ))
+            if sorted(walk[0]) != sorted(closure[0]):
+                raise CommandError(f"Closure and walk disagree under {group.name}.")
+            self.stdout.write(
+                f"{level:>5} {len(closure[0]):>9} {walk[1]:>9.2f} {walk[2]:>7} {closure[1]:>11.2f} {closure[2]:>10}"
+            )
+
+        # ---------- MOVE ----------
+        subtree = by_depth[min(2, max(by_depth))]
+        target = groups[-1]
+        if subtree.pk != root.pk and target.pk not in walk_descendants(subtree):
+            start = time.perf_counter()
+            subtree.parent = target
+            subtree.save()
+            moved = time.perf_counter() - start
+            self.stdout.write(f"Moved a {len(walk_descendants(subtree))}-group subtree in {moved * 1000:.1f}ms")
+        missing, unexpected = verify_closure(chart)
+        self.stdout.write(f"Closure check: {missing} missing, {unexpected} unexpected")
+
+    def measure(self, repeat, query):
+        """(result, median ms, queries per run)."""
+        timings = []
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        for _ in range(repeat):
+            queries.clear()
+            with connection.execute_wrapper(count):
+                start = time.perf_counter()
+                result = query()
+                timings.append((time.perf_counter() - start) * 1000)
+        return result, statistics.median(timings), len(queries)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ledger.models import AccountGroup
+from apps.ledger.services.closure_service import rebuild_closure, verify_closure
+
+
+class Command(BaseCommand):
+    help = "Verify the AccountGroup closure table against the group parents, or rebuild it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--business', action='append', help="Business id; repeat for several. Default: all")
+        parser.add_argument('--rebuild', action='store_true', help="Recompute and store every closure row")
+
+    def handle(self, *args, **opts):
+        groups = AccountGroup.objects.all()
+        if opts['business']:
+            groups = groups.filter(business_id__in=opts['business'])
+
+        if opts['rebuild']:
+            count = rebuild_closure(groups)
+            self.stdout.write(f"Rebuilt {count} closure rows.")
+            return
+
+        missing, unexpected = verify_closure(groups)
+        if missing or unexpected:
+            raise CommandError(
+                f"{missing} missing and {unexpected} unexpected closure row(s); run with --rebuild to fix."
+            )
+        self.stdout.write("The group closure table matches the group parents.")
@@ -0,0 +1,63 @@
+import shutil
+from pathlib import Path
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounts.models import Business
+from apps.ledger.models import VoucherImport
+from apps.ledger.services.import_service import ImportBusy, create_import, detect_format, run_import
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV or JSON Lines day book into vouchers, committing in chunks; resumable."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="Day book file (.csv or .jsonl)")
+        parser.add_argument('--business', help="Business id")
+        parser.add_argument('--format', choices=[c for c, _ in VoucherImport.Format.choices],
+                            help="Default: from the file extension")
+        parser.add_argument('--chunk-size', type=int, help="Vouchers per transaction")
+        parser.add_argument('--resume', metavar='IMPORT_ID', help="Continue an interrupted import after its checkpoint")
+        parser.add_argument('--errors', metavar='PATH', help="Also copy the error report of rejected rows here")
+
+    def handle(self, *args, **opts):
+        if opts['resume']:
+            voucher_import = VoucherImport.objects.select_related('business').filter(pk=opts['resume']).first()
+            if voucher_import is None:
+                raise CommandError(f"No import {opts['resume']}.")
+            if voucher_import.status == VoucherImport.Status.COMPLETED:
+                raise CommandError(f"Import {voucher_import.id} has already completed.")
+            self.stdout.write(f"Resuming import {voucher_import.id} after row {voucher_import.checkpoint_row}")
+        else:
+            if not opts['path'] or not opts['business']:
+                raise CommandError("Give a file and --business, or --resume IMPORT_ID.")
+            business = Business.objects.filter(pk=opts['business']).first()
+            if business is None:
+                raise CommandError(f"No business {opts['business']}.")
+            path = Path(opts['path'])
+            file_format = opts['format'] or detect_format(path.name)
+            with open(path, 'rb') as f:
+                voucher_import = create_import(business, File(f), file_format, opts['chunk_size'], path.name)
+            self.stdout.write(f"Import {voucher_import.id} started")
+
+        try:
+            voucher_import = run_import(voucher_import)
+        except ImportBusy as e:
+            raise CommandError(str(e)) from e
+        except Exception as e:
+            raise CommandError(
+                f"Import stopped after row {voucher_import.checkpoint_row} ({e}); "
+                f"continue with --resume {voucher_import.id}"
+            ) from e
+
+        self.stdout.write(
+            f"Import {voucher_import.id}: {voucher_import.rows_read} rows, "
+            f"{voucher_import.vouchers_accepted} vouchers posted, {voucher_import.vouchers_rejected} rejected"
+        )
+        if voucher_import.vouchers_rejected:
+            report = voucher_import.error_report.path
+            if opts['errors']:
+                shutil.copyfile(report, opts['errors'])
+                report = opts['errors']
+            self.stdout.write(f"Rejected rows: {report}")
@@ -0,0 +1,42 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.ledger.services.import_service import claim_next_import, release_stale_imports, run_import
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run queued voucher imports (uploads and resumes from the API), one at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds between queue checks")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+
+    def handle(self, *args, **opts):
+        released = release_stale_imports()
+        if released:
+            self.stdout.write(f"Requeued {released} stale import(s)")
+
+        while True:
+            voucher_import = claim_next_import()
+            if voucher_import is None:
+                if opts['once']:
+                    break
+                time.sleep(opts['poll_interval'])
+                continue
+
+            try:
+                run_import(voucher_import, claimed=True)
+            except Exception:
+                # Already recorded on the import as FAILED; resumable from its checkpoint
+                logger.exception("Import %s stopped after row %s", voucher_import.id, voucher_import.checkpoint_row)
+            finally:
+                close_old_connections()
+            self.stdout.write(
+                f"Import {voucher_import.id}: {voucher_import.status}, {voucher_import.rows_read} rows, "
+                f"{voucher_import.vouchers_accepted} posted, {voucher_import.vouchers_rejected} rejected"
+            )
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from apps.accounts.models import Organization, Business
 import uuid
@@ -14,6 +14,18 @@ class FinancialYear(models.Model):
     def __str__(self):
         return f"{self.business.name}: {self.start_date.year}-{self.end_date.year}"
 
+class AccountGroupQuerySet(models.QuerySet):
+    def descendants_of(self, group, include_self=True):
+        """Every group under `group` (any depth), in one query on AccountGroupClosure."""
+        # One filter() call, so both conditions apply to the same closure row
+        depth = {} if include_self else {'ancestor_links__depth__gt': 0}
+        return self.filter(ancestor_links__ancestor=group, **depth)
+
+    def ancestors_of(self, group, include_self=True):
+        """The path from the root down to `group`."""
+        depth = {} if include_self else {'descendant_links__depth__gt': 0}
+        return self.filter(descendant_links__descendant=group, **depth).order_by('-descendant_links__depth')
+
 class AccountGroup(models.Model):
     """
     Hierarchical groups for the Chart of Accounts.
@@ -34,9 +46,40 @@ class AccountGroup(models.Model):
     
     classification = models.CharField(max_length=20, choices=Classification.choices)
 
+    objects = AccountGroupQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # The cycle check (pre_save) and the closure links (post_save) commit or roll back with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} ({self.business.name})"
 
+class AccountGroupClosure(models.Model):
+    """
+    One row per (ancestor, descendant) pair of AccountGroups, itself included at
+    depth 0. Kept in sync by ledger.signals (see services.closure_service), so
+    subtree queries are a single indexed join instead of a walk up `parent`.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    ancestor = models.ForeignKey(AccountGroup, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(AccountGroup, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        indexes = [models.Index(fields=['descendant', 'depth'])]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+class AccountQuerySet(models.QuerySet):
+    def under_group(self, group, include_self=True):
+        """Accounts in `group` or any group below it, in one query."""
+        depth = {} if include_self else {'group__ancestor_links__depth__gt': 0}
+        return self.filter(group__ancestor_links__ancestor=group, **depth)
+
 class Account(models.Model):
     """
     The actual Ledger Account.
@@ -47,6 +90,8 @@ class Account(models.Model):
     name = models.CharField(max_length=255)
     code = models.CharField(max_length=50, blank=True, null=True) # Optional accounting code
     opening_balance = models.DecimalField(max_digits=20, decimal_places=2, default=0.00)
+
+    objects = AccountQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.name} | {self.group.name}"
@@ -102,3 +147,77 @@ class JournalEntry(models.Model):
 
     def __str__(self):
         return f"{self.account.name}: {self.debit if self.debit > 0 else self.credit}"
+
+class AccountBalance(models.Model):
+    """
+    Running debit/credit totals of an account, kept in step with its journal
+    entries (see apps.ledger.services.balance_service). Posted and draft
+    vouchers are totalled apart.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    account = models.OneToOneField(Account, on_delete=models.CASCADE, related_name='running_balance')
+
+    posted_debit = models.DecimalField(max_digits=20, decimal_places=2, default=0.00)
+    posted_credit = models.DecimalField(max_digits=20, decimal_places=2, default=0.00)
+    draft_debit = models.DecimalField(max_digits=20, decimal_places=2, default=0.00)
+    draft_credit = models.DecimalField(max_digits=20, decimal_places=2, default=0.00)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def balance(self):
+        """Opening balance plus posted entries (drafts excluded)."""
+        return self.account.opening_balance + self.posted_debit - self.posted_credit
+
+    def __str__(self):
+        return f"{self.account.name}: {self.balance}"
+
+class ReportVersion(models.Model):
+    """
+    Version of a business's ledger data, bumped in the same transaction as any
+    change to its vouchers, accounts or groups. Cached reports are keyed on it
+    (see apps.ledger.services.report_service).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    business = models.OneToOneField(Business, on_delete=models.CASCADE, related_name='report_version')
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.business.name}: v{self.version}"
+
+class VoucherImport(models.Model):
+    """
+    A day book (CSV or JSON Lines) being loaded into vouchers in chunks.
+    `checkpoint_row` is the last source row whose voucher is committed; a
+    resumed import skips everything up to it and cuts the error report back
+    to `error_report_bytes`.
+    """
+    class Format(models.TextChoices):
+        CSV = 'CSV', 'CSV'
+        JSONL = 'JSONL', 'JSON Lines'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        COMPLETED = 'COMPLETED', 'Completed'
+        FAILED = 'FAILED', 'Failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='voucher_imports')
+    source = models.FileField(upload_to='voucher_imports/')
+    file_format = models.CharField(max_length=10, choices=Format.choices)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    chunk_size = models.PositiveIntegerField(default=500)  # vouchers per transaction
+
+    rows_read = models.PositiveIntegerField(default=0)
+    vouchers_accepted = models.PositiveIntegerField(default=0)
+    vouchers_rejected = models.PositiveIntegerField(default=0)
+    checkpoint_row = models.PositiveIntegerField(default=0)
+
+    error_report = models.FileField(upload_to='voucher_imports/errors/', blank=True)
+    error_report_bytes = models.PositiveBigIntegerField(default=0)  # report length as of checkpoint_row
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.file_format} import {self.id} ({self.status})"
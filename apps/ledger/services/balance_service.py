@@ -0,0 +1,156 @@
+"""
+Materialized account balances.
+
+`compute_balances` totals journal entries for many accounts in one grouped
+query. Every account gets its AccountBalance row when it is created, and the
+row is then kept current with deltas: signals cover single entry/voucher saves
+and deletes (admin edits, cascades, posting a draft), and bulk writers call
+`apply_entry_changes` themselves in the same transaction as the entries
+(LedgerService.post_vouchers uses bulk_create, which sends no signals).
+
+Accounts from before this, or from bulk_create, are backfilled after
+`migrate` and on first read. A full compute only ever overwrites rows it holds
+locked, and a writer that finds no row computes one inside its own
+transaction, so an in-flight delta is never lost to a concurrent rebuild.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from ..models import Account, AccountBalance
+
+ZERO = Decimal('0.00')
+TOTAL_FIELDS = ('posted_debit', 'posted_credit', 'draft_debit', 'draft_credit')
+
+
+def _total(expression, **filters):
+    return Coalesce(Sum(expression, filter=Q(**filters)), Value(ZERO), output_field=DecimalField())
+
+
+# ---------- FULL COMPUTE ----------
+def compute_balances(accounts):
+    """{account_id: {posted_debit, posted_credit, draft_debit, draft_credit}} in one query."""
+    rows = accounts.order_by().values('id').annotate(
+        posted_debit=_total('journalentry__debit', journalentry__voucher__is_draft=False),
+        posted_credit=_total('journalentry__credit', journalentry__voucher__is_draft=False),
+        draft_debit=_total('journalentry__debit', journalentry__voucher__is_draft=True),
+        draft_credit=_total('journalentry__credit', journalentry__voucher__is_draft=True),
+    )
+    return {row.pop('id'): row for row in rows}
+
+
+def _insert_balances(totals):
+    """
+    Insert rows from {account_id: totals} where the account has none yet;
+    returns the account ids inserted here. Where another writer got there first
+    its row stands, since it may already hold deltas these totals cannot see.
+    """
+    rows = [AccountBalance(account_id=account_id, **row) for account_id, row in totals.items()]
+    AccountBalance.objects.bulk_create(rows, ignore_conflicts=True, batch_size=500)
+    return set(AccountBalance.objects.filter(id__in=[r.id for r in rows]).values_list('account_id', flat=True))
+
+
+def rebuild_balances(accounts):
+    """Recompute and store the balances of `accounts` (a queryset); returns how many."""
+    with transaction.atomic():
+        # Wait for writers holding a row, so the totals below include their entries
+        locked = set(
+            AccountBalance.objects.select_for_update().filter(account__in=accounts).values_list('account_id', flat=True)
+        )
+        totals = compute_balances(accounts)
+        AccountBalance.objects.bulk_create(
+            [AccountBalance(account_id=account_id, **row) for account_id, row in totals.items() if account_id in locked],
+            update_conflicts=True,
+            unique_fields=['account'],
+            update_fields=list(TOTAL_FIELDS),
+            batch_size=500,
+        )
+        _insert_balances({account_id: row for account_id, row in totals.items() if account_id not in locked})
+    return len(totals)
+
+
+def ensure_balances(accounts):
+    """Build the missing balance rows of `accounts` (a queryset), leaving existing ones alone; returns how many."""
+    with transaction.atomic():
+        return len(_insert_balances(compute_balances(accounts.filter(running_balance__isnull=True))))
+
+
+def verify_balances(accounts):
+    """
+    (account_id, field, stored, actual) for every stored total that disagrees
+    with the entries; stored is None for every field of an account without a row.
+    """
+    stored = {
+        b.account_id: b for b in AccountBalance.objects.filter(account__in=accounts)
+    }
+    mismatches = []
+    for account_id, row in compute_balances(accounts).items():
+        balance = stored.get(account_id)
+        for field in TOTAL_FIELDS:
+            value = getattr(balance, field) if balance is not None else None
+            if value != row[field]:
+                mismatches.append((account_id, field, value, row[field]))
+    return mismatches
+
+
+# ---------- INCREMENTAL ----------
+def apply_entry_changes(added=(), removed=()):
+    """
+    Fold journal entries into the stored balances after they were written or deleted.
+    Entries are (account_id, is_draft, debit, credit). An account without a row
+    gets one computed here, inside the writer's transaction, so it includes them.
+    """
+    deltas = {}
+    for entries, sign in ((added, 1), (removed, -1)):
+        for account_id, is_draft, debit, credit in entries:
+            delta = deltas.setdefault(account_id, [ZERO, ZERO, ZERO, ZERO])
+            offset = 2 if is_draft else 0
+            delta[offset] += Decimal(str(debit or 0)) * sign
+            delta[offset + 1] += Decimal(str(credit or 0)) * sign
+
+    def update(account_id, delta):
+        # One UPDATE with F() so concurrent posters never overwrite each other's totals
+        return AccountBalance.objects.filter(account_id=account_id).update(
+            **{field: F(field) + amount for field, amount in zip(TOTAL_FIELDS, delta)}
+        )
+
+    with transaction.atomic():
+        missing = []
+        for account_id, delta in deltas.items():
+            if any(delta) and not update(account_id, delta):
+                missing.append(account_id)
+        if missing:
+            inserted = _insert_balances(compute_balances(Account.objects.filter(id__in=missing)))
+            for account_id in missing:
+                if account_id not in inserted:
+                    # Built meanwhile by a transaction that could not see these entries
+                    update(account_id, deltas[account_id])
+
+
+# ---------- READ ----------
+def get_balances(accounts):
+    """
+    {account_id: AccountBalance} for an iterable of accounts. Pass accounts
+    fetched with select_related('running_balance') to read them without queries;
+    missing rows are built together with one grouped query.
+    """
+    balances = {}
+    missing = []
+    for account in accounts:
+        try:
+            balances[account.id] = account.running_balance
+        except AccountBalance.DoesNotExist:
+            missing.append(account)
+
+    if missing:
+        ensure_balances(Account.objects.filter(id__in=[a.id for a in missing]))
+        built = AccountBalance.objects.filter(account_id__in=[a.id for a in missing])
+        by_account = {a.id: a for a in missing}
+        for balance in built:
+            # Reuse the caller's account (and its select_related group) for .balance
+            balance.account = by_account[balance.account_id]
+            balance.account.running_balance = balance
+            balances[balance.account_id] = balance
+    return balances
@@ -0,0 +1,141 @@
+"""
+AccountGroup closure table.
+
+AccountGroupClosure holds a row for every (ancestor, descendant) pair, so
+"everything under Current Assets" is one indexed join
+(AccountGroup.objects.descendants_of / Account.objects.under_group) instead of
+one query per level of `parent`. Signals keep it in sync: a new group copies
+its parent's ancestor rows one level deeper, a move re-links the whole subtree
+under the new parent, and deletes cascade. Writers that skip signals
+(bulk_create, raw fixtures) call `rebuild_closure` afterwards; groups from
+before the table existed are linked by `ensure_closure` after migrate.
+
+AccountGroup.save is atomic, so a group row and its links commit together,
+and `lock_links` makes creates and moves that touch the same part of the
+tree take turns, so two concurrent moves cannot close a cycle.
+"""
+from django.db import transaction
+
+from ..models import AccountGroup, AccountGroupClosure
+
+BULK_BATCH_SIZE = 1000
+
+
+# ---------- INCREMENTAL ----------
+def lock_links(group_id, parent_id):
+    """
+    Row-lock `group_id`'s subtree and the path from the root down to `parent_id`,
+    in id order, until the transaction ends. Moves that could form a cycle
+    between them, or re-link the same rows, share a locked group; the second
+    waits and then reads the first one's links.
+    """
+    ids = set(AccountGroupClosure.objects.filter(ancestor_id=group_id).values_list('descendant_id', flat=True))
+    ids.add(group_id)
+    if parent_id:
+        ids.update(AccountGroupClosure.objects.filter(descendant_id=parent_id).values_list('ancestor_id', flat=True))
+        ids.add(parent_id)
+    list(AccountGroup.objects.select_for_update().filter(id__in=ids).order_by('id').values_list('id', flat=True))
+
+
+def add_group(group):
+    """Links of a newly created group: itself at depth 0, then its parent's ancestors one level further."""
+    links = [AccountGroupClosure(ancestor_id=group.id, descendant_id=group.id, depth=0)]
+    if group.parent_id:
+        above = AccountGroupClosure.objects.filter(descendant_id=group.parent_id).values_list('ancestor_id', 'depth')
+        links += [
+            AccountGroupClosure(ancestor_id=ancestor_id, descendant_id=group.id, depth=depth + 1)
+            for ancestor_id, depth in above
+        ]
+    AccountGroupClosure.objects.bulk_create(links)
+
+
+def move_group(group):
+    """Re-link `group` and its subtree under its current parent (or make it a root)."""
+    with transaction.atomic():
+        subtree = list(AccountGroupClosure.objects.filter(ancestor_id=group.id).values_list('descendant_id', 'depth'))
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+        # Links from the old ancestors into the subtree go; links inside it stay as they are
+        AccountGroupClosure.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+        if not group.parent_id:
+            return
+        above = list(AccountGroupClosure.objects.filter(descendant_id=group.parent_id).values_list('ancestor_id', 'depth'))
+        AccountGroupClosure.objects.bulk_create([
+            AccountGroupClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=up + down + 1)
+            for ancestor_id, up in above
+            for descendant_id, down in subtree
+        ], batch_size=BULK_BATCH_SIZE)
+
+
+def is_in_subtree(group_id, candidate_id):
+    """Whether `candidate_id` is `group_id` or below it; a parent there would make a cycle."""
+    return AccountGroupClosure.objects.filter(ancestor_id=group_id, descendant_id=candidate_id).exists()
+
+
+# ---------- FULL COMPUTE ----------
+def compute_closure(groups):
+    """{(ancestor_id, descendant_id): depth} for `groups` (a queryset), from `parent` alone."""
+    parents = dict(groups.values_list('id', 'parent_id'))
+    paths = {}
+    for group_id in parents:
+        # Walk up to the first group whose path is known; cut at a cycle or a parent outside `groups`
+        chain = []
+        current = group_id
+        while current in parents and current not in paths and current not in chain:
+            chain.append(current)
+            current = parents[current]
+        known = paths.get(current, [])
+        for node in reversed(chain):
+            known = [node] + known
+            paths[node] = known
+
+    return {
+        (ancestor_id, descendant_id): depth
+        for descendant_id, path in paths.items()
+        for depth, ancestor_id in enumerate(path)
+    }
+
+
+def rebuild_closure(groups):
+    """Replace the closure rows of `groups` (a queryset, whole businesses) with ones computed from `parent`."""
+    with transaction.atomic():
+        # Same order as lock_links, so a rebuild and a move take turns instead of deadlocking
+        list(groups.select_for_update().order_by('id').values_list('id', flat=True))
+        links = compute_closure(groups)
+        AccountGroupClosure.objects.filter(descendant__in=groups).delete()
+        AccountGroupClosure.objects.bulk_create([
+            AccountGroupClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth)
+            for (ancestor_id, descendant_id), depth in links.items()
+        ], batch_size=BULK_BATCH_SIZE)
+    return len(links)
+
+
+def ensure_closure(groups):
+    """Rebuild the closure of every business in `groups` that has a group without links; returns how many groups."""
+    business_ids = set(groups.filter(ancestor_links__isnull=True).values_list('business_id', flat=True))
+    if not business_ids:
+        return 0
+    return rebuild_closure(AccountGroup.objects.filter(business_id__in=business_ids))
+
+
+def verify_closure(groups):
+    """(missing, unexpected) link counts of `groups` against what `parent` says."""
+    expected = compute_closure(groups)
+    stored = {
+        (ancestor_id, descendant_id): depth
+        for ancestor_id, descendant_id, depth in AccountGroupClosure.objects.filter(
+            descendant__in=groups
+        ).values_list('ancestor_id', 'descendant_id', 'depth')
+    }
+    missing = sum(1 for link, depth in expected.items() if stored.get(link) != depth)
+    unexpected = sum(1 for link, depth in stored.items() if expected.get(link) != depth)
+    return missing, unexpected
+
+
+def walk_descendants(group):
+    """Ids of `group` and everything below it the old way, one query per level; for comparison."""
+    found = [group.id]
+    level = [group.id]
+    while level:
+        level = list(AccountGroup.objects.filter(parent_id__in=level).values_list('id', flat=True))
+        found += level
+    return found
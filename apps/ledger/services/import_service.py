@@ -0,0 +1,365 @@
+"""
+Streaming day book import.
+
+A CSV or JSON Lines file is read row by row. Each row is one journal entry
+line; consecutive rows with the same voucher type and number make one voucher.
+JSON Lines may also carry a whole voucher per line, with an "entries" list.
+Vouchers are posted through LedgerService.post_vouchers in chunks of
+`chunk_size`. Each chunk's transaction also advances the import's checkpoint,
+so an interrupted import resumes after the last committed row. Only the
+current chunk is held in memory. Rejected vouchers go to a CSV error report
+next to the import, written before the checkpoint that covers them commits;
+a resume first cuts the report back to its length at the checkpoint.
+
+A bad row, whatever is wrong with it, only rejects its voucher. Only failures
+outside the data (storage, a lost database connection) stop the import, and
+those are resumable.
+
+Columns / keys: date, type, number, account (id, code or name), debit, credit,
+and optionally narration, is_draft, fy_id (otherwise taken from the date).
+
+Uploads are only stored (PENDING); `manage.py run_import_worker` claims and
+runs them, so a large day book never runs inside an HTTP request.
+"""
+import csv
+import io
+import json
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import OperationalError, transaction
+from django.utils import timezone
+
+from ..models import Account, FinancialYear, VoucherImport
+from .ledger_service import LedgerService, _as_date
+
+logger = logging.getLogger(__name__)
+
+ERROR_REPORT_FIELDS = ['first_row', 'last_row', 'type', 'number', 'errors']
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+def default_chunk_size():
+    return getattr(settings, 'LEDGER_IMPORT_CHUNK_SIZE', 500)
+
+
+def _field(row, *names):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _is_true(value):
+    return value is True or str(value).strip().lower() in TRUE_VALUES
+
+
+class VoucherImporter:
+    def __init__(self, voucher_import):
+        self.voucher_import = voucher_import
+        business = voucher_import.business
+        # One query each; the chart of accounts, not the file, bounds memory
+        self.accounts = {}
+        for account_id, code, name in Account.objects.filter(business=business).values_list('id', 'code', 'name'):
+            self.accounts.setdefault(name.casefold(), account_id)
+            if code:
+                self.accounts.setdefault(code.casefold(), account_id)
+            self.accounts[str(account_id)] = account_id
+        self.years = list(FinancialYear.objects.filter(business=business))
+
+    # ---------- READING ----------
+    def rows(self, stream):
+        """(row number, dict or None, parse error) for each data row; numbers start at 1."""
+        if self.voucher_import.file_format == VoucherImport.Format.CSV:
+            reader = csv.DictReader(stream)
+            number = 0
+            while True:
+                number += 1
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    return
+                except csv.Error as e:
+                    # The reader has consumed the broken record; carry on with the next one
+                    yield number, None, f"Invalid CSV: {e}"
+                    continue
+                yield number, row, None
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, None, f"Invalid JSON: {e.msg}"
+                continue
+            if not isinstance(row, dict):
+                yield number, None, "Each line must be a JSON object."
+                continue
+            yield number, row, None
+
+    def vouchers(self, rows):
+        """Group rows into (first row, last row, voucher data or None, errors)."""
+        current = None
+        for number, row, error in rows:
+            if error is not None:
+                if current:
+                    yield current
+                    current = None
+                yield number, number, None, [error]
+                continue
+            if row.get('entries') is not None:
+                # A whole voucher on one JSON line
+                if current:
+                    yield current
+                    current = None
+                entries = row['entries']
+                if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+                    yield number, number, None, ['"entries" must be a list of objects.']
+                else:
+                    yield number, number, self._voucher(row, entries), []
+                continue
+
+            key = (_field(row, 'type', 'voucher_type'), _field(row, 'number', 'voucher_number'))
+            if current and current[2]['_key'] == key:
+                current[2]['entries'].append(self._entry(row))
+                current = (current[0], number, current[2], current[3])
+                continue
+            if current:
+                yield current
+            voucher = self._voucher(row, [row])
+            voucher['_key'] = key
+            current = (number, number, voucher, [])
+        if current:
+            yield current
+
+    def _voucher(self, row, entries):
+        voucher_date = _as_date(_field(row, 'date'))
+        fy_id = _field(row, 'fy_id')
+        if fy_id is None and voucher_date is not None:
+            fy_id = next((fy.id for fy in self.years if fy.start_date <= voucher_date <= fy.end_date), None)
+        return {
+            "date": voucher_date or _field(row, 'date'),
+            "voucher_type": _field(row, 'type', 'voucher_type'),
+            "voucher_number": _field(row, 'number', 'voucher_number'),
+            "fy_id": fy_id,
+            "narration": str(_field(row, 'narration') or ''),
+            "is_draft": _is_true(_field(row, 'is_draft') or False),
+            "entries": [self._entry(e) for e in entries],
+        }
+
+    def _entry(self, row):
+        account = _field(row, 'account_id', 'account') or ''
+        return {
+            # Unknown accounts keep their text so the error report names them
+            "account_id": self.accounts.get(str(account).strip().casefold(), account),
+            "debit": _field(row, 'debit') or 0,
+            "credit": _field(row, 'credit') or 0,
+        }
+
+    # ---------- RUNNING ----------
+    def run(self):
+        """Process the import after its checkpoint; the caller has claimed it (see `claim_import`)."""
+        voucher_import = self.voucher_import
+        checkpoint = voucher_import.checkpoint_row
+        try:
+            self._ensure_error_report()
+            with voucher_import.source.open('rb') as raw:
+                # Undecodable bytes become U+FFFD in their row, which then fails validation on its own
+                stream = io.TextIOWrapper(raw, encoding='utf-8-sig', errors='replace', newline='')
+                rows = ((n, row, error) for n, row, error in self.rows(stream) if n > checkpoint)
+                chunk = []
+                for item in self.vouchers(rows):
+                    chunk.append(item)
+                    if len(chunk) >= voucher_import.chunk_size:
+                        self._commit(chunk)
+                        chunk = []
+                if chunk:
+                    self._commit(chunk)
+        except Exception as e:
+            logger.exception("Voucher import %s failed", voucher_import.id)
+            voucher_import.status = VoucherImport.Status.FAILED
+            voucher_import.error_message = str(e)
+            voucher_import.save(update_fields=['status', 'error_message', 'updated_at'])
+            raise
+
+        voucher_import.status = VoucherImport.Status.COMPLETED
+        voucher_import.save(update_fields=['status', 'updated_at'])
+        return voucher_import
+
+    def _commit(self, chunk):
+        voucher_import = self.voucher_import
+        postable = [item for item in chunk if item[2] is not None]
+        with transaction.atomic():
+            results = self._post([
+                {k: v for k, v in item[2].items() if k != '_key'} for item in postable
+            ])
+            accepted = sum(1 for r in results if r['status'] == 'accepted')
+
+            rejected = [(item, item[3]) for item in chunk if item[2] is None]
+            rejected += [(postable[r['index']], r['errors']) for r in results if r['status'] == 'rejected']
+            # The report is on disk before the checkpoint covering it commits; a resume trims what a
+            # crash in between leaves behind, so rows are reported exactly once
+            report_bytes = self._write_errors(rejected)
+
+            # Counters and checkpoint commit with the vouchers, so a resume never posts a row twice
+            voucher_import.rows_read = chunk[-1][1]
+            voucher_import.checkpoint_row = chunk[-1][1]
+            voucher_import.vouchers_accepted += accepted
+            voucher_import.vouchers_rejected += len(chunk) - accepted
+            voucher_import.error_report_bytes = report_bytes
+            voucher_import.save(update_fields=[
+                'rows_read', 'checkpoint_row', 'vouchers_accepted', 'vouchers_rejected',
+                'error_report_bytes', 'updated_at',
+            ])
+
+    def _post(self, vouchers):
+        """
+        post_vouchers results for a chunk. If posting raises, the vouchers are
+        retried one by one, each in a savepoint, and the one that raises is
+        rejected with the error. A lost database connection still stops the import.
+        """
+        business = self.voucher_import.business
+        try:
+            with transaction.atomic():
+                return LedgerService.post_vouchers(business, vouchers)
+        except OperationalError:
+            raise
+        except Exception:
+            logger.warning("Import %s: chunk failed to post, retrying voucher by voucher",
+                           self.voucher_import.id, exc_info=True)
+
+        results = []
+        for index, voucher in enumerate(vouchers):
+            try:
+                with transaction.atomic():
+                    result = LedgerService.post_vouchers(business, [voucher])[0]
+            except OperationalError:
+                raise
+            except Exception as e:
+                result = {"status": "rejected", "errors": [f"Could not post: {type(e).__name__}: {e}"]}
+            results.append(dict(result, index=index))
+        return results
+
+    def _write_errors(self, rejected):
+        """Append rejected vouchers to the error report and flush it to disk; returns the report length."""
+        path = self.voucher_import.error_report.path
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            report = csv.DictWriter(f, ERROR_REPORT_FIELDS)
+            for (first, last, voucher, _), errors in sorted(rejected, key=lambda pair: pair[0][0]):
+                report.writerow({
+                    'first_row': first,
+                    'last_row': last,
+                    'type': voucher['voucher_type'] if voucher else '',
+                    'number': voucher['voucher_number'] if voucher else '',
+                    'errors': ' '.join(errors),
+                })
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def _ensure_error_report(self):
+        """
+        The error report CSV is created once. On a resume it is cut back to its
+        length at the checkpoint, dropping rows a crash left past it.
+        """
+        voucher_import = self.voucher_import
+        if voucher_import.error_report:
+            if not voucher_import.error_report_bytes:
+                return  # report from before its length was tracked; keep it whole
+            with open(voucher_import.error_report.path, 'r+b') as f:
+                f.truncate(voucher_import.error_report_bytes)
+            return
+        header = io.StringIO()
+        csv.DictWriter(header, ERROR_REPORT_FIELDS).writeheader()
+        voucher_import.error_report.save(
+            f"{voucher_import.id}.csv", ContentFile(header.getvalue().encode()), save=False
+        )
+        voucher_import.error_report_bytes = voucher_import.error_report.size
+        voucher_import.save(update_fields=['error_report', 'error_report_bytes', 'updated_at'])
+
+
+def create_import(business, fileobj, file_format, chunk_size=None, name=None):
+    """Store the uploaded/opened file (streamed to storage) as a pending VoucherImport."""
+    voucher_import = VoucherImport(
+        business=business,
+        file_format=file_format,
+        chunk_size=chunk_size or default_chunk_size(),
+    )
+    voucher_import.source.save(name or getattr(fileobj, 'name', 'daybook'), fileobj, save=False)
+    voucher_import.save()
+    return voucher_import
+
+
+class ImportBusy(Exception):
+    """The import is running elsewhere or already completed."""
+
+
+# ---------- CLAIMING ----------
+def claim_import(voucher_import, statuses=(VoucherImport.Status.PENDING, VoucherImport.Status.FAILED)):
+    """
+    Mark the import RUNNING if it is still in one of `statuses`. The conditional
+    UPDATE succeeds for exactly one caller, so two workers (or a worker and a
+    resume from the command line) never process the same rows at once.
+    """
+    claimed = VoucherImport.objects.filter(pk=voucher_import.pk, status__in=statuses).update(
+        status=VoucherImport.Status.RUNNING, error_message='', updated_at=timezone.now()
+    )
+    if claimed:
+        voucher_import.refresh_from_db()
+    return bool(claimed)
+
+
+def queue_import(voucher_import):
+    """Put a failed import back in the queue for `run_import_worker`; False if it is not FAILED."""
+    queued = VoucherImport.objects.filter(pk=voucher_import.pk, status=VoucherImport.Status.FAILED).update(
+        status=VoucherImport.Status.PENDING, updated_at=timezone.now()
+    )
+    if queued:
+        voucher_import.refresh_from_db()
+    return bool(queued)
+
+
+def claim_next_import():
+    """The oldest pending import, claimed for this worker, or None when the queue is empty."""
+    while True:
+        voucher_import = VoucherImport.objects.filter(
+            status=VoucherImport.Status.PENDING
+        ).select_related('business').order_by('created_at').first()
+        if voucher_import is None:
+            return None
+        if claim_import(voucher_import, statuses=(VoucherImport.Status.PENDING,)):
+            return voucher_import
+        # Another worker won it; try the next one
+
+
+def release_stale_imports():
+    """Requeue imports whose worker died: RUNNING but with no committed chunk for LEDGER_IMPORT_LOCK_TIMEOUT."""
+    timeout = getattr(settings, 'LEDGER_IMPORT_LOCK_TIMEOUT', 30 * 60)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return VoucherImport.objects.filter(status=VoucherImport.Status.RUNNING, updated_at__lt=cutoff).update(
+        status=VoucherImport.Status.PENDING
+    )
+
+
+def run_import(voucher_import, claimed=False):
+    """
+    Run (or resume, after its checkpoint) an import; returns it updated.
+    Unless the caller already claimed it, it is claimed here; ImportBusy if that fails.
+    """
+    if not claimed and not claim_import(voucher_import):
+        voucher_import.refresh_from_db(fields=['status'])
+        raise ImportBusy(f"Import {voucher_import.id} is {voucher_import.get_status_display().lower()}.")
+    return VoucherImporter(voucher_import).run()
+
+
+def detect_format(name, default=VoucherImport.Format.CSV):
+    name = (name or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return VoucherImport.Format.JSONL
+    if name.endswith('.csv'):
+        return VoucherImport.Format.CSV
+    return default
@@ -1,72 +1,229 @@
+import uuid
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
 from django.db import transaction
-from django.db.models import Sum
 from django.core.exceptions import ValidationError
-from decimal import Decimal
-from ..models import Voucher, JournalEntry, Account, FinancialYear
+from django.utils.dateparse import parse_date
+from ..models import Voucher, VoucherType, JournalEntry, Account, FinancialYear
+from .balance_service import apply_entry_changes, get_balances
+from .report_service import invalidate_reports
+
+ZERO = Decimal('0.00')
+
+# Rows per INSERT when posting vouchers in bulk
+BULK_BATCH_SIZE = 500
+
+# JournalEntry.debit/credit are max_digits=20, decimal_places=2
+MAX_AMOUNT = Decimal(10) ** (JournalEntry._meta.get_field('debit').max_digits - 2)
+MAX_NUMBER_LENGTH = Voucher._meta.get_field('voucher_number').max_length
+
+
+def _as_uuid(value):
+    try:
+        return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _as_date(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return parse_date(str(value))
+    except ValueError:
+        return None
+
+
+def _as_number(value):
+    return '' if value is None else str(value).strip()
+
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'', '0', 'false', 'no', 'n', 'f'}
+
+
+def _as_flag(value):
+    """True/False for a boolean, 0/1 or a yes/no string (None is False); None for anything else."""
+    if value is None or isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, (int, str)):
+        text = str(value).strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+    return None
+
+
+def _entries(data):
+    """The voucher's entry list, or None when it is not a list of objects."""
+    entries = data.get('entries')
+    if entries is None:
+        return []
+    if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+        return None
+    return entries
+
+
+def _as_amount(value):
+    """Two-place Decimal, or None for anything that is not a finite amount JournalEntry can store."""
+    try:
+        amount = Decimal(str(value or 0))
+    except InvalidOperation:
+        return None
+    # NaN/Infinity slip through Decimal() and would raise on the first comparison
+    if not amount.is_finite() or abs(amount) >= MAX_AMOUNT:
+        return None
+    amount = amount.quantize(Decimal('0.01'))
+    return amount if abs(amount) < MAX_AMOUNT else None  # rounding can carry into a 19th digit
+
 
 class LedgerService:
     @staticmethod
-    @transaction.atomic
     def create_voucher(business, voucher_data, entries_data):
         """
         voucher_data: {date, type, number, fy_id, narration}
         entries_data: [{account_id, debit, credit}, ...]
         """
-        # 1. FY Check
-        fy = FinancialYear.objects.get(id=voucher_data['fy_id'])
-        if fy.is_locked:
-            raise ValidationError("Cannot create vouchers in a locked Financial Year.")
-
-        # 2. Date Validation (Must be within FY)
-        if not (fy.start_date <= voucher_data['date'] <= fy.end_date):
-            raise ValidationError(f"Voucher date must be within {fy.start_date} and {fy.end_date}.")
-
-        # 3. Create Voucher Header
-        voucher = Voucher.objects.create(
-            business=business,
-            financial_year=fy,
-            voucher_type=voucher_data['voucher_type'],
-            voucher_number=voucher_data['voucher_number'],
-            date=voucher_data['date'],
-            narration=voucher_data.get('narration', ''),
-            is_draft=voucher_data.get('is_draft', False)
-        )
-
-        # 4. Create Entries and Validate Totals
-        total_debit = Decimal('0.00')
-        total_credit = Decimal('0.00')
-
-        for entry in entries_data:
-            acc = Account.objects.get(id=entry['account_id'], business=business)
-            
-            amount_dr = Decimal(str(entry.get('debit', 0)))
-            amount_cr = Decimal(str(entry.get('credit', 0)))
-
-            JournalEntry.objects.create(
-                voucher=voucher,
-                account=acc,
-                debit=amount_dr,
-                credit=amount_cr
+        result = LedgerService.post_vouchers(business, [dict(voucher_data, entries=entries_data)])[0]
+        if result['status'] == 'rejected':
+            raise ValidationError(' '.join(result['errors']))
+        return result['voucher']
+
+    @staticmethod
+    def post_vouchers(business, vouchers_data):
+        """
+        Validate and post many vouchers at once.
+        vouchers_data: [{date, voucher_type, voucher_number, fy_id, narration, is_draft, entries}, ...]
+
+        Everything is checked in memory (one query each for the financial years,
+        accounts and existing numbers), then the accepted vouchers and their
+        entries are inserted with bulk_create in one transaction. Returns one
+        result per voucher, in order:
+        {"index", "status": "accepted", "voucher"} or {"index", "status": "rejected", "errors"}.
+        """
+        vouchers_data = list(vouchers_data)
+        # Malformed items are rejected below; the lookups only look at the well-formed ones
+        well_formed = [v for v in vouchers_data if isinstance(v, dict)]
+
+        # 1. Everything the checks need, in one query per table
+        fy_ids = {_as_uuid(v.get('fy_id')) for v in well_formed} - {None}
+        years = {fy.id: fy for fy in FinancialYear.objects.filter(business=business, id__in=fy_ids)}
+
+        account_ids = {
+            _as_uuid(e.get('account_id')) for v in well_formed for e in _entries(v) or ()
+        } - {None}
+        owned_accounts = set(Account.objects.filter(business=business, id__in=account_ids).values_list('id', flat=True))
+
+        numbers = {_as_number(v.get('voucher_number')) for v in well_formed}
+        taken = set(Voucher.objects.filter(business=business, voucher_number__in=numbers).values_list(
+            'voucher_type', 'voucher_number', 'financial_year_id'
+        ))
+
+        # 2. Validate each voucher in memory
+        results = []
+        vouchers = []
+        entries = []
+        balance_changes = []
+        for index, data in enumerate(vouchers_data):
+            if not isinstance(data, dict):
+                results.append({"index": index, "status": "rejected", "errors": ["A voucher must be an object."]})
+                continue
+            errors = []
+            fy = years.get(_as_uuid(data.get('fy_id')))
+            voucher_date = _as_date(data.get('date'))
+
+            if fy is None:
+                errors.append("Unknown Financial Year.")
+            elif fy.is_locked:
+                errors.append("Cannot create vouchers in a locked Financial Year.")
+            if voucher_date is None:
+                errors.append("Invalid voucher date.")
+            elif fy is not None and not (fy.start_date <= voucher_date <= fy.end_date):
+                errors.append(f"Voucher date must be within {fy.start_date} and {fy.end_date}.")
+
+            is_draft = _as_flag(data.get('is_draft'))
+            if is_draft is None:
+                errors.append("is_draft must be true or false.")
+
+            voucher_type = data.get('voucher_type')
+            key = (voucher_type if isinstance(voucher_type, str) else None,
+                   _as_number(data.get('voucher_number')), fy.id if fy else None)
+            if key[0] not in VoucherType.values or not key[1]:
+                errors.append("A valid voucher type and a voucher number are required.")
+            elif len(key[1]) > MAX_NUMBER_LENGTH:
+                errors.append(f"Voucher numbers are at most {MAX_NUMBER_LENGTH} characters.")
+            elif fy is not None and key in taken:
+                errors.append(f"Voucher number {key[1]} already exists for {key[0]} in this Financial Year.")
+
+            lines = []
+            errors_before_entries = len(errors)
+            total_debit = total_credit = ZERO
+            entries_data = _entries(data)
+            if entries_data is None:
+                errors.append("Entries must be a list of objects.")
+            for entry in entries_data or ():
+                account_id = _as_uuid(entry.get('account_id'))
+                debit, credit = _as_amount(entry.get('debit')), _as_amount(entry.get('credit'))
+                if account_id not in owned_accounts:
+                    errors.append(f"Unknown account {entry.get('account_id')}.")
+                elif debit is None or credit is None or debit < 0 or credit < 0:
+                    errors.append(f"Invalid amount on account {entry.get('account_id')}: debit and credit must be finite, positive and below {MAX_AMOUNT}.")
+                elif debit > 0 and credit > 0:
+                    errors.append("A single entry line cannot have both a debit and a credit.")
+                elif debit == 0 and credit == 0:
+                    errors.append("Entry must have either a debit or a credit.")
+                else:
+                    lines.append((account_id, debit, credit))
+                    total_debit += debit
+                    total_credit += credit
+            if entries_data == []:
+                errors.append("A voucher needs at least one entry.")
+            bad_lines = len(errors) > errors_before_entries
+
+            # 3. Double Entry Check, before anything is written (totals mean nothing with bad lines)
+            if not bad_lines and total_debit != total_credit:
+                errors.append(f"Unbalanced Voucher: Total Debit ({total_debit}) must equal Total Credit ({total_credit}).")
+
+            if errors:
+                results.append({"index": index, "status": "rejected", "errors": errors})
+                continue
+
+            taken.add(key)  # a later voucher in the same batch cannot reuse the number
+            voucher = Voucher(
+                business=business,
+                financial_year=fy,
+                voucher_type=key[0],
+                voucher_number=key[1],
+                date=voucher_date,
+                narration=str(data.get('narration') or ''),
+                is_draft=is_draft,
             )
-            
-            total_debit += amount_dr
-            total_credit += amount_cr
+            vouchers.append(voucher)
+            for account_id, debit, credit in lines:
+                entries.append(JournalEntry(voucher=voucher, account_id=account_id, debit=debit, credit=credit))
+                balance_changes.append((account_id, voucher.is_draft, debit, credit))
+            results.append({"index": index, "status": "accepted", "voucher": voucher})
 
-        # 5. Final Double Entry Check
-        if total_debit != total_credit:
-            raise ValidationError(f"Unbalanced Voucher: Total Debit ({total_debit}) must equal Total Credit ({total_credit}).")
+        # 4. Write the accepted vouchers, their entries and the running balances together
+        if vouchers:
+            with transaction.atomic():
+                Voucher.objects.bulk_create(vouchers, batch_size=BULK_BATCH_SIZE)
+                JournalEntry.objects.bulk_create(entries, batch_size=BULK_BATCH_SIZE)
+                apply_entry_changes(added=balance_changes)
+                # bulk_create sends no signals; cached reports go stale as this commits
+                invalidate_reports(business.id)
 
-        return voucher
+        return results
 
     @staticmethod
     def get_account_balance(account_id):
-        # Service logic for calculating real-time balance
-        entries = JournalEntry.objects.filter(account_id=account_id)
-        totals = entries.aggregate(
-            dr_sum=Sum('debit'),
-            cr_sum=Sum('credit')
-        )
-        opening = Account.objects.get(id=account_id).opening_balance
-        
-        balance = opening + (totals['dr_sum'] or Decimal('0.00')) - (totals['cr_sum'] or Decimal('0.00'))
-        return balance
+        """Opening balance plus posted entries, from the maintained AccountBalance."""
+        account = Account.objects.select_related('running_balance').get(id=account_id)
+        return get_balances([account])[account.id].balance
+
+    @staticmethod
+    def get_account_balances(accounts):
+        """{account_id: AccountBalance}; fetch accounts with select_related('running_balance')."""
+        return get_balances(accounts)
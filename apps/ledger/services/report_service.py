@@ -0,0 +1,234 @@
+"""
+Trial balance, profit & loss and balance sheet.
+
+Per-account debit/credit totals come from one grouped query (split into
+"before the FY" and "FY start to as-of date"), the group tree from one more.
+Totals are rolled up through AccountGroup.parent in memory. Reports are cached
+per (business, FY, as-of date) under the business's ReportVersion. Writers bump
+that row in the same transaction as their change (see ledger.signals and
+LedgerService.post_vouchers), so a new version only becomes visible together
+with the data behind it, in every process, whatever the cache backend. A report
+built from rows read while a writer was committing can be cached under the
+version it started from; by then that version is already superseded.
+
+Balances are signed debit-positive internally; each section reports them in
+its natural direction (assets and expenses as debit, the rest as credit).
+Posted vouchers only; drafts are excluded.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from ..models import Account, AccountGroup, ReportVersion
+
+ZERO = Decimal('0.00')
+Classification = AccountGroup.Classification
+
+DEBIT_NATURE = {Classification.ASSET, Classification.EXPENSE}
+PROFIT_AND_LOSS = {Classification.INCOME, Classification.EXPENSE}
+
+TRIAL_BALANCE = 'trial-balance'
+PROFIT_LOSS = 'profit-loss'
+BALANCE_SHEET = 'balance-sheet'
+
+
+def _sum(field, **filters):
+    return Coalesce(Sum(field, filter=Q(**filters)), Value(ZERO), output_field=DecimalField())
+
+
+def _money(amount):
+    # Negated zero balances would otherwise print as "-0.00"
+    return str(amount.quantize(ZERO) or ZERO)
+
+
+# ---------- DATA ----------
+def account_totals(business, fy, as_of):
+    """
+    One grouped query: every account of the business with its posted debits and
+    credits before the FY and from FY start to `as_of`.
+    """
+    posted = {'journalentry__voucher__is_draft': False}
+    before = dict(posted, journalentry__voucher__date__lt=fy.start_date)
+    period = dict(posted, journalentry__voucher__date__gte=fy.start_date, journalentry__voucher__date__lte=as_of)
+    return list(
+        Account.objects.filter(business=business).order_by().values(
+            'id', 'name', 'code', 'group_id', 'opening_balance'
+        ).annotate(
+            debit_before=_sum('journalentry__debit', **before),
+            credit_before=_sum('journalentry__credit', **before),
+            debit=_sum('journalentry__debit', **period),
+            credit=_sum('journalentry__credit', **period),
+        )
+    )
+
+
+class GroupTree:
+    """AccountGroup hierarchy of one business with accounts attached and totals rolled up."""
+
+    def __init__(self, groups, accounts):
+        self.nodes = {
+            g['id']: dict(g, groups=[], accounts=[], balance=ZERO) for g in groups
+        }
+        self.roots = []
+        for node in self.nodes.values():
+            parent = self.nodes.get(node['parent_id'])
+            (parent['groups'] if parent else self.roots).append(node)
+        for account in accounts:
+            node = self.nodes.get(account['group_id'])
+            if node is not None:
+                node['accounts'].append(account)
+        self._roll_up()
+
+    def _roll_up(self):
+        # Children before parents without recursion; hierarchies can be deep
+        order = []
+        stack = list(self.roots)
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node['groups'])
+        for node in reversed(order):
+            node['balance'] += sum((account['balance'] for account in node['accounts']), ZERO)
+            node['balance'] += sum((child['balance'] for child in node['groups']), ZERO)
+
+    def roots_of(self, classification):
+        return [node for node in self.roots if node['classification'] == classification]
+
+
+def _present(node, sign):
+    """JSON for a group node, balances shown in the section's natural direction."""
+    return {
+        "id": str(node['id']),
+        "name": node['name'],
+        "balance": _money(node['balance'] * sign),
+        "accounts": [
+            {"id": str(a['id']), "name": a['name'], "code": a['code'], "balance": _money(a['balance'] * sign)}
+            for a in sorted(node['accounts'], key=lambda a: a['name'])
+        ],
+        "groups": [_present(child, sign) for child in sorted(node['groups'], key=lambda g: g['name'])],
+    }
+
+
+def _section(tree, classification):
+    sign = 1 if classification in DEBIT_NATURE else -1
+    roots = tree.roots_of(classification)
+    total = sum((node['balance'] for node in roots), ZERO) * sign
+    return {"groups": [_present(node, sign) for node in sorted(roots, key=lambda g: g['name'])],
+            "total": _money(total)}, total
+
+
+# ---------- REPORTS ----------
+class ReportEngine:
+    def __init__(self, business, fy, as_of=None):
+        self.business = business
+        self.fy = fy
+        self.as_of = min(as_of or fy.end_date, fy.end_date)
+        self._tree = None
+        self._retained = ZERO
+
+    def tree(self):
+        if self._tree is not None:
+            return self._tree
+        groups = list(AccountGroup.objects.filter(business=self.business).values(
+            'id', 'name', 'parent_id', 'classification'
+        ))
+        classification_of = {group['id']: group['classification'] for group in groups}
+
+        accounts = []
+        retained = ZERO
+        for account in account_totals(self.business, self.fy, self.as_of):
+            before = account['debit_before'] - account['credit_before']
+            if classification_of.get(account['group_id']) in PROFIT_AND_LOSS:
+                # Earlier years' income and expenses are closed into retained earnings
+                retained -= account['opening_balance'] + before
+                account['balance'] = account['debit'] - account['credit']
+            else:
+                account['balance'] = account['opening_balance'] + before + account['debit'] - account['credit']
+            accounts.append(account)
+        self._retained = retained
+        self._tree = GroupTree(groups, accounts)
+        return self._tree
+
+    def _header(self, kind):
+        return {"report": kind, "business": str(self.business.id), "fy": str(self.fy.id),
+                "from": self.fy.start_date.isoformat(), "as_of": self.as_of.isoformat()}
+
+    def trial_balance(self):
+        tree = self.tree()
+        rows = []
+        total_debit = total_credit = ZERO
+        for node in sorted(tree.nodes.values(), key=lambda g: g['name']):
+            for account in sorted(node['accounts'], key=lambda a: a['name']):
+                balance = account['balance']
+                if not balance:
+                    continue
+                debit, credit = (balance, ZERO) if balance > 0 else (ZERO, -balance)
+                total_debit += debit
+                total_credit += credit
+                rows.append({"id": str(account['id']), "name": account['name'], "code": account['code'],
+                             "group": node['name'], "classification": node['classification'],
+                             "debit": _money(debit), "credit": _money(credit)})
+        if self._retained:
+            debit, credit = (ZERO, self._retained) if self._retained > 0 else (-self._retained, ZERO)
+            total_debit += debit
+            total_credit += credit
+            rows.append({"id": None, "name": "Retained Earnings", "code": None, "group": None,
+                         "classification": Classification.EQUITY,
+                         "debit": _money(debit), "credit": _money(credit)})
+        return dict(self._header(TRIAL_BALANCE), accounts=rows,
+                    total_debit=_money(total_debit), total_credit=_money(total_credit),
+                    difference=_money(total_debit - total_credit))
+
+    def profit_and_loss(self):
+        tree = self.tree()
+        income, income_total = _section(tree, Classification.INCOME)
+        expenses, expense_total = _section(tree, Classification.EXPENSE)
+        return dict(self._header(PROFIT_LOSS), income=income, expenses=expenses,
+                    net_profit=_money(income_total - expense_total))
+
+    def balance_sheet(self):
+        tree = self.tree()
+        assets, asset_total = _section(tree, Classification.ASSET)
+        liabilities, liability_total = _section(tree, Classification.LIABILITY)
+        equity, equity_total = _section(tree, Classification.EQUITY)
+        _, income_total = _section(tree, Classification.INCOME)
+        _, expense_total = _section(tree, Classification.EXPENSE)
+        profit = income_total - expense_total
+        equity_total += self._retained + profit
+        equity.update(retained_earnings=_money(self._retained), current_period_profit=_money(profit),
+                      total=_money(equity_total))
+        return dict(self._header(BALANCE_SHEET), assets=assets, liabilities=liabilities, equity=equity,
+                    total_liabilities_and_equity=_money(liability_total + equity_total),
+                    difference=_money(asset_total - liability_total - equity_total))
+
+    def build(self, kind):
+        builders = {TRIAL_BALANCE: self.trial_balance, PROFIT_LOSS: self.profit_and_loss,
+                    BALANCE_SHEET: self.balance_sheet}
+        if kind not in builders:
+            raise ValueError(f"Unknown report: {kind}")
+        return builders[kind]()
+
+
+# ---------- CACHE ----------
+def invalidate_reports(business_id):
+    """
+    Make every cached report of the business stale; call inside the transaction
+    that changes its vouchers, accounts or groups.
+    """
+    ReportVersion.objects.filter(business_id=business_id).update(version=F('version') + 1)
+
+
+def get_report(business, fy, kind, as_of=None):
+    """The report as a JSON-ready dict, from the cache when nothing changed since it was built."""
+    engine = ReportEngine(business, fy, as_of)
+    # Businesses get their row on creation; get_or_create covers older ones not yet backfilled
+    version = ReportVersion.objects.get_or_create(business_id=business.id)[0].version
+    key = f"ledger:reports:{business.id}:{version}:{fy.id}:{engine.as_of.isoformat()}:{kind}"
+    report = cache.get(key)
+    if report is None:
+        report = engine.build(kind)
+        cache.set(key, report, getattr(settings, 'LEDGER_REPORT_CACHE_TIMEOUT', 3600))
+    return report
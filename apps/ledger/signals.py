@@ -0,0 +1,167 @@
+"""
+Keeps AccountBalance in step with new accounts and single journal entry and
+voucher edits (admin, cascades, posting a draft). Bulk writers use bulk_create,
+which skips these, and apply their changes in one go. Any change to vouchers,
+entries, accounts or groups also bumps the business's ReportVersion in the same
+transaction, making its cached reports stale, and AccountGroupClosure follows
+group creates and moves.
+"""
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.accounts.models import Business
+
+from .models import (
+    Account, AccountBalance, AccountGroup, AccountGroupClosure, JournalEntry, ReportVersion, Voucher,
+)
+from .services.balance_service import apply_entry_changes, ensure_balances
+from .services.closure_service import add_group, ensure_closure, is_in_subtree, lock_links, move_group
+from .services.report_service import invalidate_reports
+
+
+def _voucher_is_draft(voucher_id):
+    return Voucher.objects.filter(pk=voucher_id).values_list('is_draft', flat=True).first()
+
+
+def _reports_changed(business_id):
+    # In the writer's transaction, so the new version and the new rows become visible together
+    invalidate_reports(business_id)
+
+
+# ---------- JOURNAL ENTRIES ----------
+@receiver(pre_save, sender=JournalEntry)
+def remember_previous_entry(sender, instance, raw=False, **kwargs):
+    instance._balance_previous = None
+    # UUID primary keys are set before the first save, so check the state instead of pk
+    if raw or instance._state.adding:
+        return
+    previous = JournalEntry.objects.filter(pk=instance.pk).values_list(
+        'account_id', 'voucher__is_draft', 'debit', 'credit'
+    ).first()
+    instance._balance_previous = previous
+
+
+@receiver(post_save, sender=JournalEntry)
+def entry_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _reports_changed(instance.voucher.business_id)
+    previous = getattr(instance, '_balance_previous', None)
+    current = (instance.account_id, instance.voucher.is_draft, instance.debit, instance.credit)
+    apply_entry_changes(added=[current], removed=[previous] if previous else [])
+
+
+@receiver(post_delete, sender=JournalEntry)
+def entry_deleted(sender, instance, **kwargs):
+    # Cascaded deletes remove entries before their voucher, so it is still readable here
+    voucher = Voucher.objects.filter(pk=instance.voucher_id).values_list('is_draft', 'business_id').first()
+    if voucher is not None:
+        is_draft, business_id = voucher
+        _reports_changed(business_id)
+        apply_entry_changes(removed=[(instance.account_id, is_draft, instance.debit, instance.credit)])
+
+
+# ---------- VOUCHERS ----------
+@receiver(pre_save, sender=Voucher)
+def remember_previous_draft_state(sender, instance, raw=False, **kwargs):
+    instance._balance_was_draft = None
+    if raw or instance._state.adding:
+        return
+    instance._balance_was_draft = _voucher_is_draft(instance.pk)
+
+
+@receiver(post_save, sender=Voucher)
+def voucher_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _reports_changed(instance.business_id)  # date or draft state moves it between reports
+    was_draft = getattr(instance, '_balance_was_draft', None)
+    if raw or was_draft is None or was_draft == instance.is_draft:
+        return
+    # Posting a draft (or reopening a posted voucher) moves its entries between the totals
+    entries = list(instance.entries.values_list('account_id', 'debit', 'credit'))
+    apply_entry_changes(
+        added=[(account_id, instance.is_draft, debit, credit) for account_id, debit, credit in entries],
+        removed=[(account_id, was_draft, debit, credit) for account_id, debit, credit in entries],
+    )
+
+
+@receiver(post_delete, sender=Voucher)
+def voucher_deleted(sender, instance, **kwargs):
+    _reports_changed(instance.business_id)
+
+
+# ---------- BUSINESSES ----------
+@receiver(post_save, sender=Business)
+def business_saved(sender, instance, created, raw=False, **kwargs):
+    # Writers only ever bump the row, so it has to exist before the first change
+    if created and not raw:
+        ReportVersion.objects.create(business=instance)
+
+
+# ---------- CHART OF ACCOUNTS ----------
+@receiver(post_save, sender=Account)
+def account_saved(sender, instance, created, raw=False, **kwargs):
+    # A new account has no entries; with its row in place every later delta has somewhere to go
+    if created and not raw:
+        AccountBalance.objects.create(account=instance)
+
+
+@receiver(pre_save, sender=AccountGroup)
+def remember_previous_parent(sender, instance, raw=False, **kwargs):
+    instance._closure_previous_parent = None
+    if raw:
+        return
+    if instance._state.adding:
+        if instance.parent_id:
+            lock_links(instance.pk, instance.parent_id)
+        return
+    previous = AccountGroup.objects.filter(pk=instance.pk).values_list('parent_id', flat=True)
+    instance._closure_previous_parent = previous.first()
+    if instance._closure_previous_parent == instance.parent_id:
+        return
+    # Held until the save commits, so the check below sees any move that got in first
+    lock_links(instance.pk, instance.parent_id)
+    if instance.parent_id and is_in_subtree(instance.pk, instance.parent_id):
+        raise ValidationError("A group cannot be moved under itself or one of its subgroups.")
+
+
+@receiver(post_save, sender=AccountGroup)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        add_group(instance)
+    elif getattr(instance, '_closure_previous_parent', None) != instance.parent_id:
+        move_group(instance)
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+@receiver(post_save, sender=AccountGroup)
+@receiver(post_delete, sender=AccountGroup)
+def chart_changed(sender, instance, raw=False, **kwargs):
+    # Opening balances, group moves and renames all show in the reports
+    if not raw:
+        _reports_changed(instance.business_id)
+
+
+# ---------- BACKFILL ----------
+def backfill_after_migrate(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Balance rows for accounts, report versions for businesses and closure links
+    for groups that have none (created before they were kept, bulk_create, fixtures).
+    """
+    # The app has no migrations; its tables only exist once `migrate --run-syncdb` made them
+    tables = connections[using].introspection.table_names()
+    if AccountBalance._meta.db_table in tables:
+        ensure_balances(Account.objects.all())
+    if ReportVersion._meta.db_table in tables:
+        ReportVersion.objects.bulk_create(
+            [ReportVersion(business_id=business_id)
+             for business_id in Business.objects.filter(report_version__isnull=True).values_list('id', flat=True)],
+            ignore_conflicts=True,
+        )
+    if AccountGroupClosure._meta.db_table in tables:
+        ensure_closure(AccountGroup.objects.all())
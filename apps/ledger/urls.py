@@ -7,5 +7,11 @@ app_name = 'ledger'
 urlpatterns = [
     path('vouchers/', views.VoucherListView.as_view(), name='voucher-list'),
     path('vouchers/create/', views.VoucherCreateView.as_view(), name='voucher-create'),
+    path('vouchers/bulk/', views.VoucherBulkCreateView.as_view(), name='voucher-bulk-create'),
     path('accounts/', views.AccountListView.as_view(), name='account-list'),
+    path('reports/<str:kind>/', views.ReportView.as_view(), name='report'),
+    path('imports/', views.VoucherImportView.as_view(), name='import-create'),
+    path('imports/<uuid:pk>/', views.VoucherImportDetailView.as_view(), name='import-detail'),
+    path('imports/<uuid:pk>/resume/', views.VoucherImportResumeView.as_view(), name='import-resume'),
+    path('imports/<uuid:pk>/errors/', views.VoucherImportErrorsView.as_view(), name='import-errors'),
 ]
@@ -1,7 +1,11 @@
 from django.core.exceptions import PermissionDenied
+from django.http import FileResponse
 from apps.common.views.base import ApiView
-from ..models import Voucher, Account, AccountGroup, FinancialYear
-from ..services.ledger_service import LedgerService
+from .models import Voucher, VoucherImport, Account, AccountGroup, FinancialYear
+from .services.import_service import create_import, detect_format, queue_import
+from .services.ledger_service import LedgerService, _as_date, _as_uuid
+from .services.report_service import BALANCE_SHEET, PROFIT_LOSS, TRIAL_BALANCE, get_report
+from django.utils import timezone
 import json
 
 class VoucherListView(ApiView):
@@ -57,18 +61,159 @@ class VoucherCreateView(ApiView):
         except KeyError as e:
             return self.error_response(f"Missing field: {str(e)}")
 
+class VoucherBulkCreateView(ApiView):
+    def post(self, request):
+        if not request.business:
+            return self.error_response("Business context required", status=400)
+
+        body = self.get_json_body()
+        vouchers = body.get('vouchers')
+        if not isinstance(vouchers, list):
+            return self.error_response("Missing field: 'vouchers'")
+
+        results = LedgerService.post_vouchers(
+            business=request.business,
+            # Items that are not objects go through as they are and come back rejected
+            vouchers_data=[{
+                "date": v.get('date'),
+                "voucher_type": v.get('type'),
+                "voucher_number": v.get('number'),
+                "fy_id": v.get('fy_id'),
+                "narration": v.get('narration', ''),
+                "is_draft": v.get('is_draft', False),
+                "entries": v.get('entries', [])
+            } if isinstance(v, dict) else v for v in vouchers]
+        )
+        data = []
+        for result in results:
+            if result['status'] == 'accepted':
+                voucher = result['voucher']
+                data.append({"index": result['index'], "status": "accepted",
+                             "id": str(voucher.id), "number": voucher.voucher_number})
+            else:
+                data.append(result)
+        accepted = sum(1 for r in results if r['status'] == 'accepted')
+        return self.success_response({"accepted": accepted, "rejected": len(results) - accepted, "results": data})
+
 class AccountListView(ApiView):
     def get(self, request):
         if not request.business:
             return self.error_response("Business context required", status=400)
             
-        accounts = Account.objects.filter(business=request.business).select_related('group')
+        accounts = Account.objects.filter(business=request.business).select_related('group', 'running_balance')
+        if request.GET.get('group'):
+            # Accounts anywhere under the group, through the closure table
+            group = AccountGroup.objects.filter(business=request.business, id=_as_uuid(request.GET['group'])).first()
+            if group is None:
+                return self.error_response("Account group not found", status=404)
+            accounts = accounts.under_group(group)
+        balances = LedgerService.get_account_balances(accounts)
         data = [{
             "id": str(a.id),
             "name": a.name,
             "group": a.group.name,
             "classification": a.group.classification,
-            "balance": str(LedgerService.get_account_balance(a.id))
+            "balance": str(balances[a.id].balance),
+            "draft_debit": str(balances[a.id].draft_debit),
+            "draft_credit": str(balances[a.id].draft_credit)
         } for a in accounts]
         
         return self.success_response(data)
+
+class ReportView(ApiView):
+    """
+    GET reports/<trial-balance|profit-loss|balance-sheet>/?fy_id=&as_of=
+    Defaults: the financial year containing as_of, as of today (capped at the year end).
+    """
+    def get(self, request, kind):
+        if not request.business:
+            return self.error_response("Business context required", status=400)
+        if kind not in (TRIAL_BALANCE, PROFIT_LOSS, BALANCE_SHEET):
+            return self.error_response(f"Unknown report: {kind}", status=404)
+
+        as_of = _as_date(request.GET['as_of']) if request.GET.get('as_of') else timezone.localdate()
+        if as_of is None:
+            return self.error_response("as_of must be a date (YYYY-MM-DD)")
+        years = FinancialYear.objects.filter(business=request.business)
+        if request.GET.get('fy_id'):
+            fy = years.filter(id=_as_uuid(request.GET['fy_id'])).first()
+        else:
+            fy = years.filter(start_date__lte=as_of).order_by('-start_date').first()
+        if fy is None:
+            return self.error_response("Financial Year not found", status=404)
+        if as_of < fy.start_date:
+            return self.error_response(f"as_of must not be before {fy.start_date}")
+
+        return self.success_response(get_report(request.business, fy, kind, as_of))
+
+def serialize_import(voucher_import):
+    return {
+        "id": str(voucher_import.id),
+        "format": voucher_import.file_format,
+        "status": voucher_import.status,
+        "rows_read": voucher_import.rows_read,
+        "checkpoint_row": voucher_import.checkpoint_row,
+        "vouchers_accepted": voucher_import.vouchers_accepted,
+        "vouchers_rejected": voucher_import.vouchers_rejected,
+        "error_message": voucher_import.error_message,
+        "error_report": f"imports/{voucher_import.id}/errors/" if voucher_import.vouchers_rejected else None
+    }
+
+class VoucherImportView(ApiView):
+    """
+    Upload a CSV / JSON Lines day book (multipart field "file") for import.
+    The upload is streamed to storage and queued; `run_import_worker` reads it
+    back row by row. Poll imports/<id>/ for progress.
+    """
+    def post(self, request):
+        if not request.business:
+            return self.error_response("Business context required", status=400)
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return self.error_response("Missing field: 'file'")
+        file_format = request.POST.get('format') or detect_format(upload.name)
+        if file_format not in VoucherImport.Format.values:
+            return self.error_response(f"Unknown format: {file_format}")
+        try:
+            chunk_size = int(request.POST['chunk_size']) if request.POST.get('chunk_size') else None
+        except ValueError:
+            return self.error_response("chunk_size must be a number")
+
+        voucher_import = create_import(request.business, upload, file_format, chunk_size, upload.name)
+        return self.success_response(serialize_import(voucher_import), status=202)
+
+class VoucherImportDetailView(ApiView):
+    def get_import(self, request, pk):
+        if not request.business:
+            raise PermissionDenied("Business context required")
+        return VoucherImport.objects.filter(pk=pk, business=request.business).first()
+
+    def get(self, request, pk):
+        voucher_import = self.get_import(request, pk)
+        if voucher_import is None:
+            return self.error_response("Import not found", status=404)
+        return self.success_response(serialize_import(voucher_import))
+
+class VoucherImportResumeView(VoucherImportDetailView):
+    def post(self, request, pk):
+        voucher_import = self.get_import(request, pk)
+        if voucher_import is None:
+            return self.error_response("Import not found", status=404)
+        # Only a FAILED import is requeued; the conditional UPDATE keeps a second resume from double-running it
+        if not queue_import(voucher_import):
+            voucher_import.refresh_from_db()
+            return self.error_response(f"Import is {voucher_import.get_status_display().lower()}", status=409)
+        return self.success_response(serialize_import(voucher_import), status=202)
+
+class VoucherImportErrorsView(VoucherImportDetailView):
+    def get(self, request, pk):
+        voucher_import = self.get_import(request, pk)
+        if voucher_import is None or not voucher_import.error_report:
+            return self.error_response("No error report", status=404)
+        return FileResponse(
+            voucher_import.error_report.open('rb'),
+            as_attachment=True,
+            filename=f"import-{voucher_import.id}-errors.csv",
+            content_type='text/csv'
+        )
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Business, Document, ExtractedLineItem
+from .models import AIExtraction, Business, Document, ExtractedLineItem, LedgerRule, ProcessingJob
 
 
 # =====================================================
@@ -116,3 +116,53 @@ class ExtractedLineItemAdmin(admin.ModelAdmin):
     search_fields = ('vendor', 'invoice_no', 'ledger_account')
     ordering = ('-id',)
     autocomplete_fields = ('document',)
+
+
+# =====================================================
+# ⚙️ PROCESSING JOB ADMIN
+# =====================================================
+
+@admin.register(ProcessingJob)
+class ProcessingJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'document', 'status',
+        'attempts', 'max_attempts',
+        'run_after', 'locked_by', 'finished_at'
+    )
+
+    list_filter = ('status',)
+
+    search_fields = ('document__business__name', 'last_error')
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at', 'locked_by', 'locked_at', 'finished_at')
+    autocomplete_fields = ('document',)
+
+
+# =====================================================
+# 🤖 AI EXTRACTION ADMIN
+# =====================================================
+
+@admin.register(AIExtraction)
+class AIExtractionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'document', 'updated_at')
+
+    search_fields = ('document__business__name',)
+    ordering = ('-updated_at',)
+    readonly_fields = ('updated_at',)
+    autocomplete_fields = ('document',)
+
+
+# =====================================================
+# 🏷️ LEDGER RULE ADMIN
+# =====================================================
+
+@admin.register(LedgerRule)
+class LedgerRuleAdmin(admin.ModelAdmin):
+    list_display = ('id', 'business', 'keyword', 'ledger_account', 'priority', 'is_active')
+
+    list_filter = (DocumentBusinessFilter, 'is_active')
+
+    search_fields = ('keyword', 'ledger_account', 'business__name')
+    ordering = ('business', '-priority', 'keyword')
+    readonly_fields = ('updated_at',)
+    autocomplete_fields = ('business',)
@@ -1,6 +1,73 @@
-from rest_framework.decorators import api_view
+import os
+
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from .bulk_upload import bulk_upload
+from .models import Business, Document, ProcessingJob, UploadBatch
+
+# Document statuses that need no more work
+FINISHED_STATUSES = ('processed', 'duplicate', 'failed')
+
+
 @api_view(['GET'])
 def health(request):
     return Response({'status':'ok'})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_batch(request, business_id):
+    """
+    Upload many files (repeat the `files` field) and/or ZIP archives at once.
+    """
+    business = get_object_or_404(Business, pk=business_id, created_by=request.user)
+    files = request.FILES.getlist('files')
+    if not files:
+        return Response({'error': "No files uploaded."}, status=status.HTTP_400_BAD_REQUEST)
+
+    doc_type = request.data.get('doc_type') or 'receipt'
+    if doc_type not in dict(Document.DOC_TYPES):
+        return Response({'error': f"Unknown doc_type '{doc_type}'."}, status=status.HTTP_400_BAD_REQUEST)
+
+    batch, results = bulk_upload(business, request.user, files, doc_type)
+    return Response({'batch_id': batch.id, 'files': results}, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def batch_status(request, batch_id):
+    batch = get_object_or_404(UploadBatch, pk=batch_id, business__created_by=request.user)
+    docs = batch.documents.order_by('id').prefetch_related(
+        Prefetch('jobs', queryset=ProcessingJob.objects.order_by('-created_at'), to_attr='recent_jobs')
+    )
+
+    files = []
+    counts = {}
+    for d in docs:
+        job = d.recent_jobs[0] if d.recent_jobs else None
+        counts[d.status] = counts.get(d.status, 0) + 1
+        files.append({
+            'document_id': d.id,
+            'name': os.path.basename(d.file.name),
+            'status': d.status,
+            'duplicate_of': d.duplicate_of_id,
+            'job_status': job.status if job else None,
+            'attempts': job.attempts if job else 0,
+            'error': job.last_error if job else None,
+        })
+
+    finished = sum(counts.get(s, 0) for s in FINISHED_STATUSES)
+    return Response({
+        'batch_id': batch.id,
+        'total': len(files),
+        'finished': finished,
+        'progress': finished / len(files) if files else 1.0,
+        'counts': counts,
+        'files': files,
+        'rejected': batch.rejected,
+    })
@@ -0,0 +1,177 @@
+"""
+Bulk uploads: many files or ZIP archives in one request.
+
+Every file (or archive member) is streamed to storage in chunks while it is
+hashed, so archives are never held in memory. The resulting documents are
+inserted with one bulk_create per kind (new / duplicate) and queued as a batch.
+"""
+import hashlib
+import os
+import zipfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, transaction
+
+from .jobs import enqueue_documents
+from .models import Document, UploadBatch
+from .uploads import link_duplicate, save_upload
+
+ARCHIVE_EXTENSIONS = ('.zip',)
+
+
+def allowed_extensions():
+    validators = Document._meta.get_field('file').validators
+    return {ext for v in validators for ext in getattr(v, 'allowed_extensions', None) or ()}
+
+
+def max_file_size():
+    return getattr(settings, 'BULK_UPLOAD_MAX_FILE_SIZE', 10 * 1024 * 1024)
+
+
+class UploadRejected(Exception):
+    pass
+
+
+class HashingReader:
+    """File-like wrapper that hashes and size-checks data as storage reads it."""
+
+    def __init__(self, fileobj, limit):
+        self.fileobj = fileobj
+        self.limit = limit
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def read(self, n=-1):
+        data = self.fileobj.read(n)
+        self.size += len(data)
+        if self.size > self.limit:
+            raise UploadRejected(f"File exceeds {self.limit // (1024 * 1024)}MB limit.")
+        self.sha256.update(data)
+        return data
+
+
+def iter_members(uploaded_files):
+    """
+    Yield (name, open_fn) for every uploaded file and every file inside uploaded ZIPs.
+    Invalid archives yield (name, exception) instead.
+    """
+    for f in uploaded_files:
+        if not f.name.lower().endswith(ARCHIVE_EXTENSIONS):
+            yield f.name, (lambda f=f: f)
+            continue
+        try:
+            archive = zipfile.ZipFile(f)
+        except zipfile.BadZipFile as e:
+            yield f.name, UploadRejected(f"Invalid ZIP archive: {e}")
+            continue
+        with archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('.'):
+                    continue
+                if info.file_size > max_file_size():
+                    yield name, UploadRejected(f"File exceeds {max_file_size() // (1024 * 1024)}MB limit.")
+                    continue
+                yield name, (lambda info=info, archive=archive: archive.open(info))
+
+
+def _store(doc, name, fileobj):
+    """Stream one file into the document's storage location; returns its SHA-256."""
+    field = Document._meta.get_field('file')
+    reader = HashingReader(fileobj, max_file_size())
+    storage = field.storage
+    target = storage.get_available_name(
+        field.generate_filename(doc, os.path.basename(name)), max_length=field.max_length
+    )
+    try:
+        doc.file.name = storage.save(target, File(reader, name=target), max_length=field.max_length)
+    except Exception:
+        storage.delete(target)  # drop the partially written file
+        raise
+    return reader.sha256.hexdigest()
+
+
+def bulk_upload(business, user, uploaded_files, doc_type='receipt'):
+    """
+    Store every file, create the documents and queue them.
+    Returns (batch, results) where results has one dict per file in upload order.
+    """
+    extensions = allowed_extensions()
+    batch = UploadBatch.objects.create(business=business, uploaded_by=user)
+
+    results = []
+    staged = []  # (result, doc, checksum)
+    for name, opener in iter_members(uploaded_files):
+        result = {"name": name}
+        results.append(result)
+        if isinstance(opener, Exception):
+            result.update(status="rejected", error=str(opener))
+            continue
+        if os.path.splitext(name)[1].lstrip('.').lower() not in extensions:
+            result.update(status="rejected", error="Unsupported file type.")
+            continue
+
+        doc = Document(business=business, uploaded_by=user, doc_type=doc_type, batch=batch, status='queued')
+        try:
+            with opener() as fileobj:
+                checksum = _store(doc, name, fileobj)
+        except Exception as e:
+            # Damaged members fail in many ways (BadZipFile, zlib.error, EOFError, RuntimeError when
+            # encrypted, NotImplementedError for unknown compression); any of them rejects just this file
+            result.update(status="rejected", error=str(e) or type(e).__name__)
+            continue
+        staged.append((result, doc, checksum))
+
+    new_docs, duplicates = _split_duplicates(business, staged)
+    try:
+        with transaction.atomic():
+            Document.objects.bulk_create(new_docs)
+            # Duplicates of files first seen in this batch pick up the pks assigned above
+            Document.objects.bulk_create([doc for doc, _ in duplicates])
+    except IntegrityError:
+        # A concurrent upload stored one of these files first; resolve one by one
+        for doc in new_docs:
+            doc.pk = None
+            stored = doc.file.name
+            if save_upload(doc, doc.checksum) is not None:
+                doc.file.storage.delete(stored)
+        for doc, original in duplicates:
+            doc.pk = None
+            doc.duplicate_of = original.source
+            doc.save()
+
+    enqueue_documents([doc for doc in new_docs if doc.duplicate_of_id is None])
+
+    for result, doc, _ in staged:
+        result.update(document_id=doc.id, status=doc.status)
+        if doc.duplicate_of_id:
+            result["duplicate_of"] = doc.duplicate_of_id
+
+    batch.file_count = len(staged)
+    batch.rejected = [r for r in results if r["status"] == "rejected"]
+    batch.save(update_fields=['file_count', 'rejected'])
+    return batch, results
+
+
+def _split_duplicates(business, staged):
+    """Separate new content from files the business (or this batch) already has, in one query."""
+    checksums = {checksum for _, _, checksum in staged}
+    existing = {
+        d.checksum: d for d in Document.objects.filter(business=business, checksum__in=checksums)
+    }
+
+    new_docs, duplicates = [], []
+    first_in_batch = {}
+    for _, doc, checksum in staged:
+        original = existing.get(checksum) or first_in_batch.get(checksum)
+        if original is None:
+            doc.checksum = checksum
+            first_in_batch[checksum] = doc
+            new_docs.append(doc)
+            continue
+        # Already stored once; drop this copy and point at the original's file
+        doc.file.delete(save=False)
+        link_duplicate(doc, original)
+        duplicates.append((doc, original))
+    return new_docs, duplicates
@@ -0,0 +1,173 @@
+"""
+Keyword -> ledger account classification.
+
+All keywords for a business (its LedgerRule rows plus the LEDGER_MAP defaults)
+are compiled into one Aho-Corasick automaton, so a line is scanned once no
+matter how many rules there are. When several keywords match, business rules
+beat defaults, then the higher priority wins, then the longer keyword, then
+the earlier rule. Compiled classifiers are cached per business and rebuilt
+when its rules change.
+"""
+import threading
+from collections import deque
+
+from django.db.models import Count, Max
+
+from .models import LedgerRule
+
+# ---------- DEFAULT RULES ----------
+LEDGER_MAP = {
+    'rent': 'Rent Expense',
+    'salary': 'Salary Expense',
+    'office': 'Office Expense',
+    'sale': 'Sales Revenue',
+    'purchase': 'Purchases',
+    'bank': 'Bank',
+}
+
+UNCATEGORIZED = 'Uncategorized'
+
+# Below this many keywords a plain substring loop beats walking the automaton in Python
+# (crossover measured with manage.py bench_classifier)
+AUTOMATON_MIN_RULES = 128
+
+
+# ---------- AUTOMATON ----------
+class KeywordAutomaton:
+    """
+    Aho-Corasick matcher over (keyword, value, rank) entries.
+    `best(text)` returns the value of the highest-ranked keyword found in text.
+    """
+
+    def __init__(self, entries):
+        goto = [{}]
+        rank = [-1]
+        value = [None]
+        for keyword, val, r in entries:
+            node = 0
+            for ch in keyword:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    rank.append(-1)
+                    value.append(None)
+                node = nxt
+            if r > rank[node]:
+                rank[node], value[node] = r, val
+
+        # Failure links in BFS order; each node also inherits the best match of its
+        # failure chain, so the scan only needs to look at the current node
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                if rank[fail[child]] > rank[child]:
+                    rank[child], value[child] = rank[fail[child]], value[fail[child]]
+                queue.append(child)
+
+        self._goto = goto
+        self._fail = fail
+        self._rank = rank
+        self._value = value
+
+    def best(self, text):
+        goto, fail, rank = self._goto, self._fail, self._rank
+        node = 0
+        best_rank, best_node = -1, 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if rank[node] > best_rank:
+                best_rank, best_node = rank[node], node
+        return self._value[best_node] if best_rank >= 0 else None
+
+
+class _SubstringMatcher:
+    """Same answers as KeywordAutomaton for small rule sets, using `in` checks."""
+
+    def __init__(self, entries):
+        self._entries = sorted(entries, key=lambda e: e[2], reverse=True)
+
+    def best(self, text):
+        for keyword, val, _ in self._entries:
+            if keyword in text:
+                return val
+        return None
+
+
+# ---------- CLASSIFIER ----------
+class LedgerClassifier:
+    """
+    `rules` is an iterable of (keyword, ledger_account, priority) in rule order;
+    they take precedence over `defaults` (keyword -> ledger, earlier wins).
+    """
+
+    def __init__(self, rules=(), defaults=None):
+        defaults = LEDGER_MAP if defaults is None else defaults
+        candidates = []
+        # Defaults keep their original first-in-map-wins order
+        for order, (keyword, ledger) in enumerate(defaults.items()):
+            candidates.append(((0, -order, 0, 0), keyword.lower(), ledger))
+        for order, (keyword, ledger, priority) in enumerate(rules):
+            keyword = keyword.lower()
+            if keyword:
+                candidates.append(((1, priority, len(keyword), -order), keyword, ledger))
+
+        candidates.sort(key=lambda c: c[0])
+        entries = [(keyword, ledger, rank) for rank, (_, keyword, ledger) in enumerate(candidates)]
+        self.rule_count = len(entries)
+        matcher = KeywordAutomaton if len(entries) >= AUTOMATON_MIN_RULES else _SubstringMatcher
+        self._matcher = matcher(entries)
+
+    def classify(self, vendor_or_description):
+        if not vendor_or_description:
+            return UNCATEGORIZED
+        return self._matcher.best(vendor_or_description.lower()) or UNCATEGORIZED
+
+
+_default_classifier = LedgerClassifier()
+
+
+def default_classifier():
+    return _default_classifier
+
+
+# ---------- PER-BUSINESS CACHE ----------
+_cache = {}  # business_id -> (stamp, LedgerClassifier)
+_cache_lock = threading.Lock()
+
+
+def _rules_stamp(business_id):
+    # Any insert, edit or delete changes the count or the newest updated_at
+    stamp = LedgerRule.objects.filter(business_id=business_id).aggregate(
+        count=Count('id'), last=Max('updated_at')
+    )
+    return stamp['count'], stamp['last']
+
+
+def get_classifier(business_id):
+    """Compiled classifier for a business; one cheap query checks it is still current."""
+    stamp = _rules_stamp(business_id)
+    if stamp[0] == 0:
+        return _default_classifier
+
+    cached = _cache.get(business_id)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    rules = LedgerRule.objects.filter(business_id=business_id, is_active=True).order_by('id').values_list(
+        'keyword', 'ledger_account', 'priority'
+    )
+    classifier = LedgerClassifier(rules)
+    with _cache_lock:
+        _cache[business_id] = (stamp, classifier)
+    return classifier
+
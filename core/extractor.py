@@ -0,0 +1,124 @@
+"""
+Line extraction engine for OCR text.
+
+Patterns are compiled once at import. Each line is checked with cheap
+substring tests and a single keyword scan before any field pattern runs, so
+most lines only pay for the patterns that can actually match them. Results are
+identical to the per-line ``re.search`` / ``re.findall`` calls the processor
+used to make.
+"""
+import re
+from datetime import date
+from decimal import Decimal
+
+from .models import ExtractedLineItem
+
+# ---------- PATTERNS ----------
+DATE_RE = re.compile(r'(\d{2}[-/]\d{2}[-/]\d{4})')
+AMOUNT_RE = re.compile(r'\d+\.\d{2}')
+INVOICE_RE = re.compile(r'(?:INV|Invoice)\s*[:\s]*([A-Za-z0-9-]+)', re.IGNORECASE)
+VENDOR_RE = re.compile(r'(?:Vendor|From|Bill From)[:\s]*([A-Za-z0-9 &]+)', re.IGNORECASE)
+GST_RATE_RE = re.compile(r'(\d{1,2})\s*%')
+TAX_AMOUNT_RE = re.compile(r'(?:Amount|Total|Tax|Rs\.?)[:\s]+(\d+\.\d{2})', re.IGNORECASE)
+
+# Every keyword-anchored pattern above needs one of these words to match
+KEYWORD_RE = re.compile(r'inv|vendor|from|amount|total|tax|rs', re.IGNORECASE)
+
+_VENDOR_MAX = ExtractedLineItem._meta.get_field('vendor').max_length
+_INVOICE_MAX = ExtractedLineItem._meta.get_field('invoice_no').max_length
+
+
+def _parse_date(value):
+    # Same result as strptime(value.replace('-', '/'), "%d/%m/%Y") without the parsing overhead
+    try:
+        return date(int(value[6:10]), int(value[3:5]), int(value[0:2]))
+    except ValueError:
+        return None
+
+
+def scan_line(line):
+    """
+    Extract raw field matches from one stripped line.
+    Returns a dict of strings, or None when the line carries no data.
+    """
+    found = {}
+
+    if '/' in line or '-' in line:
+        m = DATE_RE.search(line)
+        if m:
+            found['date'] = m.group(1)
+
+    if '.' in line:
+        amounts = AMOUNT_RE.findall(line)
+        if amounts:
+            found['amount'] = amounts[-1]
+
+    if KEYWORD_RE.search(line):
+        m = INVOICE_RE.search(line)
+        if m:
+            found['invoice'] = m.group(1)
+        m = VENDOR_RE.search(line)
+        if m:
+            found['vendor'] = m.group(1)
+        m = TAX_AMOUNT_RE.search(line)
+        if m:
+            found['tax_amount'] = m.group(1)
+
+    # A tax amount always comes with an amount, so `found` is only empty for lines without data
+    if not found:
+        return None
+
+    if '%' in line:
+        m = GST_RATE_RE.search(line)
+        if m:
+            found['gst_rate'] = m.group(1)
+    return found
+
+
+class LineExtractor:
+    """
+    Turns OCR text into unsaved ExtractedLineItem objects.
+    `classify` maps a vendor name or raw line to a ledger account.
+    """
+
+    def __init__(self, classify):
+        self.classify = classify
+
+    def extract(self, doc, text, raw_extra=None):
+        items = []
+        for raw_line in text.split('\n'):
+            line = raw_line.strip()
+            if not line:
+                continue
+            found = scan_line(line)
+            if found is None:
+                continue
+            items.append(self._build_item(doc, line, found, raw_extra))
+        return items
+
+    def _build_item(self, doc, line, found, raw_extra):
+        item = ExtractedLineItem(document=doc)
+
+        if 'date' in found:
+            item.date = _parse_date(found['date'])
+
+        # Amount: last one on the line (usually the total)
+        if 'amount' in found:
+            item.amount = Decimal(found['amount'])
+
+        if 'invoice' in found:
+            item.invoice_no = found['invoice'][:_INVOICE_MAX]
+
+        vendor_name = found.get('vendor')
+        item.vendor = vendor_name[:_VENDOR_MAX] if vendor_name else None
+        item.ledger_account = self.classify(vendor_name or line)
+
+        rate = found.get('gst_rate')
+        item.gst_rate = rate + '%' if rate else None
+        tax = found.get('tax_amount')
+        item.tax_amount = Decimal(tax) if tax else None
+
+        item.raw = {"raw_line": line}
+        if raw_extra:
+            item.raw.update(raw_extra)
+        return item
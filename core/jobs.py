@@ -0,0 +1,166 @@
+"""
+DB-backed job queue for document processing.
+
+Uploads and reprocess requests call `enqueue_document`; `manage.py run_worker`
+claims jobs with `claim_jobs` and runs each one with `run_job`. OCR is handed
+to a process pool, the AI and DB steps run on the calling (worker) thread.
+"""
+import logging
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Document, ProcessingJob
+from .ocr import extract_text
+from .processor import process_document
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = (ProcessingJob.QUEUED, ProcessingJob.RETRYING)
+ACTIVE_STATUSES = PENDING_STATUSES + (ProcessingJob.RUNNING,)
+
+
+def job_setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ---------- PRODUCER ----------
+def enqueue_document(doc: Document):
+    """Queue the document, or return its job already queued or running; never two at once."""
+    with transaction.atomic():
+        # The row lock serialises concurrent reprocess requests for one document
+        list(Document.objects.select_for_update().filter(pk=doc.pk).values_list('pk', flat=True))
+        active = doc.jobs.filter(status__in=ACTIVE_STATUSES).first()
+        if active is not None:
+            return active
+        doc.status = 'queued'
+        doc.save(update_fields=['status'])
+        return ProcessingJob.objects.create(
+            document=doc,
+            max_attempts=job_setting('JOB_MAX_ATTEMPTS', 3),
+        )
+
+
+def enqueue_documents(docs):
+    """Queue many saved documents with one status UPDATE and one INSERT."""
+    if not docs:
+        return []
+    Document.objects.filter(id__in=[d.id for d in docs]).update(status='queued')
+    max_attempts = job_setting('JOB_MAX_ATTEMPTS', 3)
+    return ProcessingJob.objects.bulk_create(
+        [ProcessingJob(document=d, max_attempts=max_attempts) for d in docs]
+    )
+
+
+# ---------- CONSUMER ----------
+def claim_jobs(worker_id, limit):
+    """
+    Atomically mark up to `limit` due jobs as running for this worker.
+    Safe with several workers: the UPDATE only wins for rows still pending.
+    """
+    if limit <= 0:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        due = ProcessingJob.objects.filter(
+            status__in=PENDING_STATUSES, run_after__lte=now
+        ).order_by('run_after')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('id', flat=True)[:limit])
+
+        ProcessingJob.objects.filter(id__in=ids, status__in=PENDING_STATUSES).update(
+            status=ProcessingJob.RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+
+    return list(
+        ProcessingJob.objects.filter(
+            id__in=ids, status=ProcessingJob.RUNNING, locked_by=worker_id
+        ).select_related('document', 'document__business')
+    )
+
+
+def release_stale_jobs():
+    """Put jobs from crashed workers back in the queue."""
+    timeout = job_setting('JOB_LOCK_TIMEOUT', 30 * 60)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return ProcessingJob.objects.filter(
+        status=ProcessingJob.RUNNING, locked_at__lt=cutoff
+    ).update(status=ProcessingJob.RETRYING, locked_by=None, locked_at=None)
+
+
+def run_job(job: ProcessingJob, ocr_executor=None):
+    """
+    Run one claimed job. `ocr_executor` is an optional process pool for OCR;
+    without one images are OCRed inline and PDFs start their own pool. If the
+    pool is broken the job goes back in the queue and BrokenProcessPool is
+    raised, so the caller can replace the pool.
+    """
+    doc = job.document
+    try:
+        doc.status = 'processing'
+        doc.save(update_fields=['status'])
+
+        # ---------- OCR ----------
+        doc.ocr_text = extract_text(doc.file.path, doc.checksum, ocr_executor)
+        doc.save(update_fields=['ocr_text'])
+
+        # ---------- AI + LINES ----------
+        process_document(doc)
+
+        job.status = ProcessingJob.DONE
+        job.last_error = None
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'last_error', 'finished_at'])
+    except BrokenProcessPool:
+        logger.warning("OCR pool broke during job %s; requeued", job.id)
+        _requeue_job(job)
+        raise
+    except Exception as e:
+        logger.exception("Job %s for document %s failed", job.id, doc.id)
+        _fail_job(job, e)
+    finally:
+        close_old_connections()
+    return job
+
+
+def _requeue_job(job):
+    """Back in the queue without using up an attempt; the pool failed, not the document."""
+    job.status = ProcessingJob.RETRYING
+    job.attempts = max(0, job.attempts - 1)
+    job.run_after = timezone.now()
+    job.locked_by = None
+    job.locked_at = None
+    job.save(update_fields=['status', 'attempts', 'run_after', 'locked_by', 'locked_at'])
+    job.document.status = 'queued'
+    job.document.save(update_fields=['status'])
+
+
+def _fail_job(job, error):
+    doc = job.document
+    job.last_error = f"{type(error).__name__}: {error}"
+    job.locked_by = None
+    job.locked_at = None
+
+    if job.attempts < job.max_attempts:
+        backoff = job_setting('JOB_RETRY_BACKOFF', 30)
+        job.status = ProcessingJob.RETRYING
+        job.run_after = timezone.now() + timedelta(seconds=backoff * 2 ** (job.attempts - 1))
+        doc.status = 'queued'
+    else:
+        job.status = ProcessingJob.FAILED
+        job.finished_at = timezone.now()
+        doc.status = 'failed'
+        if not doc.ocr_text:
+            doc.ocr_text = f'OCR failed. Error: {error}'
+
+    job.save(update_fields=['status', 'run_after', 'last_error', 'locked_by', 'locked_at', 'finished_at'])
+    doc.save(update_fields=['status', 'ocr_text'])
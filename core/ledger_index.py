@@ -0,0 +1,300 @@
+"""
+Ledger suggestions learned from verified line items.
+
+Each distinct vendor name or narration a business has verified becomes a row
+of hashed character n-gram counts (3- and 4-grams folded into LEDGER_INDEX_DIM
+buckets) together with the ledgers it was verified as. A query is TF-IDF
+weighted and compared with every row in one sparse-by-dense product; the close
+neighbours vote for a ledger, and the confidence says how similar and how
+unanimous they were. Documents whose lines are all suggested with enough
+confidence skip the AI call.
+
+The verified lines in the database are the record of truth. A verification
+(core.signals) updates the worker's index in memory only; the .npz file per
+business is always rebuilt from the database, once LEDGER_INDEX_REBUILD_AFTER
+changes or LEDGER_INDEX_REBUILD_INTERVAL seconds have piled up in a worker (or
+by `manage.py rebuild_ledger_index`). So workers start without rescanning the
+database, concurrent workers never overwrite each other's votes, and a worker
+notices a newer file written by another process and reloads it.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .models import ExtractedLineItem
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZES = (3, 4)
+# Neighbours considered per query, and the similarity below which they do not vote
+TOP_K = 5
+MIN_SIMILARITY = 0.5
+
+_DIGITS_RE = re.compile(r'\d+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    # Dates, amounts and reference numbers differ on every statement line
+    text = _DIGITS_RE.sub('#', (text or '').casefold())
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def line_text(line):
+    """What a line is classified by: its vendor, else the raw OCR line."""
+    return line.vendor or (line.raw or {}).get('raw_line') or ''
+
+
+def ngram_buckets(text, dim):
+    padded = f" {text} "
+    return [
+        zlib.crc32(padded[i:i + n].encode()) % dim
+        for n in NGRAM_SIZES
+        for i in range(len(padded) - n + 1)
+    ]
+
+
+# ---------- INDEX ----------
+class LedgerIndex:
+    def __init__(self, dim=None):
+        self.dim = dim or getattr(settings, 'LEDGER_INDEX_DIM', 2048)
+        self.keys = []  # normalized text per row
+        self.votes = []  # Counter of ledger -> verified lines, per row
+        self._rows = {}  # key -> row
+        self._counts = np.zeros((0, self.dim), dtype=np.uint16)  # n-gram counts, capacity >= len(keys)
+        self._df = np.zeros(self.dim, dtype=np.int32)
+        self._weighted = None  # L2-normalized TF-IDF rows (transposed), rebuilt lazily after changes
+        self._idf = None
+        self._lock = threading.Lock()
+        self.mtime = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    # ---------- UPDATES ----------
+    def add(self, text, ledger, count=1):
+        key = normalize_text(text)
+        if not key or not ledger:
+            return
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                row = self._append_row(key)
+            self.votes[row][ledger] += count
+
+    def remove(self, text, ledger, count=1):
+        key = normalize_text(text)
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                return
+            votes = self.votes[row]
+            votes[ledger] -= count
+            if votes[ledger] <= 0:
+                del votes[ledger]
+
+    def _append_row(self, key):
+        row = len(self.keys)
+        if row == len(self._counts):
+            grown = np.zeros((max(64, row * 2), self.dim), dtype=np.uint16)
+            grown[:row] = self._counts[:row]
+            self._counts = grown
+        buckets = np.bincount(ngram_buckets(key, self.dim), minlength=self.dim)
+        self._counts[row] = np.minimum(buckets, np.iinfo(np.uint16).max)
+        self._df += buckets > 0
+        self.keys.append(key)
+        self.votes.append(Counter())
+        self._rows[key] = row
+        self._weighted = None
+        return row
+
+    # ---------- QUERIES ----------
+    def _matrix(self):
+        if self._weighted is None:
+            n = len(self.keys)
+            # Smoothed IDF; sublinear TF so a repeated n-gram does not dominate
+            self._idf = (np.log((1 + n) / (1 + self._df)) + 1).astype(np.float32)
+            weighted = np.log1p(self._counts[:n].astype(np.float32)) * self._idf
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            # Bucket-major, so a query only reads the rows of the buckets it has
+            self._weighted = np.ascontiguousarray((weighted / norms).T)
+        return self._weighted, self._idf
+
+    def suggest(self, text):
+        """(ledger, confidence in 0..1), or (None, 0.0) when nothing close has been verified."""
+        key = normalize_text(text)
+        if not key or not self.keys:
+            return None, 0.0
+        with self._lock:
+            matrix, idf = self._matrix()
+            votes = self.votes
+
+        buckets, counts = np.unique(ngram_buckets(key, self.dim), return_counts=True)
+        query = np.log1p(counts.astype(np.float32)) * idf[buckets]
+        query /= np.linalg.norm(query)
+        sims = query @ matrix[buckets]
+        k = min(TOP_K, len(sims))
+        nearest = np.argpartition(-sims, k - 1)[:k]
+
+        scores = Counter()
+        supports = Counter()
+        total = 0.0
+        best_sim = 0.0
+        for row in nearest:
+            sim = float(sims[row])
+            row_votes = votes[row]
+            if sim < MIN_SIMILARITY or not row_votes:
+                continue
+            n = sum(row_votes.values())
+            for ledger, count in row_votes.items():
+                scores[ledger] += sim * count / n
+                supports[ledger] += count
+            total += sim
+            best_sim = max(best_sim, sim)
+        if not scores:
+            return None, 0.0
+
+        ledger, score = scores.most_common(1)[0]
+        # Similar, unanimous neighbours, verified more than once
+        min_support = getattr(settings, 'LEDGER_INDEX_MIN_SUPPORT', 2)
+        confidence = best_sim * (score / total) * min(1.0, supports[ledger] / min_support)
+        return ledger, round(confidence, 4)
+
+    # ---------- PERSISTENCE ----------
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            n = len(self.keys)
+            meta = {'dim': self.dim, 'keys': self.keys, 'votes': [dict(v) for v in self.votes]}
+            counts = self._counts[:n].copy()
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, counts=counts, meta=np.array(json.dumps(meta)))
+        # Readers see either the old file or the new one, never a partial write
+        os.replace(tmp, path)
+        self.mtime = path.stat().st_mtime
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            counts = data['counts']
+        index = cls(dim=meta['dim'])
+        index.keys = meta['keys']
+        index.votes = [Counter(v) for v in meta['votes']]
+        index._rows = {key: row for row, key in enumerate(index.keys)}
+        index._counts = counts
+        index._df = (counts > 0).sum(axis=0).astype(np.int32)
+        index.mtime = path.stat().st_mtime
+        return index
+
+    @classmethod
+    def build(cls, business_id):
+        """From the business's verified lines."""
+        index = cls()
+        lines = ExtractedLineItem.objects.filter(
+            document__business_id=business_id, is_verified=True
+        ).exclude(ledger_account__isnull=True).exclude(ledger_account='').only('vendor', 'raw', 'ledger_account')
+        pairs = Counter((line_text(line), line.ledger_account) for line in lines.iterator(chunk_size=2000))
+        for (text, ledger), count in pairs.items():
+            index.add(text, ledger, count)
+        return index
+
+
+# ---------- PER-BUSINESS CACHE ----------
+_indexes = {}
+_pending = {}  # business_id -> verifications applied in memory since the file was last rebuilt here
+_indexes_lock = threading.Lock()
+
+
+def index_path(business_id):
+    return Path(getattr(settings, 'LEDGER_INDEX_DIR', Path(settings.BASE_DIR) / 'ledger_index')) / f"{business_id}.npz"
+
+
+def get_ledger_index(business_id):
+    """The business's index: in memory, else from disk, else built from the database and saved."""
+    path = index_path(business_id)
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        mtime = None
+
+    index = _indexes.get(business_id)
+    if index is not None and (mtime is None or index.mtime is None or mtime <= index.mtime):
+        return index
+
+    with _indexes_lock:
+        index = _indexes.get(business_id)
+        if index is not None and mtime is not None and index.mtime is not None and mtime > index.mtime:
+            index = None  # saved by another process since we loaded it
+        if index is None:
+            if mtime is not None:
+                try:
+                    index = LedgerIndex.load(path)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning("Ledger index %s unreadable, rebuilding: %s", path, e)
+            if index is None:
+                index = rebuild_ledger_index(business_id, cache=False)
+            _indexes[business_id] = index
+    return index
+
+
+def rebuild_ledger_index(business_id, cache=True):
+    index = LedgerIndex.build(business_id)
+    index.save(index_path(business_id))
+    if cache:  # else the caller holds _indexes_lock and stores it
+        with _indexes_lock:
+            _indexes[business_id] = index
+            _pending.pop(business_id, None)
+    return index
+
+
+def record_verification(business_id, added=None, removed=None):
+    """
+    Teach the in-memory index (text, ledger) pairs a user confirmed or took back.
+    The file is rebuilt from the database once enough changes or time have passed.
+    """
+    index = get_ledger_index(business_id)
+    for text, ledger in removed or ():
+        index.remove(text, ledger)
+    for text, ledger in added or ():
+        index.add(text, ledger)
+
+    with _indexes_lock:
+        pending = _pending[business_id] = _pending.get(business_id, 0) + 1
+    age = time.time() - index.mtime if index.mtime is not None else float('inf')
+    if (pending >= getattr(settings, 'LEDGER_INDEX_REBUILD_AFTER', 50)
+            or age >= getattr(settings, 'LEDGER_INDEX_REBUILD_INTERVAL', 300)):
+        rebuild_ledger_index(business_id)
+
+
+def suggest_ledgers(business_id, items):
+    """
+    Give unsaved lines the index's ledger where it is confident enough.
+    Returns the lowest confidence when every line was covered (the AI call can
+    be skipped), else None.
+    """
+    if not items:
+        return None
+    threshold = getattr(settings, 'LEDGER_INDEX_CONFIDENCE', 0.8)
+    index = get_ledger_index(business_id)
+    lowest = 1.0
+    for item in items:
+        ledger, confidence = index.suggest(line_text(item))
+        if ledger is not None and confidence >= threshold:
+            item.ledger_account = ledger
+            item.raw['ledger_confidence'] = confidence
+        lowest = min(lowest, confidence)
+    return lowest if lowest >= threshold else None
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ai_bridge.cache import get_response_cache
+
+
+class Command(BaseCommand):
+    help = "Show AI response cache statistics, purge expired entries, or clear the cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help="Delete all entries and reset counters")
+        parser.add_argument('--purge-expired', action='store_true', help="Delete entries older than AI_CACHE_TTL")
+
+    def handle(self, *args, **opts):
+        cache = get_response_cache()
+        if cache is None:
+            raise CommandError("AI response cache is disabled (AI_CACHE_PATH is not set).")
+
+        if opts['clear']:
+            cache.clear()
+            self.stdout.write(self.style.SUCCESS(f"Cleared {cache.path}"))
+            return
+        if opts['purge_expired']:
+            self.stdout.write(self.style.SUCCESS(f"Purged {cache.purge_expired()} expired entries"))
+
+        stats = cache.stats()
+        self.stdout.write(f"Database:  {cache.path}")
+        self.stdout.write(f"Entries:   {stats['entries']} of {stats['max_entries']} ({stats['bytes'] / 1024 / 1024:.1f} MiB)")
+        self.stdout.write(f"TTL:       {stats['ttl'] / 86400:.0f} days")
+        self.stdout.write(f"Hits:      {stats['hits']}")
+        self.stdout.write(f"Misses:    {stats['misses']}")
+        self.stdout.write(f"Evictions: {stats['evictions']}")
+        self.stdout.write(f"Hit rate:  {stats['hit_rate']:.1%}")
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import random
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from apps.ai_bridge.fake_server import FakeOllamaServer
+from apps.ai_bridge.providers.Ollama_provider import OllamaProvider
+from apps.ai_bridge.registry import create_provider, provider_configs
+
+FIELDS = ('vendor', 'invoice_no', 'date', 'total_amount', 'tax_amount')
+VENDORS = ['Sharma Traders', 'Office Mart', 'City Rent Co', 'Purchase Depot', 'Metro Stationers']
+
+
+def synthetic_invoice(rng):
+    """OCR-like invoice text and the fields a correct extraction returns."""
+    labels = {
+        'vendor': rng.choice(VENDORS),
+        'invoice_no': f"INV-{rng.randint(1000, 99999)}",
+        'date': f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+        'tax_amount': f"{rng.uniform(5, 900):.2f}",
+    }
+    items = [f"Item {rng.randint(1, 500)} x{rng.randint(1, 9)}   {rng.uniform(10, 5000):.2f}"
+             for _ in range(rng.randint(2, 15))]
+    labels['total_amount'] = f"{rng.uniform(5000, 90000):.2f}"
+    text = "\n".join([
+        f"Bill From: {labels['vendor']}",
+        f"INV {labels['invoice_no']}",
+        f"Date: {labels['date']}",
+        *items,
+        f"CGST 9%  Tax: {labels['tax_amount']}",
+        f"Total: {labels['total_amount']}",
+        "Thank you for your business",
+    ])
+    return text, labels
+
+
+def _normalize(value):
+    if value is None:
+        return ''
+    text = str(value).strip().casefold()
+    try:
+        return str(Decimal(text.replace(',', '')).normalize())
+    except InvalidOperation:
+        return text
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Command(BaseCommand):
+    help = "Replay a corpus of OCR texts through an AI provider and report latency, validity and accuracy."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--provider', default='ollama',
+                            help="A name from AI_PROVIDERS or a dotted path to a BaseAIProvider subclass")
+        parser.add_argument('--base-url', help="Ollama server to use instead of the bundled fake server")
+        parser.add_argument('--model', default='llama3.1')
+        parser.add_argument('--corpus', help="Directory of <name>.txt OCR texts with optional <name>.json labels")
+        parser.add_argument('--synthetic', type=int, default=200, help="Generated invoices when no corpus is given")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--stream', action='store_true', help="Use Ollama streaming with early stop")
+        parser.add_argument('--warm-up', action='store_true', help="Preload the model before the run")
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--output', help="Write results as JSON to this path")
+        fake = parser.add_argument_group('fake server profile')
+        fake.add_argument('--latency', type=float, default=0.2, help="Seconds per request")
+        fake.add_argument('--jitter', type=float, default=0.05)
+        fake.add_argument('--error-rate', type=float, default=0.0)
+        fake.add_argument('--invalid-json-rate', type=float, default=0.0)
+        fake.add_argument('--tokens-per-second', type=float)
+        fake.add_argument('--load-time', type=float, default=0.0, help="Model load on the first request")
+
+    def handle(self, *args, **opts):
+        corpus = self._load_corpus(opts)
+        if not corpus:
+            raise CommandError("Empty corpus.")
+
+        server = None
+        base_url = opts['base_url']
+        if opts['provider'] == 'ollama' and not base_url:
+            server = FakeOllamaServer(
+                latency=opts['latency'], jitter=opts['jitter'], error_rate=opts['error_rate'],
+                invalid_json_rate=opts['invalid_json_rate'], tokens_per_second=opts['tokens_per_second'],
+                seed=opts['seed'], load_time=opts['load_time'],
+            ).start()
+            base_url = server.url
+        try:
+            provider = self._provider(opts, base_url)
+            self.warm_up = provider.warm_up() if opts['warm_up'] else None
+            results = asyncio.run(self._run(provider, corpus, opts['concurrency']))
+        finally:
+            if server:
+                server.stop()
+
+        report = self._report(opts, corpus, results)
+        self._print(report)
+        if opts['output']:
+            Path(opts['output']).write_text(json.dumps(report, indent=2))
+
+    def _provider(self, opts, base_url):
+        if opts['provider'] == 'ollama':
+            return OllamaProvider(model=opts['model'], base_url=base_url, stream=opts['stream'],
+                                  max_concurrency=opts['concurrency'])
+        try:
+            if opts['provider'] in provider_configs():
+                provider = create_provider(opts['provider'])
+            else:
+                provider = import_string(opts['provider'])()
+        except ImportError as e:
+            raise CommandError(str(e))
+        provider.max_concurrency = opts['concurrency']
+        return provider
+
+    def _load_corpus(self, opts):
+        if opts['corpus']:
+            corpus = []
+            for path in sorted(Path(opts['corpus']).glob('*.txt')):
+                label_path = path.with_suffix('.json')
+                labels = json.loads(label_path.read_text()) if label_path.exists() else {}
+                corpus.append((path.read_text(), labels))
+            return corpus
+        rng = random.Random(opts['seed'])
+        return [synthetic_invoice(rng) for _ in range(opts['synthetic'])]
+
+    async def _run(self, provider, corpus, concurrency):
+        # Gate here as well so latencies measure the request, not the queue in front of it
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one(text):
+            async with gate:
+                start = time.perf_counter()
+                # Raised errors never got an answer (connection, HTTP status, timeout);
+                # {"error"} results are answers that were not valid JSON
+                transport_error = False
+                try:
+                    result = await provider.aextract(text)
+                except Exception as e:
+                    result = {"error": str(e) or type(e).__name__}
+                    transport_error = True
+                finished = time.perf_counter()
+                return result, finished - start, transport_error, finished
+
+        start = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(one(text) for text, _ in corpus))
+        finally:
+            await provider.aclose()
+        self.wall_time = time.perf_counter() - start
+        return results
+
+    def _report(self, opts, corpus, results):
+        latencies = [seconds for _, seconds, _, _ in results]
+        answered = [r for r, _, transport_error, _ in results if not transport_error]
+        valid = [r for r in answered if 'error' not in r]
+        # Corpus order is not completion order; the first answer back is the one that waited on the load
+        first = min(results, key=lambda r: r[3])
+        matched = expected = 0
+        per_field = {}
+        for (_, labels), (result, _, _, _) in zip(corpus, results):
+            for field, value in labels.items():
+                expected += 1
+                hit = 'error' not in result and _normalize(result.get(field)) == _normalize(value)
+                matched += hit
+                stats = per_field.setdefault(field, [0, 0])
+                stats[0] += hit
+                stats[1] += 1
+        return {
+            'provider': opts['provider'],
+            'model': opts['model'],
+            'stream': opts['stream'],
+            'concurrency': opts['concurrency'],
+            'documents': len(results),
+            'wall_seconds': self.wall_time,
+            'throughput_per_second': len(results) / self.wall_time if self.wall_time else 0.0,
+            'warm_up': self.warm_up,
+            # The first document pays any model load the warm-up did not
+            'first_latency': first[1],
+            'latency': {
+                'p50': percentile(latencies, 0.50),
+                'p95': percentile(latencies, 0.95),
+                'p99': percentile(latencies, 0.99),
+                'max': max(latencies),
+            },
+            'transport_error_rate': (len(results) - len(answered)) / len(results),
+            # Of the requests that got an answer
+            'json_valid_rate': len(valid) / len(answered) if answered else None,
+            'field_accuracy': matched / expected if expected else None,
+            'field_accuracy_by_field': {f: hits / total for f, (hits, total) in per_field.items()},
+        }
+
+    def _print(self, r):
+        lat = r['latency']
+        self.stdout.write(f"Documents:   {r['documents']} (concurrency {r['concurrency']})")
+        self.stdout.write(f"Throughput:  {r['throughput_per_second']:.1f} docs/s over {r['wall_seconds']:.2f}s")
+        self.stdout.write(
+            f"Latency:     p50 {lat['p50'] * 1000:.0f} ms  p95 {lat['p95'] * 1000:.0f} ms  "
+            f"p99 {lat['p99'] * 1000:.0f} ms  max {lat['max'] * 1000:.0f} ms"
+        )
+        warm = r['warm_up']
+        if warm and 'cold' in warm:
+            self.stdout.write(f"Warm-up:     cold {warm['cold']:.2f}s, warm {warm['warm'] * 1000:.0f} ms")
+        self.stdout.write(f"First doc:   {r['first_latency'] * 1000:.0f} ms")
+        self.stdout.write(f"Errors:      {r['transport_error_rate']:.1%} of requests got no answer")
+        if r['json_valid_rate'] is not None:
+            self.stdout.write(f"Valid JSON:  {r['json_valid_rate']:.1%} of answers")
+        if r['field_accuracy'] is not None:
+            by_field = '  '.join(f"{f} {a:.0%}" for f, a in r['field_accuracy_by_field'].items())
+            self.stdout.write(f"Accuracy:    {r['field_accuracy']:.1%}  ({by_field})")
@@ -0,0 +1,82 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.classifier import LEDGER_MAP, LedgerClassifier, UNCATEGORIZED
+
+LEDGERS = ['Rent Expense', 'Office Expense', 'Travel Expense', 'Sales Revenue', 'Purchases', 'Bank Charges']
+
+
+def synthetic_rules(rng, count):
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12))))
+    return [(w, rng.choice(LEDGERS), rng.randint(0, 3)) for w in sorted(words)]
+
+
+def synthetic_lines(rng, rules, count):
+    keywords = [r[0] for r in rules]
+    lines = []
+    for _ in range(count):
+        words = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))) for _ in range(6)]
+        if rng.random() < 0.5:
+            words.insert(rng.randint(0, len(words)), rng.choice(keywords).upper())
+        lines.append(f"NEFT {' '.join(words)} REF{rng.randint(100000, 999999)} {rng.uniform(10, 9999):.2f}")
+    return lines
+
+
+def linear_classify(rules, text):
+    # One substring test per rule, as classify_ledger used to do; same precedence as the classifier
+    text = text.lower()
+    best_key, best = None, None
+    for order, (keyword, ledger, priority) in enumerate(rules):
+        if keyword in text:
+            key = (priority, len(keyword), -order)
+            if best_key is None or key > best_key:
+                best_key, best = key, ledger
+    if best is not None:
+        return best
+    for keyword, ledger in LEDGER_MAP.items():
+        if keyword in text:
+            return ledger
+    return UNCATEGORIZED
+
+
+class Command(BaseCommand):
+    help = "Benchmark ledger classification throughput with a large per-business rule set."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rules', type=int, default=10000)
+        parser.add_argument('--lines', type=int, default=20000)
+        parser.add_argument('--baseline-lines', type=int, default=500,
+                            help="Lines timed with the one-test-per-rule loop (it is slow)")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts['seed'])
+        rules = synthetic_rules(rng, opts['rules'])
+        lines = synthetic_lines(rng, rules, opts['lines'])
+
+        start = time.perf_counter()
+        classifier = LedgerClassifier(rules)
+        self.stdout.write(f"Compiled {classifier.rule_count} rules in {time.perf_counter() - start:.3f}s")
+
+        sample = lines[:opts['baseline_lines']]
+        start = time.perf_counter()
+        expected = [linear_classify(rules, line) for line in sample]
+        linear = (time.perf_counter() - start) / len(sample)
+
+        if [classifier.classify(line) for line in sample] != expected:
+            self.stderr.write(self.style.ERROR("Classifier output differs from the linear scan"))
+            return
+
+        start = time.perf_counter()
+        for line in lines:
+            classifier.classify(line)
+        automaton = (time.perf_counter() - start) / len(lines)
+
+        self.stdout.write(f"  linear: {1 / linear:>12,.0f} lines/s")
+        self.stdout.write(f"automaton: {1 / automaton:>11,.0f} lines/s")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {linear / automaton:.1f}x"))
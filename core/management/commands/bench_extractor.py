@@ -0,0 +1,163 @@
+import random
+import re
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.extractor import LineExtractor
+from core.models import Business, Document, ExtractedLineItem
+from core.processor import BULK_BATCH_SIZE, classify_ledger, extract_gst
+
+VENDORS = ['Sharma Traders', 'Office Mart', 'City Rent Co', 'Metro Salary A/c', 'Bank Charges', 'Purchase Depot']
+NARRATIONS = ['NEFT OFFICE SUPPLIES', 'UPI RENT PAYMENT', 'SALARY CREDIT', 'ATM CASH WDL', 'SALE PROCEEDS', 'BANK CHARGES']
+
+
+class _Rollback(Exception):
+    pass
+
+
+def synthetic_receipt(rng):
+    lines = [
+        f"Bill From: {rng.choice(VENDORS)}",
+        f"Invoice No: INV-{rng.randint(1000, 99999)}",
+        f"Date: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+        "Thank you for shopping with us",
+    ]
+    for _ in range(rng.randint(3, 12)):
+        lines.append(f"Item {rng.randint(1, 500)} x{rng.randint(1, 9)}   {rng.uniform(10, 5000):.2f}")
+    lines.append(f"CGST {rng.choice([2, 6, 9, 14])}%  Tax: {rng.uniform(5, 900):.2f}")
+    lines.append(f"SGST {rng.choice([2, 6, 9, 14])}%  Tax: {rng.uniform(5, 900):.2f}")
+    lines.append(f"Total: {rng.uniform(100, 50000):.2f}")
+    return "\n".join(lines)
+
+
+def synthetic_statement(rng, rows):
+    lines = ["STATEMENT OF ACCOUNT", "Date        Narration                 Debit      Credit     Balance", ""]
+    balance = rng.uniform(10000, 500000)
+    for _ in range(rows):
+        amount = rng.uniform(10, 20000)
+        balance += amount if rng.random() < 0.4 else -amount
+        sep = rng.choice('-/')
+        lines.append(
+            f"{rng.randint(1, 28):02d}{sep}{rng.randint(1, 12):02d}{sep}2025  "
+            f"{rng.choice(NARRATIONS)} REF{rng.randint(100000, 999999)}  {amount:.2f}  {balance:.2f}"
+        )
+        if rng.random() < 0.1:
+            lines.append("Page continued")
+    return "\n".join(lines)
+
+
+def legacy_extract(doc, text, ai_data):
+    # Pre-engine per-line logic, kept as the benchmark baseline
+    items = []
+    for raw_line in text.split("\n"):
+        line = raw_line.strip()
+        if not line:
+            continue
+        date_match = re.search(r'(\d{2}[-/]\d{2}[-/]\d{4})', line)
+        amount_match = re.findall(r'\d+\.\d{2}', line)
+        invoice_match = re.search(r'(?:INV|Invoice)\s*[:\s]*([A-Za-z0-9-]+)', line, re.IGNORECASE)
+        vendor_match = re.search(r'(?:Vendor|From|Bill From)[:\s]*([A-Za-z0-9 &]+)', line, re.IGNORECASE)
+        if date_match or amount_match or invoice_match or vendor_match:
+            item = ExtractedLineItem(document=doc)
+            if date_match:
+                try:
+                    item.date = datetime.strptime(date_match.group(1).replace('-', '/'), "%d/%m/%Y").date()
+                except ValueError:
+                    item.date = None
+            if amount_match:
+                item.amount = Decimal(amount_match[-1])
+            if invoice_match:
+                item.invoice_no = invoice_match.group(1)
+            vendor_name = vendor_match.group(1) if vendor_match else None
+            item.vendor = vendor_name
+            item.ledger_account = classify_ledger(vendor_name or line)
+            item.gst_rate, item.tax_amount = extract_gst(line)
+            item.raw = {"raw_line": line, "ai_suggestion": ai_data}
+            items.append(item)
+    return items
+
+
+def _fields(item):
+    return (item.date, item.amount, item.invoice_no, item.vendor, item.ledger_account,
+            item.gst_rate, item.tax_amount, item.raw["raw_line"])
+
+
+class Command(BaseCommand):
+    help = "Benchmark line extraction (legacy per-line regexes vs compiled engine) on synthetic documents."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--receipts', type=int, default=500)
+        parser.add_argument('--statements', type=int, default=20)
+        parser.add_argument('--rows', type=int, default=2000, help="Rows per synthetic bank statement")
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--db', action='store_true',
+                            help="Also time per-row save() vs bulk_create (rolled back afterwards)")
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts['seed'])
+        corpus = [synthetic_receipt(rng) for _ in range(opts['receipts'])]
+        corpus += [synthetic_statement(rng, opts['rows']) for _ in range(opts['statements'])]
+        total_lines = sum(len(t.split("\n")) for t in corpus)
+        self.stdout.write(f"Corpus: {len(corpus)} documents, {total_lines} lines")
+
+        doc = Document(id=0)
+        ai_data = {"confidence": 0.6}
+        engine = LineExtractor(classify_ledger)
+
+        # Both paths must produce the same rows
+        for text in corpus[:50] + corpus[-2:]:
+            old = [_fields(i) for i in legacy_extract(doc, text, ai_data)]
+            new = [_fields(i) for i in engine.extract(doc, text, {"ai_suggestion": ai_data})]
+            if old != new:
+                self.stderr.write(self.style.ERROR("Engine output differs from legacy extraction"))
+                return
+
+        results = {}
+        for label, fn in (
+            ('legacy', lambda t: legacy_extract(doc, t, ai_data)),
+            ('engine', lambda t: engine.extract(doc, t, {"ai_suggestion": ai_data})),
+        ):
+            best = None
+            for _ in range(opts['repeat']):
+                start = time.perf_counter()
+                for text in corpus:
+                    fn(text)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[label] = best
+            self.stdout.write(f"{label:>8}: {best:.3f}s  {total_lines / best:,.0f} lines/s")
+
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {results['legacy'] / results['engine']:.2f}x"))
+
+        if opts['db']:
+            self._bench_db(corpus[-1] if opts['statements'] else corpus[0], engine)
+
+    def _bench_db(self, text, engine):
+        try:
+            with transaction.atomic():
+                business = Business.objects.create(name="bench")
+                document = Document.objects.create(business=business, file="bench.pdf")
+                items = engine.extract(document, text)
+
+                start = time.perf_counter()
+                for item in items:
+                    item.pk = None
+                    item.save()
+                per_row = time.perf_counter() - start
+
+                for item in items:
+                    item.pk = None
+                start = time.perf_counter()
+                ExtractedLineItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+                bulk = time.perf_counter() - start
+
+                self.stdout.write(f"  save(): {per_row:.3f}s for {len(items)} rows")
+                self.stdout.write(f"    bulk: {bulk:.3f}s for {len(items)} rows ({per_row / bulk:.1f}x)")
+                raise _Rollback
+        except _Rollback:
+            pass
@@ -0,0 +1,137 @@
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageDraw, ImageFont
+
+from core.extractor import scan_line
+from core.ocr import IMAGE_EXTENSIONS, run_tesseract
+from core.preprocess import configured_stages, preprocess
+
+FIELDS = ('vendor', 'invoice', 'date', 'amount')
+
+
+def synthetic_receipt_image(rng, path):
+    """A 12 MP phone-photo-like receipt: large canvas, slight skew, noise. Returns its labels."""
+    labels = {
+        'vendor': rng.choice(['Sharma Traders', 'Office Mart', 'City Rent Co', 'Purchase Depot']),
+        'invoice': f"INV-{rng.randint(1000, 99999)}",
+        'date': f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+        'amount': f"{rng.uniform(100, 9999):.2f}",
+    }
+    lines = [
+        f"Bill From: {labels['vendor']}",
+        f"INV {labels['invoice']}",
+        f"Date: {labels['date']}",
+        f"Item {rng.randint(1, 99)}   {rng.uniform(10, 99):.2f}",
+        f"Total: {labels['amount']}",
+    ]
+
+    img = Image.new('RGB', (3000, 4000), (235, 232, 225))
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.load_default(size=90)
+    except TypeError:  # Pillow without FreeType size support
+        font = ImageFont.load_default()
+    for i, line in enumerate(lines):
+        draw.text((400, 900 + i * 180), line, fill=(30, 30, 30), font=font)
+
+    noise = Image.effect_noise(img.size, 40).convert('RGB')
+    img = Image.blend(img, noise, 0.15)
+    img = img.rotate(rng.uniform(-3, 3), expand=True, fillcolor=(90, 90, 90))
+    img.save(path, quality=90)
+    return labels
+
+
+def extracted_fields(text):
+    found = {field: set() for field in FIELDS}
+    for raw_line in text.split('\n'):
+        line = raw_line.strip()
+        values = scan_line(line) if line else None
+        for field in FIELDS:
+            if values and values.get(field):
+                found[field].add(values[field].strip().casefold())
+    return found
+
+
+class Command(BaseCommand):
+    help = "Measure OCR time and field accuracy as each preprocessing stage is added."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', help="Directory of images; <name>.json next to an image holds its expected fields")
+        parser.add_argument('--synthetic', type=int, default=5, help="Generate this many receipts when no corpus is given")
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--output', help="Write results as JSON to this path")
+
+    def handle(self, *args, **opts):
+        with tempfile.TemporaryDirectory() as tmp:
+            samples = self._load_corpus(opts, Path(tmp))
+            if not samples:
+                raise CommandError("No images found.")
+
+            stages = configured_stages()
+            pipelines = [tuple(stages[:n]) for n in range(len(stages) + 1)]
+            results = []
+            for pipeline in pipelines:
+                results.append(self._run(samples, pipeline))
+                r = results[-1]
+                self.stdout.write(
+                    f"{' + '.join(pipeline) or 'no preprocessing':<50} "
+                    f"prep {r['preprocess_ms']:7.0f} ms  ocr {r['ocr_ms']:7.0f} ms  "
+                    f"accuracy {r['accuracy']:.1%}"
+                )
+
+        if opts['output']:
+            Path(opts['output']).write_text(json.dumps(results, indent=2))
+
+    def _load_corpus(self, opts, tmp):
+        if opts['corpus']:
+            samples = []
+            for path in sorted(Path(opts['corpus']).iterdir()):
+                if path.suffix.lower() in IMAGE_EXTENSIONS:
+                    label_path = path.with_suffix('.json')
+                    labels = json.loads(label_path.read_text()) if label_path.exists() else {}
+                    samples.append((path, labels))
+            return samples
+
+        rng = random.Random(opts['seed'])
+        samples = []
+        for i in range(opts['synthetic']):
+            path = tmp / f"receipt_{i}.jpg"
+            samples.append((path, synthetic_receipt_image(rng, path)))
+        return samples
+
+    def _run(self, samples, pipeline):
+        prep_time = ocr_time = 0.0
+        matched = expected = 0
+        for path, labels in samples:
+            with Image.open(path) as img:
+                start = time.perf_counter()
+                prepared = preprocess(img, pipeline)
+                prepared.load()
+                prep_time += time.perf_counter() - start
+
+                start = time.perf_counter()
+                # Preprocessing was done above; pass no stages so it is not repeated
+                text = run_tesseract(prepared, stages=())
+                ocr_time += time.perf_counter() - start
+
+            found = extracted_fields(text)
+            for field, value in labels.items():
+                if field not in found:
+                    continue
+                expected += 1
+                matched += str(value).strip().casefold() in found[field]
+
+        n = len(samples)
+        return {
+            'stages': list(pipeline),
+            'preprocess_ms': prep_time / n * 1000,
+            'ocr_ms': ocr_time / n * 1000,
+            'accuracy': matched / expected if expected else 0.0,
+            'fields_expected': expected,
+            'fields_matched': matched,
+        }
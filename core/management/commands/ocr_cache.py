@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ocr import get_ocr_cache
+
+
+class Command(BaseCommand):
+    help = "Show OCR cache statistics, or clear the cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help="Delete all entries and reset counters")
+
+    def handle(self, *args, **opts):
+        cache = get_ocr_cache()
+        if cache is None:
+            raise CommandError("OCR cache is disabled (OCR_CACHE_DIR is not set).")
+
+        if opts['clear']:
+            cache.clear()
+            self.stdout.write(self.style.SUCCESS(f"Cleared {cache.directory}"))
+            return
+
+        stats = cache.stats()
+        self.stdout.write(f"Directory: {cache.directory}")
+        self.stdout.write(f"Entries:   {stats['entries']}")
+        self.stdout.write(f"Size:      {stats['bytes'] / 1024 / 1024:.1f} MiB of {stats['max_bytes'] / 1024 / 1024:.0f} MiB")
+        self.stdout.write(f"Hits:      {stats['hits']}")
+        self.stdout.write(f"Misses:    {stats['misses']}")
+        self.stdout.write(f"Hit rate:  {stats['hit_rate']:.1%}")
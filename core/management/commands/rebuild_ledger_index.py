@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.ledger_index import rebuild_ledger_index
+from core.models import Business
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ledger suggestion index of each business from its verified line items."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--business', type=int, action='append', help="Business id; repeat for several. Default: all")
+
+    def handle(self, *args, **opts):
+        businesses = Business.objects.all()
+        if opts['business']:
+            businesses = businesses.filter(pk__in=opts['business'])
+        for business_id in businesses.values_list('id', flat=True):
+            index = rebuild_ledger_index(business_id)
+            self.stdout.write(f"Business {business_id}: {len(index)} verified texts.")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Business
+from core.summary import rebuild_summary
+
+
+class Command(BaseCommand):
+    help = "Recompute stored business summaries from line items (e.g. after raw SQL edits)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--business', type=int, action='append', help="Business id; repeat for several. Default: all")
+
+    def handle(self, *args, **opts):
+        businesses = Business.objects.all()
+        if opts['business']:
+            businesses = businesses.filter(pk__in=opts['business'])
+        count = 0
+        for business_id in businesses.values_list('id', flat=True):
+            rebuild_summary(business_id)
+            count += 1
+        self.stdout.write(f"Rebuilt {count} summaries.")
@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.ai_bridge.registry import warm_up
+from core.jobs import claim_jobs, job_setting, release_stale_jobs, run_job
+
+
+def describe_warm_up(name, report):
+    if 'error' in report:
+        return f"{name}: warm-up failed ({report['error']})"
+    if 'routes' in report:
+        return '; '.join(describe_warm_up(f"{name}/{route}", r) for route, r in report['routes'].items())
+    return f"{name}: {report.get('model', '')} loaded, cold {report['cold']:.2f}s, warm {report['warm']:.3f}s"
+
+
+class Command(BaseCommand):
+    help = "Process queued documents: OCR in a process pool, AI/DB steps in threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=job_setting('JOB_OCR_PROCESSES', os.cpu_count() or 1),
+                            help="OCR worker processes")
+        parser.add_argument('--threads', type=int, default=job_setting('JOB_WORKER_THREADS', 4),
+                            help="Jobs handled concurrently")
+        parser.add_argument('--poll-interval', type=float, default=job_setting('JOB_POLL_INTERVAL', 2.0))
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+        parser.add_argument('--no-warm-up', action='store_true', help="Do not preload AI models at start")
+
+    def handle(self, *args, **opts):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        threads = max(1, opts['threads'])
+        poll = opts['poll_interval']
+
+        released = release_stale_jobs()
+        if released:
+            self.stdout.write(f"Requeued {released} stale job(s)")
+
+        # The first document should not wait for the model to load
+        if not opts['no_warm_up']:
+            for report in warm_up():
+                self.stdout.write(describe_warm_up(report['provider'], report))
+
+        connections.close_all()
+        self.stdout.write(f"Worker {worker_id}: {opts['processes']} OCR process(es), {threads} thread(s)")
+
+        # Spawned rather than forked: job threads may be inside PDFium or holding DB connections
+        ocr_context = multiprocessing.get_context('spawn')
+
+        def new_ocr_pool():
+            return ProcessPoolExecutor(max_workers=max(1, opts['processes']), mp_context=ocr_context)
+
+        ocr_pool = new_ocr_pool()
+        inflight = {}  # future -> the OCR pool its job was given
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='job') as job_pool:
+            try:
+                while True:
+                    for job in claim_jobs(worker_id, threads - len(inflight)):
+                        inflight[job_pool.submit(run_job, job, ocr_pool)] = ocr_pool
+
+                    if not inflight:
+                        if opts['once']:
+                            break
+                        time.sleep(poll)
+                        continue
+
+                    done, _ = wait(inflight, timeout=poll, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pool = inflight.pop(future)
+                        try:
+                            job = future.result()
+                        except BrokenProcessPool:
+                            # A crashed child breaks the pool for good; run_job already requeued the job
+                            if pool is ocr_pool:
+                                self.stderr.write("OCR pool broke; starting a new one")
+                                ocr_pool.shutdown(wait=False, cancel_futures=True)
+                                ocr_pool = new_ocr_pool()
+                            continue
+                        self.stdout.write(f"Job {job.id} (document {job.document_id}): {job.status}")
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping, waiting for running jobs...")
+                wait(inflight)
+            finally:
+                ocr_pool.shutdown()
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_processingjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, help_text='Earlier upload with the same checksum whose OCR text and lines are reused', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='core.document'),
+        ),
+        migrations.AddConstraint(
+            model_name='document',
+            constraint=models.UniqueConstraint(fields=('business', 'checksum'), name='core_document_unique_checksum'),
+        ),
+    ]
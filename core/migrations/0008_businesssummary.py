@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_uploadbatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusinessSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ledger_totals', models.JSONField(blank=True, default=dict)),
+                ('gst_totals', models.JSONField(blank=True, default=dict)),
+                ('total_income', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_expense', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('business', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='core.business')),
+            ],
+        ),
+    ]
@@ -0,0 +1,81 @@
+"""
+Move the AI payload copied into every line's raw["ai_suggestion"] into one
+AIExtraction per document and report how much JSON that removed.
+"""
+import json
+import sys
+
+from django.db import migrations
+
+CHUNK_SIZE = 2000
+
+
+def _size(value):
+    return len(json.dumps(value, separators=(',', ':')).encode())
+
+
+def _chunks(queryset, *ordering):
+    """
+    The queryset's rows in `ordering`, CHUNK_SIZE at a time. The pks are read up
+    front: on SQLite an open cursor sees the bulk_update of the rows it is
+    walking, so iterating while writing could skip rows or return them twice.
+    """
+    pks = list(queryset.order_by(*ordering).values_list('pk', flat=True))
+    for start in range(0, len(pks), CHUNK_SIZE):
+        yield list(queryset.model.objects.filter(pk__in=pks[start:start + CHUNK_SIZE]).order_by(*ordering))
+
+
+def compact(apps, schema_editor):
+    AIExtraction = apps.get_model('core', 'AIExtraction')
+    ExtractedLineItem = apps.get_model('core', 'ExtractedLineItem')
+
+    lines = ExtractedLineItem.objects.filter(raw__has_key='ai_suggestion')
+    removed_bytes = stored_bytes = line_count = 0
+    extraction = None
+
+    for chunk in _chunks(lines, 'document_id', 'id'):
+        for line in chunk:
+            payload = line.raw.pop('ai_suggestion')
+            if extraction is None or extraction.document_id != line.document_id:
+                extraction, created = AIExtraction.objects.get_or_create(
+                    document_id=line.document_id, defaults={'data': payload}
+                )
+                if created:
+                    stored_bytes += _size(payload)
+            if payload != extraction.data:
+                # Not a copy of the document's payload; leave it on the line
+                line.raw['ai_suggestion'] = payload
+            else:
+                removed_bytes += _size(payload)
+                line.ai_extraction_id = extraction.id
+            line_count += 1
+        ExtractedLineItem.objects.bulk_update(chunk, ['raw', 'ai_extraction'])
+
+    if line_count:
+        # Printed rather than logged: acctproj configures no LOGGING, and migrate's operator should see it
+        sys.stdout.write(
+            f"\n  Compacted AI suggestions on {line_count} lines: {removed_bytes} bytes removed, "
+            f"{stored_bytes} bytes stored, {removed_bytes - stored_bytes} bytes reclaimed"
+        )
+
+
+def expand(apps, schema_editor):
+    ExtractedLineItem = apps.get_model('core', 'ExtractedLineItem')
+    AIExtraction = apps.get_model('core', 'AIExtraction')
+    lines = ExtractedLineItem.objects.filter(ai_extraction__isnull=False)
+    for chunk in _chunks(lines, 'id'):
+        payloads = AIExtraction.objects.in_bulk({line.ai_extraction_id for line in chunk})
+        for line in chunk:
+            line.raw['ai_suggestion'] = payloads[line.ai_extraction_id].data
+        ExtractedLineItem.objects.bulk_update(chunk, ['raw'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_aiextraction'),
+    ]
+
+    operations = [
+        migrations.RunPython(compact, expand),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_compact_ai_suggestions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(help_text='Matched case-insensitively anywhere in the text', max_length=100)),
+                ('ledger_account', models.CharField(max_length=100)),
+                ('priority', models.IntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_rules', to='core.business')),
+            ],
+            options={
+                'ordering': ['-priority', 'keyword'],
+                'constraints': [models.UniqueConstraint(fields=('business', 'keyword'), name='core_ledgerrule_unique_keyword')],
+            },
+        ),
+    ]
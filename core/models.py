@@ -71,6 +71,52 @@ class Business(models.Model):
         return self.name
 
 
+class LedgerRule(models.Model):
+    """
+    Keyword -> ledger account mapping for one business.
+    Business rules take precedence over the built-in defaults (processor.LEDGER_MAP);
+    among matching rules the highest priority wins, then the longest keyword.
+    """
+    business = models.ForeignKey(
+        Business, on_delete=models.CASCADE, related_name='ledger_rules'
+    )
+    keyword = models.CharField(max_length=100, help_text="Matched case-insensitively anywhere in the text")
+    ledger_account = models.CharField(max_length=100)
+    priority = models.IntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-priority', 'keyword']
+        constraints = [
+            models.UniqueConstraint(fields=['business', 'keyword'], name='core_ledgerrule_unique_keyword'),
+        ]
+
+    def __str__(self):
+        return f"{self.keyword} -> {self.ledger_account}"
+
+
+class UploadBatch(models.Model):
+    """
+    A group of documents uploaded together (many files or one ZIP archive).
+    """
+    business = models.ForeignKey(
+        Business, on_delete=models.CASCADE, related_name='upload_batches'
+    )
+    uploaded_by = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.SET_NULL
+    )
+    file_count = models.PositiveIntegerField(default=0)
+    rejected = models.JSONField(default=list, blank=True)  # [{"name": ..., "error": ...}]
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Batch {self.id} - {self.business.name} ({self.file_count} files)"
+
+
 def upload_to(instance, filename):
     return f"business_{instance.business.id}/documents/{filename}"
 
@@ -114,6 +160,15 @@ class Document(models.Model):
         help_text="Used to detect duplicate uploads"
     )
 
+    batch = models.ForeignKey(
+        UploadBatch, null=True, blank=True, on_delete=models.SET_NULL, related_name='documents'
+    )
+
+    duplicate_of = models.ForeignKey(
+        'self', null=True, blank=True, on_delete=models.SET_NULL, related_name='duplicates',
+        help_text="Earlier upload with the same checksum whose OCR text and lines are reused"
+    )
+
     class Meta:
         ordering = ['-uploaded_at']
         indexes = [
@@ -122,10 +177,36 @@ class Document(models.Model):
             models.Index(fields=['doc_type']),
             models.Index(fields=['document_number']),
         ]
+        constraints = [
+            # Also the lookup index for duplicate detection; duplicates keep checksum NULL
+            models.UniqueConstraint(
+                fields=['business', 'checksum'],
+                name='core_document_unique_checksum',
+            ),
+        ]
 
     def __str__(self):
         return f"Document {self.id} - {self.business.name}"
 
+    @property
+    def source(self):
+        """The document holding the OCR text and lines for this upload."""
+        return self.duplicate_of or self
+
+
+class AIExtraction(models.Model):
+    """
+    AI extraction result for a document, stored once and referenced by its lines.
+    """
+    document = models.OneToOneField(
+        Document, on_delete=models.CASCADE, related_name='ai_extraction'
+    )
+    data = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"AI extraction - Document {self.document_id}"
+
 
 class ExtractedLineItem(models.Model):
     # -------- EXISTING FIELDS (UNCHANGED) --------
@@ -142,6 +223,9 @@ class ExtractedLineItem(models.Model):
     raw = models.JSONField(default=dict, blank=True)
 
     # -------- 🔥 NEW ADDITIONS --------
+    ai_extraction = models.ForeignKey(
+        AIExtraction, null=True, blank=True, on_delete=models.SET_NULL, related_name='lines'
+    )
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -155,3 +239,65 @@ class ExtractedLineItem(models.Model):
 
     def __str__(self):
         return f"Line {self.id} ({self.vendor or 'Unknown'} - {self.amount or 0})"
+
+
+class ProcessingJob(models.Model):
+    """
+    Background OCR + extraction work for one document.
+    Picked up by `manage.py run_worker`.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    RETRYING = 'retrying'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (RETRYING, 'Waiting to retry'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    document = models.ForeignKey(
+        Document, on_delete=models.CASCADE, related_name='jobs'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+
+    locked_by = models.CharField(max_length=100, blank=True, null=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} - Document {self.document_id} ({self.status})"
+
+
+class BusinessSummary(models.Model):
+    """
+    Running ledger/GST totals for a business, kept in step with its line items
+    (see core/summary.py) so the business page reads a single row.
+    """
+    business = models.OneToOneField(
+        Business, on_delete=models.CASCADE, related_name='summary'
+    )
+    # {key: {"total": "123.45", "lines": 3}}; Decimals are stored as strings
+    ledger_totals = models.JSONField(default=dict, blank=True)
+    gst_totals = models.JSONField(default=dict, blank=True)
+    total_income = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_expense = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary - {self.business.name}"
@@ -0,0 +1,114 @@
+"""
+OCR helpers.
+Functions here are module-level and DB-free so they can run in a process pool.
+"""
+import functools
+import hashlib
+
+import pytesseract
+from django.conf import settings
+from PIL import Image
+
+from .ocr_cache import OCRCache
+from .preprocess import preprocess, signature
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp')
+
+UNSUPPORTED_TEXT = 'OCR not run for this file type in MVP.'
+
+
+def is_image(path):
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def is_pdf(path):
+    return path.lower().endswith('.pdf')
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def tesseract_version():
+    return str(pytesseract.get_tesseract_version())
+
+
+@functools.lru_cache(maxsize=None)
+def get_ocr_cache():
+    directory = getattr(settings, 'OCR_CACHE_DIR', None)
+    if not directory:
+        return None
+    return OCRCache(directory, getattr(settings, 'OCR_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+
+def pool_safe(func):
+    """
+    For functions run in a process pool: re-raise any error as a plain RuntimeError.
+    An exception the parent cannot unpickle (TesseractNotFoundError is one) would
+    otherwise break the whole pool for every later job.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            raise RuntimeError(f"{type(e).__name__}: {e}") from None
+    return wrapper
+
+
+def run_tesseract(img, stages=None):
+    """Preprocess (see core.preprocess) and OCR one image."""
+    return pytesseract.image_to_string(
+        preprocess(img, stages),
+        lang=getattr(settings, 'OCR_LANG', 'eng'),
+        config=getattr(settings, 'OCR_CONFIG', ''),
+    )
+
+
+def cached_ocr(content_hash, load_image, extra=''):
+    """
+    OCR the image returned by `load_image()`, going through the OCR cache.
+    `extra` distinguishes several images cut from one file (e.g. PDF pages).
+    """
+    lang = getattr(settings, 'OCR_LANG', 'eng')
+    config = getattr(settings, 'OCR_CONFIG', '')
+
+    cache = get_ocr_cache()
+    key = None
+    if cache is not None:
+        key = cache.make_key(content_hash, tesseract_version(), lang, config, f'{extra}|{signature()}')
+        text = cache.get(key)
+        if text is not None:
+            return text
+
+    with load_image() as img:
+        text = run_tesseract(img)
+
+    if cache is not None:
+        cache.set(key, text)
+    return text
+
+
+@pool_safe
+def ocr_image(path, content_hash=None):
+    return cached_ocr(content_hash or file_sha256(path), lambda: Image.open(path))
+
+
+def extract_text(path, content_hash=None, executor=None):
+    """
+    Return the text for a stored document file.
+    `executor` is a process pool for Tesseract; PDFs spread their pages over it.
+    """
+    if is_pdf(path):
+        from .pdf import extract_pdf_text  # pdf.py imports this module
+        return extract_pdf_text(path, content_hash, executor)
+    if is_image(path):
+        if executor is not None:
+            return executor.submit(ocr_image, path, content_hash).result()
+        return ocr_image(path, content_hash)
+    return UNSUPPORTED_TEXT
@@ -0,0 +1,154 @@
+"""
+On-disk cache of OCR output.
+
+Entries are keyed on the image content hash plus everything that changes
+Tesseract's output (version, language, config). The cache is shared by every
+process on the host: entries are written atomically, the file mtime doubles as
+the LRU clock, and hit/miss counters are append-only files whose size is the
+count, so concurrent workers never need a lock.
+
+Writes keep a running size estimate instead of scanning the directory; the
+full scan (and eviction) only runs once the estimate passes the limit, or
+every RESCAN_INTERVAL seconds to pick up what other processes wrote.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+HITS_FILE = 'hits'
+MISSES_FILE = 'misses'
+ENTRY_SUFFIX = '.txt'
+
+RESCAN_INTERVAL = 300  # seconds
+# Eviction frees down to this share of max_bytes, so the next writes fit without another scan
+LOW_WATER = 0.9
+
+
+class OCRCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._estimate = None  # bytes on disk as of the last scan plus our writes since
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    # ---------- KEYS ----------
+    @staticmethod
+    def make_key(content_hash, engine_version, lang, config, extra=''):
+        raw = '|'.join([content_hash, str(engine_version), lang or '', config or '', extra or ''])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key):
+        return self.directory / key[:2] / (key + ENTRY_SUFFIX)
+
+    # ---------- LOOKUP ----------
+    def get(self, key):
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            self._count(MISSES_FILE)
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass
+        self._count(HITS_FILE)
+        return text
+
+    def set(self, key, text):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = text.encode('utf-8')
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._grow(len(data) - replaced)
+
+    # ---------- EVICTION ----------
+    def _grow(self, delta):
+        with self._lock:
+            due = self._estimate is None or time.monotonic() - self._scanned_at > RESCAN_INTERVAL
+            if not due:
+                self._estimate += delta
+                if self._estimate <= self.max_bytes:
+                    return
+        self.evict()
+
+    def _entries(self):
+        if not self.directory.exists():
+            return []
+        entries = []
+        for path in self.directory.glob('*/*' + ENTRY_SUFFIX):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        if total > self.max_bytes:
+            target = self.max_bytes * LOW_WATER
+            for _, size, path in sorted(entries):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+                if total <= target:
+                    break
+        with self._lock:
+            self._estimate = total
+            self._scanned_at = time.monotonic()
+        return removed
+
+    def clear(self):
+        for _, _, path in self._entries():
+            path.unlink(missing_ok=True)
+        for name in (HITS_FILE, MISSES_FILE):
+            (self.directory / name).unlink(missing_ok=True)
+        with self._lock:
+            self._estimate = 0
+            self._scanned_at = time.monotonic()
+
+    # ---------- STATS ----------
+    def _count(self, name):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.directory / name, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, b'.')
+        finally:
+            os.close(fd)
+
+    def _counter(self, name):
+        try:
+            return (self.directory / name).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def stats(self):
+        entries = self._entries()
+        hits = self._counter(HITS_FILE)
+        misses = self._counter(MISSES_FILE)
+        lookups = hits + misses
+        return {
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
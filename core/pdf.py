@@ -0,0 +1,105 @@
+"""
+PDF text extraction.
+
+Pages with an embedded text layer are read directly. Only image-only pages are
+rendered and sent to Tesseract, one process-pool task per page, and page
+results are yielded back in page order as they become available.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pypdfium2 as pdfium
+from django.conf import settings
+
+from .ocr import cached_ocr, file_sha256, pool_safe
+
+# PDFium is not thread-safe; worker threads share this process
+_pdfium_lock = threading.Lock()
+
+
+def _min_text_chars():
+    return getattr(settings, 'PDF_MIN_TEXT_CHARS', 20)
+
+
+def read_text_layer(path):
+    """
+    Embedded text for every page, or None for pages that need OCR.
+    """
+    min_chars = _min_text_chars()
+    pages = []
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(path)
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                text = textpage.get_text_bounded()
+                textpage.close()
+                page.close()
+                pages.append(text if len(text.strip()) >= min_chars else None)
+        finally:
+            pdf.close()
+    return pages
+
+
+def _render_page(path, index, dpi):
+    # Also runs inline on a worker thread, next to read_text_layer in other threads
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(path)
+        try:
+            page = pdf[index]
+            image = page.render(scale=dpi / 72).to_pil()
+            page.close()
+            return image
+        finally:
+            pdf.close()
+
+
+@pool_safe
+def ocr_pdf_page(path, index, content_hash):
+    """Render and OCR one page. Runs in a pool process."""
+    dpi = getattr(settings, 'PDF_OCR_DPI', 300)
+    return cached_ocr(
+        content_hash,
+        lambda: _render_page(path, index, dpi),
+        extra=f'pdf-page:{index}:{dpi}',
+    )
+
+
+def iter_pdf_pages(path, content_hash=None, executor=None):
+    """
+    Yield page texts in page order. Image-only pages are all submitted to
+    `executor` up front, so they OCR in parallel while earlier pages are yielded.
+    """
+    content_hash = content_hash or file_sha256(path)
+    pages = read_text_layer(path)
+    scanned = [i for i, text in enumerate(pages) if text is None]
+
+    own_executor = None
+    if executor is None and len(scanned) > 1:
+        workers = getattr(settings, 'PDF_OCR_PROCESSES', None) or os.cpu_count() or 1
+        # Spawned, like run_worker's pool: forking a threaded worker can copy a held PDFium or DB lock
+        own_executor = executor = ProcessPoolExecutor(
+            max_workers=min(len(scanned), workers), mp_context=multiprocessing.get_context('spawn')
+        )
+    try:
+        futures = {}
+        if executor is not None:
+            futures = {i: executor.submit(ocr_pdf_page, path, i, content_hash) for i in scanned}
+
+        for index, text in enumerate(pages):
+            if text is not None:
+                yield text
+            elif index in futures:
+                yield futures[index].result()
+            else:
+                yield ocr_pdf_page(path, index, content_hash)
+    finally:
+        if own_executor is not None:
+            own_executor.shutdown(cancel_futures=True)
+
+
+def extract_pdf_text(path, content_hash=None, executor=None):
+    return '\n'.join(iter_pdf_pages(path, content_hash, executor))
@@ -1,30 +1,25 @@
+import logging
 import re
-from datetime import datetime
+from collections import Counter
 from decimal import Decimal
-from .models import Document, ExtractedLineItem, Business
-from apps.ai_bridge.services.ai_service import AIService
-import pytesseract
-
-ai_service = AIService()
-
-# ---------- LEDGER KEYWORDS ----------
-LEDGER_MAP = {
-    'rent': 'Rent Expense',
-    'salary': 'Salary Expense',
-    'office': 'Office Expense',
-    'sale': 'Sales Revenue',
-    'purchase': 'Purchases',
-    'bank': 'Bank',
-}
+from django.db import transaction
+from .models import AIExtraction, Document, ExtractedLineItem, Business
+from .classifier import LEDGER_MAP, default_classifier, get_classifier  # noqa: F401  (LEDGER_MAP re-exported)
+from .extractor import LineExtractor
+from .ledger_index import line_text, suggest_ledgers
+from .summary import apply_line_changes, get_business_summary, summary_signals_suspended
+from apps.ai_bridge.services.ai_service import get_ai_service
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT when saving extracted lines
+BULK_BATCH_SIZE = 500
 
 GST_TYPES = ['CGST', 'SGST', 'IGST']
 
 def classify_ledger(vendor_or_description):
-    text = vendor_or_description.lower() if vendor_or_description else ''
-    for keyword, ledger in LEDGER_MAP.items():
-        if keyword in text:
-            return ledger
-    return 'Uncategorized'
+    """Default (business-independent) classification; see core.classifier."""
+    return default_classifier().classify(vendor_or_description)
 
 def extract_gst(text):
     """Try to extract GST rate and tax amount from a line"""
@@ -43,108 +38,63 @@ def extract_gst(text):
 
     return gst_rate, tax_amount
 
+def _line_key(line):
+    return line_text(line), line.amount
+
 def process_document(doc: Document):
     text = doc.ocr_text or ""
+    logger.debug("OCR text for document %s:\n%s", doc.id, text)
+
+    # ---------- EXTRACT LINES ----------
+    items = LineExtractor(get_classifier(doc.business_id).classify).extract(doc, text)
 
-    # ---------- DEBUG: Show OCR ----------
-    print(f"\n=== OCR TEXT FOR DOCUMENT {doc.id} ===")
-    print(text)
-    print("=== END OCR TEXT ===\n")
+    # ---------- LEDGER INDEX ----------
+    # Lines resembling ones the business already verified take that ledger
+    index_confidence = suggest_ledgers(doc.business_id, items)
 
     # ---------- AI STEP ----------
     ai_data = {}
-    try:
-        ai_data = ai_service.process_document(text)
-    except Exception as e:
-        ai_data = {"error": str(e)}
-
-    # ---------- SPLIT LINES ----------
-    lines = text.split("\n")
-
-    for raw_line in lines:
-        line = raw_line.strip()
-        if not line:
-            continue
-
-        print(f"Processing line: {line}")  # DEBUG: show each line
-
-        # Common patterns on receipts
-        date_match = re.search(r'(\d{2}[-/]\d{2}[-/]\d{4})', line)
-        amount_match = re.findall(r'\d+\.\d{2}', line)  # get all amounts
-        invoice_match = re.search(r'(?:INV|Invoice)\s*[:\s]*([A-Za-z0-9-]+)', line, re.IGNORECASE)
-        vendor_match = re.search(r'(?:Vendor|From|Bill From)[:\s]*([A-Za-z0-9 &]+)', line, re.IGNORECASE)
-
-        # Only save if some data exists
-        if date_match or amount_match or invoice_match or vendor_match:
-            try:
-                item = ExtractedLineItem(document=doc)
-
-                # Date
-                if date_match:
-                    try:
-                        item.date = datetime.strptime(date_match.group(1).replace('-', '/'), "%d/%m/%Y").date()
-                    except:
-                        item.date = None
-
-                # Amount: take last one on line (usually total)
-                if amount_match:
-                    item.amount = Decimal(amount_match[-1])
-
-                # Invoice
-                if invoice_match:
-                    item.invoice_no = invoice_match.group(1)
-
-                # Vendor
-                vendor_name = vendor_match.group(1) if vendor_match else None
-                item.vendor = vendor_name
-
-                # Ledger
-                item.ledger_account = classify_ledger(vendor_name or line)
-
-                # GST extraction
-                gst_rate, tax_amount = extract_gst(line)
-                item.gst_rate = gst_rate
-                item.tax_amount = tax_amount
-
-                # Save raw + AI suggestions
-                item.raw = {
-                    "raw_line": line,
-                    "ai_suggestion": ai_data
-                }
-
-                item.save()
-                print(f"Saved line item: {item}")  # DEBUG: success
-            except Exception as e:
-                print(f"Failed to save line: {line} | Error: {e}")
-
-    doc.status = "processed"
-    doc.save()
-    print(f"Document {doc.id} processed successfully!\n")
+    if index_confidence is not None:
+        # Every line is covered by verified history; the model has nothing to add
+        ai_data = {"skipped": "ledger_index", "confidence": index_confidence}
+    else:
+        try:
+            ai_data = get_ai_service().process_document(text)
+        except Exception as e:
+            ai_data = {"error": str(e)}
+
+    # ---------- SAVE ----------
+    # Replaces unverified lines from an earlier run, so retries and reprocessing stay
+    # idempotent. Verified lines and their ledger are the user's; they stay, and
+    # re-extracted copies of them are dropped.
+    with transaction.atomic():
+        lines = ExtractedLineItem.objects.filter(document=doc)
+        verified = Counter(_line_key(line) for line in lines.filter(is_verified=True).only('vendor', 'raw', 'amount'))
+        kept = []
+        for item in items:
+            key = _line_key(item)
+            if verified[key]:
+                verified[key] -= 1
+            else:
+                kept.append(item)
+        items = kept
 
+        old_lines = lines.filter(is_verified=False).only('ledger_account', 'amount', 'gst_rate', 'tax_amount')
+        removed = list(old_lines)
+        with summary_signals_suspended():
+            old_lines.delete()
+        # One copy of the AI result per document; lines point at it
+        extraction, _ = AIExtraction.objects.update_or_create(document=doc, defaults={"data": ai_data})
+        for item in items:
+            item.ai_extraction = extraction
+        ExtractedLineItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+        apply_line_changes(doc.business_id, added=items, removed=removed)
+        doc.status = "processed"
+        doc.save()
 
-def generate_business_summary(business: Business):
-    ledger_totals = {}
-    gst_totals = {}
-    total_income = Decimal('0')
-    total_expense = Decimal('0')
-
-    for doc in business.documents.all():
-        for line in doc.lines.all():
-            ledger = line.ledger_account or 'Uncategorized'
-            ledger_totals[ledger] = ledger_totals.get(ledger, Decimal('0')) + (line.amount or 0)
-            gst_rate = line.gst_rate or 'No GST'
-            gst_totals[gst_rate] = gst_totals.get(gst_rate, Decimal('0')) + (line.tax_amount or 0)
-            if 'Revenue' in ledger:
-                total_income += line.amount or 0
-            else:
-                total_expense += line.amount or 0
+    logger.info("Document %s processed: %d line items", doc.id, len(items))
 
-    net_profit = total_income - total_expense
 
-    return {
-        'ledger_totals': ledger_totals,
-        'gst_totals': gst_totals,
-        'total_income': total_income,
-        'total_expense': total_expense,
-        'net_profit': net_profit
-    }
\ No newline at end of file
+def generate_business_summary(business: Business):
+    """Ledger/GST totals for a business; maintained incrementally in core.summary."""
+    return get_business_summary(business)
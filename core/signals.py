@@ -0,0 +1,97 @@
+"""
+Keeps BusinessSummary in step with single line item edits (admin, cascades),
+and teaches the ledger index about lines as they are verified.
+Bulk writers suspend these and apply their changes in one go; so do cascades,
+see CASCADES below.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .ledger_index import line_text, record_verification
+from .models import Business, Document, ExtractedLineItem
+from .summary import apply_line_changes, signals_suspended
+
+
+def _business_id(line):
+    return Document.objects.values_list('business_id', flat=True).filter(pk=line.document_id).first()
+
+
+def _verified_pair(line):
+    if line is None or not line.is_verified or not line.ledger_account:
+        return None
+    return line_text(line), line.ledger_account
+
+
+@receiver(pre_save, sender=ExtractedLineItem)
+def remember_previous_line(sender, instance, raw=False, **kwargs):
+    if raw or signals_suspended() or instance.pk is None:
+        instance._summary_previous = None
+        return
+    instance._summary_previous = ExtractedLineItem.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=ExtractedLineItem)
+def line_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or signals_suspended():
+        return
+    previous = getattr(instance, '_summary_previous', None)
+    business_id = _business_id(instance)
+    if business_id is None:
+        return
+    apply_line_changes(business_id, added=[instance], removed=[previous] if previous else [])
+
+    before, after = _verified_pair(previous), _verified_pair(instance)
+    if before != after:
+        transaction.on_commit(lambda: record_verification(
+            business_id, added=[after] if after else [], removed=[before] if before else []
+        ))
+
+
+@receiver(post_delete, sender=ExtractedLineItem)
+def line_deleted(sender, instance, **kwargs):
+    if signals_suspended():
+        return
+    if instance.pk in _cascade_lines():
+        _cascade_lines().discard(instance.pk)  # already folded in by its document or business
+        return
+    business_id = _business_id(instance)
+    if business_id is not None:
+        apply_line_changes(business_id, removed=[instance])
+
+
+# ---------- CASCADES ----------
+# Deleting a document or business deletes its lines one at a time. Rather than one
+# summary update per line, pre_delete folds them all in at once and the per-line
+# handler skips them.
+_cascade = threading.local()
+
+
+def _cascade_lines():
+    if not hasattr(_cascade, 'lines'):
+        _cascade.lines = set()
+    return _cascade.lines
+
+
+@receiver(pre_delete, sender=Business)
+def business_deleting(sender, instance, **kwargs):
+    # Its BusinessSummary is deleted with it; there is nothing to update
+    _cascade_lines().update(
+        ExtractedLineItem.objects.filter(document__business=instance).values_list('id', flat=True)
+    )
+
+
+@receiver(pre_delete, sender=Document)
+def document_deleting(sender, instance, **kwargs):
+    if signals_suspended():
+        return
+    lines = ExtractedLineItem.objects.filter(document=instance).only(
+        'id', 'ledger_account', 'amount', 'gst_rate', 'tax_amount'
+    )
+    pending = _cascade_lines()
+    removed = [line for line in lines if line.pk not in pending]
+    if removed:
+        apply_line_changes(instance.business_id, removed=removed)
+        pending.update(line.pk for line in removed)
@@ -0,0 +1,124 @@
+"""
+Per-business ledger/GST summary.
+
+`compute_summary` builds the totals from two grouped queries. The result is
+persisted in BusinessSummary and then kept current with deltas: signals cover
+single line saves/deletes (admin edits, cascades), and bulk writers such as
+process_document call `apply_line_changes` themselves inside
+`summary_signals_suspended()`.
+"""
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import BusinessSummary, ExtractedLineItem
+
+ZERO = Decimal('0')
+
+_local = threading.local()
+
+
+def _ledger_key(ledger_account):
+    return ledger_account or 'Uncategorized'
+
+
+def _gst_key(gst_rate):
+    return gst_rate or 'No GST'
+
+
+def is_income(ledger):
+    return 'Revenue' in ledger
+
+
+# ---------- FULL COMPUTE ----------
+def compute_summary(business_id):
+    lines = ExtractedLineItem.objects.filter(document__business_id=business_id)
+
+    ledger_totals = {}
+    for row in lines.values('ledger_account').annotate(total=Sum('amount'), lines=Count('id')).order_by():
+        _add(ledger_totals, _ledger_key(row['ledger_account']), row['total'] or ZERO, row['lines'])
+
+    gst_totals = {}
+    for row in lines.values('gst_rate').annotate(total=Sum('tax_amount'), lines=Count('id')).order_by():
+        _add(gst_totals, _gst_key(row['gst_rate']), row['total'] or ZERO, row['lines'])
+
+    income = sum((Decimal(v['total']) for k, v in ledger_totals.items() if is_income(k)), ZERO)
+    expense = sum((Decimal(v['total']) for k, v in ledger_totals.items() if not is_income(k)), ZERO)
+    return ledger_totals, gst_totals, income, expense
+
+
+def rebuild_summary(business_id):
+    ledger_totals, gst_totals, income, expense = compute_summary(business_id)
+    summary, _ = BusinessSummary.objects.update_or_create(
+        business_id=business_id,
+        defaults={
+            'ledger_totals': ledger_totals,
+            'gst_totals': gst_totals,
+            'total_income': income,
+            'total_expense': expense,
+        },
+    )
+    return summary
+
+
+# ---------- INCREMENTAL ----------
+def _add(totals, key, amount, lines):
+    entry = totals.get(key)
+    if entry is None:
+        entry = totals[key] = {'total': '0', 'lines': 0}
+    entry['total'] = str(Decimal(entry['total']) + amount)
+    entry['lines'] += lines
+    if entry['lines'] <= 0:
+        del totals[key]
+
+
+def apply_line_changes(business_id, added=(), removed=()):
+    """
+    Fold line items into the stored summary after they were written or deleted.
+    Without a stored summary nothing happens; it is built on first read.
+    """
+    with transaction.atomic():
+        summary = BusinessSummary.objects.select_for_update().filter(business_id=business_id).first()
+        if summary is None:
+            return
+        for lines, sign in ((added, 1), (removed, -1)):
+            for line in lines:
+                ledger = _ledger_key(line.ledger_account)
+                amount = (line.amount or ZERO) * sign
+                _add(summary.ledger_totals, ledger, amount, sign)
+                _add(summary.gst_totals, _gst_key(line.gst_rate), (line.tax_amount or ZERO) * sign, sign)
+                if is_income(ledger):
+                    summary.total_income += amount
+                else:
+                    summary.total_expense += amount
+        summary.save()
+
+
+@contextmanager
+def summary_signals_suspended():
+    """For bulk writers that call apply_line_changes themselves."""
+    previous = getattr(_local, 'suspended', False)
+    _local.suspended = True
+    try:
+        yield
+    finally:
+        _local.suspended = previous
+
+
+def signals_suspended():
+    return getattr(_local, 'suspended', False)
+
+
+# ---------- READ ----------
+def get_business_summary(business):
+    summary = BusinessSummary.objects.filter(business=business).first() or rebuild_summary(business.id)
+    return {
+        'ledger_totals': {k: Decimal(v['total']) for k, v in summary.ledger_totals.items()},
+        'gst_totals': {k: Decimal(v['total']) for k, v in summary.gst_totals.items()},
+        'total_income': summary.total_income,
+        'total_expense': summary.total_expense,
+        'net_profit': summary.total_income - summary.total_expense,
+    }
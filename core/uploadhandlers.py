@@ -0,0 +1,31 @@
+"""
+Upload handlers that hash files while Django streams them in.
+The SHA-256 hex digest is available as `uploaded_file.sha256`.
+"""
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class ChecksumMixin:
+    def new_file(self, *args, **kwargs):
+        self._sha256 = hashlib.sha256()
+        return super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self._sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        f = super().file_complete(file_size)
+        if f is not None:
+            f.sha256 = self._sha256.hexdigest()
+        return f
+
+
+class ChecksumMemoryFileUploadHandler(ChecksumMixin, MemoryFileUploadHandler):
+    pass
+
+
+class ChecksumTemporaryFileUploadHandler(ChecksumMixin, TemporaryFileUploadHandler):
+    pass
@@ -0,0 +1,63 @@
+"""
+Upload bookkeeping: checksums and duplicate detection.
+"""
+import hashlib
+
+from django.db import IntegrityError, transaction
+
+from .models import Document
+
+
+def file_checksum(uploaded_file):
+    """SHA-256 of an upload, computed during streaming when the checksum handlers are active."""
+    digest = getattr(uploaded_file, 'sha256', None)
+    if digest:
+        return digest
+    sha = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+def find_original(business, checksum):
+    return Document.objects.filter(business=business, checksum=checksum).first()
+
+
+def link_duplicate(doc: Document, original: Document):
+    """
+    Point an unsaved upload at an earlier copy instead of storing and processing it again.
+    The duplicate keeps no checksum of its own, so the per-business unique index holds.
+    """
+    doc.duplicate_of = original
+    doc.checksum = None
+    doc.file = original.file.name
+    doc.status = 'duplicate'
+    doc.is_processed = original.is_processed
+    doc.document_number = original.document_number
+    doc.document_date = original.document_date
+
+
+def save_upload(doc: Document, checksum):
+    """
+    Save an unsaved upload, linking it to an existing document with the same content.
+    Returns the original when `doc` turned out to be a duplicate, else None.
+    """
+    original = find_original(doc.business, checksum)
+    if original is None:
+        doc.checksum = checksum
+        try:
+            with transaction.atomic():
+                doc.save()
+            return None
+        except IntegrityError:
+            # Same file uploaded concurrently; the other request won
+            if doc.file:
+                doc.file.delete(save=False)
+            doc.pk = None
+            original = find_original(doc.business, checksum)
+            if original is None:
+                raise
+
+    link_duplicate(doc, original)
+    doc.save()
+    return original
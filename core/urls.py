@@ -1,6 +1,6 @@
 from django.urls import path
 from . import views
-from .api import health
+from .api import health, upload_batch, batch_status
 
 app_name = "core"  # namespacing for reverse() and include()
 
@@ -19,7 +19,12 @@ urlpatterns = [
     path('businesses/<int:business_id>/upload/', views.upload_document, name='upload_document'),
     path('businesses/<int:business_id>/documents/', views.documents_list, name='documents_list'),
     path('documents/<int:pk>/', views.document_detail, name='document_detail'),
+    path('documents/<int:pk>/reprocess/', views.reprocess_document, name='reprocess_document'),
 
     # API Health
     path('api/health/', health, name='api_health'),
+
+    # Bulk upload
+    path('api/businesses/<int:business_id>/upload/', upload_batch, name='api_upload_batch'),
+    path('api/batches/<int:batch_id>/', batch_status, name='api_batch_status'),
 ]
@@ -1,10 +1,12 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from .forms import BusinessForm, DocumentUploadForm, SignUpForm, LoginForm
-from .models import Business, Document
-import pytesseract
-from PIL import Image
+from .models import Business, Document, ProcessingJob
 from django.contrib.auth import login, logout
-from .processor import process_document, generate_business_summary
+from django.db.models import Prefetch
+from .processor import generate_business_summary
+from .jobs import enqueue_document
+from .uploads import file_checksum, save_upload
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 from django.contrib.auth import authenticate
@@ -78,27 +80,18 @@ def upload_document(request, business_id):
             doc = form.save(commit=False)
             doc.business = business
             doc.uploaded_by = request.user
-            doc.save()
-
-            # OCR for image files
-            try:
-                filepath = doc.file.path
-                if filepath.lower().endswith(('.png', '.jpg', '.jpeg', '.tiff', '.bmp')):
-                    text = pytesseract.image_to_string(Image.open(filepath))
-                    doc.ocr_text = text
-                    doc.status = 'uploaded'
-                    doc.save()
-                else:
-                    doc.ocr_text = 'OCR not run for this file type in MVP.'
-                    doc.status = 'uploaded'
-                    doc.save()
-            except Exception as e:
-                doc.ocr_text = f'OCR failed. Error: {e}'
-                doc.status = 'ocr_failed'
-                doc.save()
-
-            # Process document in background or immediately
-            process_document(doc)
+
+            checksum = file_checksum(form.cleaned_data['file'])
+            original = save_upload(doc, checksum)
+            if original is not None:
+                messages.info(
+                    request,
+                    f"This file was already uploaded as Document {original.id}. "
+                    f"Document {doc.id} reuses its OCR text and extracted lines."
+                )
+            else:
+                # OCR and line extraction run in `manage.py run_worker`
+                enqueue_document(doc)
 
             return redirect(reverse("core:documents_list", args=[business.id]))
     else:
@@ -106,18 +99,39 @@ def upload_document(request, business_id):
     return render(request, 'core/upload.html', {'form': form, 'business': business})
 
 
+@login_required
+def reprocess_document(request, pk):
+    doc = get_object_or_404(Document, pk=pk, business__created_by=request.user)
+    if request.method == 'POST':
+        if doc.duplicate_of_id:
+            messages.info(request, f"Document {doc.id} is a duplicate; reprocess Document {doc.duplicate_of_id} instead.")
+        else:
+            # Unchanged files are served from the OCR cache; verified lines are kept
+            job = enqueue_document(doc)
+            if job.status == ProcessingJob.QUEUED and job.attempts == 0:
+                messages.info(request, f"Document {doc.id} queued for reprocessing.")
+            else:
+                messages.info(request, f"Document {doc.id} is already being processed.")
+    return redirect(reverse("core:document_detail", args=[doc.id]))
+
+
 @login_required
 def documents_list(request, business_id):
     business = get_object_or_404(Business, pk=business_id, created_by=request.user)
-    docs = business.documents.all().order_by('-uploaded_at')
+    docs = business.documents.all().order_by('-uploaded_at').prefetch_related(
+        Prefetch('jobs', queryset=ProcessingJob.objects.order_by('-created_at'), to_attr='recent_jobs')
+    )
     return render(request, 'core/documents_list.html', {'business': business, 'documents': docs})
 
 
 @login_required
 def document_detail(request, pk):
-    doc = get_object_or_404(Document, pk=pk, business__created_by=request.user)
-    lines = doc.lines.all()
-    return render(request, 'core/document_detail.html', {'doc': doc, 'lines': lines})
+    doc = get_object_or_404(
+        Document.objects.select_related('duplicate_of'), pk=pk, business__created_by=request.user
+    )
+    source = doc.source
+    lines = source.lines.all()
+    return render(request, 'core/document_detail.html', {'doc': doc, 'source': source, 'lines': lines})
 
 
 